@@ -53,7 +53,7 @@ def _get_rate_functions_(G, tau, gamma, transmission_weight = None,
                         recovery_weight=None):
     r'''
     Arguments : 
-        G : networkx Graph
+        G : networkx Graph or CompiledGraph
             the graph disease spread on
 
         tau : number
@@ -75,8 +75,13 @@ def _get_rate_functions_(G, tau, gamma, transmission_weight = None,
             - `trans_rate_fxn(u,v)` is the transmission rate from u to v and
             - `rec_rate_fxn(u)` is the recovery rate of u.
 '''
+    if isinstance(G, EoN.CompiledGraph):
+        #raises an EoNError if either weight was not compiled into G.
+        EoN.simulation._compiled_weights_(G, transmission_weight, recovery_weight)
     if transmission_weight is None:
         trans_rate_fxn = lambda x, y: tau
+    elif isinstance(G, EoN.CompiledGraph):
+        trans_rate_fxn = lambda x, y: tau*G.edge_weight(x, y, transmission_weight)
     else:
         try:
             trans_rate_fxn = lambda x, y: tau*G.edges[x,y][transmission_weight]
@@ -85,6 +90,8 @@ def _get_rate_functions_(G, tau, gamma, transmission_weight = None,
 
     if recovery_weight is None:
         rec_rate_fxn = lambda x : gamma
+    elif isinstance(G, EoN.CompiledGraph):
+        rec_rate_fxn = lambda x : gamma*G.node_weight(x, recovery_weight)
     else:
         rec_rate_fxn = lambda x : gamma*G.node[x][recovery_weight]
 
@@ -1,7 +1,12 @@
 import networkx as nx
 import EoN
 import scipy
+import numpy as np
+import random
+import multiprocessing
+import inspect
 import matplotlib.pyplot as plt
+from collections import Counter
 
 def subsample(report_times, times, status1, status2=None, 
                 status3 = None):
@@ -191,3 +196,530 @@ def get_time_shift(times, L, threshold):
     return t
 
 
+
+
+class EnsembleStatistics(object):
+    r'''
+    Accumulates statistics of many simulations, one simulation at a time, 
+    without storing the simulations.
+
+    Each simulation is added with `add(times, S, I, R)` (or however many 
+    statuses the simulation returns).  The statuses are subsampled at 
+    report_times and used to update
+
+    - the running mean and variance at each report time (Welford's 
+      algorithm),
+    - a quantile sketch at each report time: the values are counted in 
+      logarithmically spaced bins, so any quantile can be found later 
+      with relative error at most `relative_accuracy` (as in DDSketch),
+    - a histogram (Counter) of the final value of each status, and
+    - a histogram (Counter) of the peak value of each status.
+
+    The memory needed depends on the number of report times (and the
+    range of values), but not on the number of simulations or their 
+    length.  Two EnsembleStatistics with the same report_times (for 
+    example from different processes) can be combined with `merge`.
+
+    :Arguments: 
+
+    **report_times** iterable (ordered)
+        times at which we want to know the state of the system.  
+
+    **statuses** iterable of strings (default None)
+        names of the statuses.  If None, they are 'S', 'I' and 'R' (or just
+        'S' and 'I'), depending on how many are given to the first `add`.
+
+    **relative_accuracy** number (default 0.01)
+        relative accuracy of the quantiles.  
+
+    :Attributes:
+
+    **n** integer
+        number of simulations added
+
+    **final_histogram** dict
+        `final_histogram[status]` is a Counter giving the number of 
+        simulations with each final value of status.  For SIR simulations,
+        `final_histogram['R']` is the distribution of final sizes.
+
+    **peak_histogram** dict
+        `peak_histogram[status]` is a Counter giving the number of 
+        simulations with each maximum value of status (over the whole 
+        simulation, not just the report times).
+        
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        import numpy as np
+        import matplotlib.pyplot as plt
+        
+        G = nx.fast_gnp_random_graph(10000, 0.001)
+        report_times = np.linspace(0, 10, 101)
+        stats = EoN.EnsembleStatistics(report_times)
+        for counter in range(10000):
+            t, S, I, R = EoN.fast_SIR(G, 0.5, 1., rho = 0.001)
+            stats.add(t, S, I, R)
+        plt.plot(report_times, stats.mean('I'))
+        plt.plot(report_times, stats.quantile('I', 0.95))
+        sizes, counts = zip(*sorted(stats.final_histogram['R'].items()))
+    '''
+    def __init__(self, report_times, statuses = None, relative_accuracy = 0.01):
+        self.report_times = np.asarray(report_times, dtype = float)
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma_ = np.log((1+relative_accuracy)/(1-relative_accuracy))
+        self.n = 0
+        self.statuses = None
+        if statuses is not None:
+            self._setup_(list(statuses))
+
+    def _setup_(self, statuses):
+        T = len(self.report_times)
+        self.statuses = statuses
+        self._mean_ = {status: np.zeros(T) for status in statuses}
+        self._M2_ = {status: np.zeros(T) for status in statuses}
+        #_bins_[status][i, k] counts values at report_times[i] in bin 
+        #k + _offset_[status].  Bin j holds values in (gamma^(j-1), gamma^j].
+        #Zeros are counted separately in _zeros_.
+        self._bins_ = {status: np.zeros((T, 0), dtype = np.int64) 
+                        for status in statuses}
+        self._offset_ = {status: 0 for status in statuses}
+        self._zeros_ = {status: np.zeros(T, dtype = np.int64) 
+                        for status in statuses}
+        self.final_histogram = {status: Counter() for status in statuses}
+        self.peak_histogram = {status: Counter() for status in statuses}
+
+    def _grow_bins_(self, status, low, high):
+        r'''makes sure bins low to high (inclusive) exist for status'''
+        bins = self._bins_[status]
+        offset = self._offset_[status]
+        if bins.shape[1] == 0:
+            self._bins_[status] = np.zeros((bins.shape[0], high-low+1), 
+                                            dtype = np.int64)
+            self._offset_[status] = low
+            return
+        before = max(0, offset - low)
+        after = max(0, high - (offset + bins.shape[1] - 1))
+        if before or after:
+            self._bins_[status] = np.pad(bins, ((0, 0), (before, after)),
+                                            mode = 'constant')
+            self._offset_[status] = offset - before
+
+    def _add_to_sketch_(self, status, values):
+        positive = values > 0
+        self._zeros_[status] += ~positive
+        if positive.any():
+            rows = np.flatnonzero(positive)
+            keys = np.ceil(np.log(values[rows])/self._log_gamma_).astype(np.int64)
+            self._grow_bins_(status, keys.min(), keys.max())
+            self._bins_[status][rows, keys - self._offset_[status]] += 1
+
+    def add(self, times, *statuses):
+        r'''
+        Adds the output of a simulation.
+
+        :Arguments:
+
+        **times** iterable (ordered)
+            times at which the system state changes (as returned by the
+            simulations).  times[0] must not be after report_times[0].
+
+        **statuses** iterables
+            number of nodes in each status at the corresponding times.
+        '''
+        if self.statuses is None:
+            if len(statuses) not in (2, 3):
+                raise EoN.EoNError("statuses must be named if there are not 2 or 3")
+            self._setup_(list('SIR'[:len(statuses)]))
+        elif len(statuses) != len(self.statuses):
+            raise EoN.EoNError("expected {} statuses".format(len(self.statuses)))
+        times = np.asarray(times, dtype = float)
+        if self.report_times[0] < times[0]:
+            raise EoN.EoNError("report_times[0]<times[0]")
+        observation = np.searchsorted(times, self.report_times, side = 'right')-1
+        self.n += 1
+        for status, values in zip(self.statuses, statuses):
+            values = np.asarray(values)
+            self.final_histogram[status][values[-1].item()] += 1
+            self.peak_histogram[status][values.max().item()] += 1
+            values = values[observation].astype(float)
+            delta = values - self._mean_[status]
+            self._mean_[status] += delta/self.n
+            self._M2_[status] += delta*(values - self._mean_[status])
+            self._add_to_sketch_(status, values)
+
+    def merge(self, other):
+        r'''
+        Adds the simulations accumulated in other (which must have the same
+        report_times and statuses) into this one.
+        '''
+        if other.n == 0:
+            return
+        if not np.array_equal(self.report_times, other.report_times):
+            raise EoN.EoNError("report_times must be the same to merge")
+        if self.statuses is None:
+            self._setup_(list(other.statuses))
+        elif self.statuses != other.statuses:
+            raise EoN.EoNError("statuses must be the same to merge")
+        n = self.n + other.n
+        for status in self.statuses:
+            #Chan et al.'s parallel update of mean and variance
+            delta = other._mean_[status] - self._mean_[status]
+            self._M2_[status] += other._M2_[status] + delta**2*self.n*other.n/n
+            self._mean_[status] += delta*other.n/n
+            self._zeros_[status] += other._zeros_[status]
+            bins = other._bins_[status]
+            if bins.shape[1]:
+                low = other._offset_[status]
+                self._grow_bins_(status, low, low + bins.shape[1] - 1)
+                start = low - self._offset_[status]
+                self._bins_[status][:, start:start+bins.shape[1]] += bins
+            self.final_histogram[status].update(other.final_histogram[status])
+            self.peak_histogram[status].update(other.peak_histogram[status])
+        self.n = n
+
+    def mean(self, status):
+        r'''returns scipy array of the mean of status at each report time'''
+        return self._mean_[status].copy()
+
+    def variance(self, status):
+        r'''returns scipy array of the sample variance of status at each 
+        report time'''
+        if self.n < 2:
+            return np.zeros(len(self.report_times))
+        return self._M2_[status]/(self.n-1)
+
+    def quantile(self, status, q):
+        r'''returns scipy array of the q quantile (0<=q<=1) of status at each
+        report time (with relative error at most relative_accuracy)'''
+        if self.n == 0:
+            raise EoN.EoNError("no simulations have been added")
+        rank = q*(self.n-1)
+        zeros = self._zeros_[status]
+        bins = self._bins_[status]
+        result = np.zeros(len(self.report_times))
+        if bins.shape[1] == 0:
+            return result
+        cumulative = zeros[:, None] + np.cumsum(bins, axis = 1)
+        index = (cumulative <= rank).sum(axis = 1)
+        index = np.minimum(index, bins.shape[1]-1)
+        gamma = np.exp(self._log_gamma_)
+        values = 2*gamma**(index + self._offset_[status])/(gamma+1)
+        return np.where(zeros > rank, 0., values)
+
+    def summary(self, quantiles = (0.05, 0.5, 0.95)):
+        r'''returns a dict whose keys are the statuses.  For each status
+        the value is a dict with `'mean'`, `'variance'` and `'quantiles'` 
+        (itself a dict mapping each of quantiles to a scipy array).'''
+        return {status: {'mean': self.mean(status),
+                            'variance': self.variance(status),
+                            'quantiles': {q: self.quantile(status, q) 
+                                            for q in quantiles}}
+                    for status in self.statuses}
+
+
+#The graph used by run_ensemble.  Each worker process gets it once when the
+#pool is created (rather than with every task).
+_ensemble_graph_ = None
+
+def _init_ensemble_worker_(G):
+    global _ensemble_graph_
+    _ensemble_graph_ = G
+
+def _run_ensemble_chunk_(engine, seeds, report_times, kwargs):
+    r'''Runs a simulation on _ensemble_graph_ for each SeedSequence in seeds
+    and returns an EnsembleStatistics of the results.  The global 
+    generators are reseeded for each simulation, and put back afterwards 
+    (with workers=1 this runs in the caller's process).'''
+    statistics = EnsembleStatistics(report_times)
+    global_state = (random.getstate(), np.random.get_state())
+    try:
+        for seed in seeds:
+            #the global generators are only for user-defined functions
+            state = seed.generate_state(2)
+            random.seed(int(state[0]))
+            np.random.seed(int(state[1]))
+            output = engine(_ensemble_graph_, 
+                            rng = np.random.default_rng(seed), **kwargs)
+            statistics.add(*output)
+    finally:
+        random.setstate(global_state[0])
+        np.random.set_state(global_state[1])
+    return statistics
+
+def run_ensemble(engine, G, n_runs, report_times, workers = None, 
+                    quantiles = (0.05, 0.5, 0.95), seed = None, 
+                    return_statistics = False, **kwargs):
+    r'''
+    Runs many simulations in parallel and returns the mean, variance and 
+    quantiles of the number of nodes in each status at report_times.
+    
+    The simulations are split into chunks which are sent to a pool of 
+    worker processes.  G is sent to each worker once, when the pool is 
+    created, rather than with each task.  Each worker accumulates its 
+    simulations in an EnsembleStatistics as they finish (so the individual
+    simulations are never stored) and these are merged at the end.
+
+    :Arguments: 
+
+    **engine** function
+        the simulation to run, for example `EoN.fast_SIR` or 
+        `EoN.Gillespie_SIS`.  It is called as `engine(G, rng=rng, **kwargs)` and 
+        should return `times, S, I` or `times, S, I, R`.  It must be 
+        picklable (any function defined at the top level of a module is).
+        
+    **G** networkx Graph or CompiledGraph
+        The underlying network.  
+        
+    **n_runs** positive integer
+        number of simulations
+        
+    **report_times** iterable (ordered)
+        times at which we want to know the state of the system.  
+        report_times[0] must not be earlier than tmin.
+        
+    **workers** positive integer (default None)
+        number of worker processes.  If None, the number of CPUs.  If 1 the
+        simulations are done in this process.
+        
+    **quantiles** iterable of numbers in [0,1] (default (0.05, 0.5, 0.95))
+        the quantiles to calculate at each report time (to within 1%, see
+        EnsembleStatistics).
+        
+    **seed** integer or numpy SeedSequence (default None)
+        if given, the results are reproducible, and the same whatever the
+        number of workers (the quantiles and histograms exactly, the means
+        and variances up to floating point rounding, since these are summed
+        in chunks of different sizes).  Each simulation is given its own 
+        independent numpy Generator as `rng`, from `SeedSequence(seed).spawn`.  
+        `random` and `numpy.random` are also seeded from it before each 
+        simulation, for any user-defined functions that use them.
+        
+    **return_statistics** boolean (default False)
+        if True, the EnsembleStatistics object is returned instead (this 
+        also has histograms of final and peak values).
+        
+    **kwargs** keyword arguments
+        passed on to engine, for example `tau`, `gamma`, `tmax`, 
+        `initial_infecteds`.
+        
+    :Returns: 
+        
+    **results** dict
+        `results[status]` for each status 'S', 'I' (and 'R' if the engine 
+        returns it) is a dict with
+
+        - `'mean'`: scipy array of the mean at each report time
+        - `'variance'`: scipy array of the (sample) variance
+        - `'quantiles'`: dict mapping each of `quantiles` to a scipy array.
+        
+    or if `return_statistics is True`
+    
+    **statistics** EnsembleStatistics
+        
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        import numpy as np
+        import matplotlib.pyplot as plt
+        
+        G = EoN.CompiledGraph(nx.fast_gnp_random_graph(100000, 0.0001))
+        report_times = np.linspace(0, 10, 101)
+        results = EoN.run_ensemble(EoN.fast_SIR, G, 1000, report_times, 
+                                    tau = 0.3, gamma = 1., rho = 0.001)
+        I = results['I']
+        plt.plot(report_times, I['mean'])
+        plt.fill_between(report_times, I['quantiles'][0.05], 
+                            I['quantiles'][0.95], alpha = 0.3)
+    '''
+    if 'return_full_data' in kwargs:
+        raise EoN.EoNError("run_ensemble cannot return full data")
+    if 'rng' in kwargs:
+        raise EoN.EoNError("run_ensemble gives each simulation its own rng; use seed")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    report_times = np.asarray(report_times, dtype = float)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(n_runs)
+    n_chunks = min(n_runs, 4*workers)
+    #starmap keeps the order of the chunks, so they are merged in the order 
+    #of seeds whatever the number of workers.
+    tasks = [(engine, seeds[start*n_runs//n_chunks:(start+1)*n_runs//n_chunks],
+                report_times, kwargs) for start in range(n_chunks)]
+
+    if workers == 1:
+        _init_ensemble_worker_(G)
+        try:
+            chunks = [_run_ensemble_chunk_(*task) for task in tasks]
+        finally:
+            _init_ensemble_worker_(None)
+    else:
+        with multiprocessing.Pool(workers, initializer = _init_ensemble_worker_,
+                                    initargs = (G,)) as pool:
+            chunks = pool.starmap(_run_ensemble_chunk_, tasks, chunksize = 1)
+    statistics = EnsembleStatistics(report_times)
+    for chunk in chunks:
+        statistics.merge(chunk)
+    if return_statistics:
+        return statistics
+    return statistics.summary(quantiles)
+
+def _run_prob_size_chunk_(estimator, seeds, kwargs):
+    r'''Calls estimator on _ensemble_graph_ for each SeedSequence in seeds 
+    and returns the list of the (PE, AR) it gives.  As in 
+    _run_ensemble_chunk_, the global generators are put back afterwards.'''
+    try:
+        takes_rng = 'rng' in inspect.signature(estimator).parameters
+    except (TypeError, ValueError):
+        takes_rng = False
+    estimates = []
+    global_state = (random.getstate(), np.random.get_state())
+    try:
+        for seed in seeds:
+            #the global generators are only for user-defined functions
+            state = seed.generate_state(2)
+            random.seed(int(state[0]))
+            np.random.seed(int(state[1]))
+            if takes_rng:
+                estimates.append(estimator(_ensemble_graph_, 
+                                            rng = np.random.default_rng(seed), 
+                                            **kwargs))
+            else:
+                estimates.append(estimator(_ensemble_graph_, **kwargs))
+    finally:
+        random.setstate(global_state[0])
+        np.random.set_state(global_state[1])
+    return estimates
+
+def run_prob_size_ensemble(estimator, G, n_samples = 100, workers = None, 
+                            seed = None, tolerance = None, max_samples = 10000,
+                            return_samples = False, **kwargs):
+    r'''
+    Repeats a percolation-based estimate of the probability and attack rate
+    of epidemics in parallel, and returns the means and their standard 
+    errors.
+
+    A single call of, for example, `estimate_directed_SIR_prob_size` gives 
+    the estimate from a single percolation of the network, which is noisy 
+    (particularly for small networks or near threshold).  This averages
+    many independent ones.  As in `run_ensemble`, G is sent to each worker
+    process once, when the pool is created, rather than with each task.
+
+    :Arguments: 
+
+    **estimator** function
+        for example `EoN.estimate_directed_SIR_prob_size` or 
+        `EoN.estimate_nonMarkov_SIR_prob_size`.  It is called as 
+        `estimator(G, **kwargs)` (with `rng` as well if it takes an rng 
+        argument) and returns `PE, AR`.  It must be picklable, as must 
+        any functions in kwargs (any function defined at the top level of a
+        module is).
+        
+    **G** networkx Graph or CompiledGraph
+        The underlying network.  A CompiledGraph is much faster for the 
+        estimators that accept one.
+        
+    **n_samples** positive integer (default 100)
+        number of percolations.  If tolerance is given, they are done in 
+        rounds of n_samples.
+        
+    **workers** positive integer (default None)
+        number of worker processes.  If None, the number of CPUs.  If 1 the
+        estimates are done in this process.
+        
+    **seed** integer or numpy SeedSequence (default None)
+        if given, the results are reproducible, and identical whatever the
+        number of workers.  Each percolation has its own random numbers 
+        from `SeedSequence(seed).spawn` (given as `rng` if estimator takes
+        it, and used to seed `random` and `numpy.random` for any 
+        user-defined functions).
+        
+    **tolerance** positive number (default None)
+        if given, rounds of n_samples are added until the standard errors of
+        both PE and AR are at most tolerance, or there are max_samples.
+        
+    **max_samples** positive integer (default 10000)
+        the most percolations done if tolerance is given.
+
+    **return_samples** boolean (default False)
+        if True, the array of the individual estimates is also returned.
+        
+    **kwargs** keyword arguments
+        passed on to estimator, for example `tau` and `gamma`.
+        
+    :Returns: 
+        
+    **PE, AR, PE_error, AR_error**  numbers
+        the means of the estimates of the probability and attack rate of 
+        epidemics, and their standard errors (so PE +- 1.96 PE_error is an
+        approximate 95% confidence interval).
+        
+    or if `return_samples is True`
+
+    **PE, AR, PE_error, AR_error, samples**
+        where samples is an array with a row (PE, AR) for each percolation.
+        
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        
+        G = EoN.CompiledGraph(nx.fast_gnp_random_graph(100000, 0.00003))
+        PE, AR, PE_error, AR_error = EoN.run_prob_size_ensemble(
+                                        EoN.estimate_directed_SIR_prob_size, G,
+                                        tolerance = 0.002, tau = 1, gamma = 1)
+    '''
+    if 'rng' in kwargs:
+        raise EoN.EoNError("run_prob_size_ensemble gives each estimate its own rng; use seed")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    def do_round(run_chunks, count):
+        seeds = seed.spawn(count)
+        n_chunks = min(count, 4*workers)
+        #starmap keeps the order of the chunks, so the samples are in the 
+        #order of seeds whatever the number of workers.
+        tasks = [(estimator, seeds[start*count//n_chunks:(start+1)*count//n_chunks], 
+                    kwargs) for start in range(n_chunks)]
+        return [estimate for chunk in run_chunks(tasks) for estimate in chunk]
+        
+    def estimate_all(run_chunks):
+        samples = do_round(run_chunks, n_samples)
+        while tolerance is not None and len(samples) < max_samples:
+            errors = np.std(samples, axis = 0, ddof = 1)/np.sqrt(len(samples))
+            if len(samples) > 1 and np.all(errors <= tolerance):
+                break
+            samples.extend(do_round(run_chunks, 
+                                    min(n_samples, max_samples - len(samples))))
+        return np.array(samples, dtype = float)
+
+    if workers == 1:
+        _init_ensemble_worker_(G)
+        try:
+            samples = estimate_all(lambda tasks: [_run_prob_size_chunk_(*task) 
+                                                    for task in tasks])
+        finally:
+            _init_ensemble_worker_(None)
+    else:
+        with multiprocessing.Pool(workers, initializer = _init_ensemble_worker_,
+                                    initargs = (G,)) as pool:
+            samples = estimate_all(lambda tasks: pool.starmap(_run_prob_size_chunk_, 
+                                                        tasks, chunksize = 1))
+    PE, AR = samples.mean(axis = 0).tolist()
+    if len(samples) > 1:
+        PE_error, AR_error = (samples.std(axis = 0, ddof = 1)/np.sqrt(len(samples))).tolist()
+    else:
+        PE_error, AR_error = float('Inf'), float('Inf')
+    if return_samples:
+        return PE, AR, PE_error, AR_error, samples
+    return PE, AR, PE_error, AR_error
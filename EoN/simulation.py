@@ -1,7 +1,17 @@
 import networkx as nx
 import random
+import copy
 import heapq
+import bisect
+import functools
+import array
+import numbers
+import itertools
 import scipy
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+import scipy.stats
 import EoN
 from collections import defaultdict
 from collections import Counter
@@ -14,17 +24,244 @@ from collections import Counter
 
 
 
-def _truncated_exponential_(rate, T):
+class _GlobalRNG_(object):
+    r'''The source of random numbers for a simulation that is not given 
+    rng: the functions of Python's `random` module, and numpy's global 
+    generator for binomial.  So with a given `random.seed` the results are 
+    as they were before rng was introduced.
+
+    The simulations only use the methods random, expovariate, choice, 
+    sample and binomial, with the meanings they have in the `random` module 
+    (and numpy for binomial).  Vectorized code draws arrays from 
+    `generator`, which is numpy's global generator.'''
+    generator = np.random
+    expovariate = staticmethod(random.expovariate)
+    choice = staticmethod(random.choice)
+    random = staticmethod(random.random)
+
+    @staticmethod
+    def sample(population, k):
+        #random.sample no longer accepts sets or networkx node views.
+        if not isinstance(population, (list, tuple, range)):
+            population = list(population)
+        return random.sample(population, k)
+
+    @staticmethod
+    def binomial(n, p):
+        return np.random.binomial(n, p)
+
+_global_rng_ = _GlobalRNG_()
+
+class _GeneratorRNG_(object):
+    r'''Gives the methods of _GlobalRNG_, drawing only from the numpy 
+    Generator `generator`.  Nothing global is used, so simulations in 
+    different threads do not interfere with each other.
+
+    Asking a Generator for one number at a time costs about as much as 
+    asking for hundreds, so uniform and exponential variates are drawn in
+    blocks of block_size and handed out one at a time.  The Generator is 
+    therefore advanced further than the numbers actually used, but the 
+    output is still determined by its initial state.'''
+    def __init__(self, generator, block_size = 1024):
+        self.generator = generator
+        self.block_size = block_size
+        self._uniforms_ = iter(())
+        self._exponentials_ = iter(())
+
+    def random(self):
+        try:
+            return next(self._uniforms_)
+        except StopIteration:
+            self._uniforms_ = iter(self.generator.random(self.block_size).tolist())
+            return next(self._uniforms_)
+
+    def expovariate(self, rate):
+        try:
+            return next(self._exponentials_)/rate
+        except StopIteration:
+            self._exponentials_ = iter(self.generator.standard_exponential(
+                                                self.block_size).tolist())
+            return next(self._exponentials_)/rate
+
+    def choice(self, seq):
+        return seq[int(self.random()*len(seq))]
+
+    def sample(self, population, k):
+        r'''k distinct entries of population, in random order.'''
+        if not isinstance(population, (list, tuple, range)):
+            population = list(population)
+        n = len(population)
+        if not 0 <= k <= n:
+            raise ValueError("sample larger than population")
+        if 4*k <= n:  #pick indices, rejecting repeats
+            selected = set()
+            result = []
+            while len(result) < k:
+                index = int(self.random()*n)
+                if index not in selected:
+                    selected.add(index)
+                    result.append(population[index])
+            return result
+        pool = list(population) #partial Fisher-Yates shuffle
+        for index in range(k):
+            other = index + int(self.random()*(n-index))
+            pool[index], pool[other] = pool[other], pool[index]
+        return pool[:k]
+
+    def binomial(self, n, p):
+        return int(self.generator.binomial(n, p))
+
+def _get_rng_(rng):
+    r'''returns the source of random numbers for the rng argument of a 
+    simulation.  rng is None (use the global generators), an integer or a 
+    numpy SeedSequence (to seed a new numpy Generator), a numpy Generator, 
+    or something _get_rng_ already returned (so that functions calling 
+    each other share the same stream).'''
+    if rng is None:
+        return _global_rng_
+    elif isinstance(rng, (_GlobalRNG_, _GeneratorRNG_)):
+        return rng
+    elif isinstance(rng, np.random.Generator):
+        return _GeneratorRNG_(rng)
+    else:
+        return _GeneratorRNG_(np.random.default_rng(rng))
+
+def _truncated_exponential_(rate, T, rng = _global_rng_):
     r'''returns a number between 0 and T from an
     exponential distribution conditional on the outcome being between 0 and T'''
-    t = random.expovariate(rate)
+    t = rng.expovariate(rate)
     L = int(t/T)
     return t - L*T
    
+class _Calendar_(object):
+    r'''
+    A calendar (bucket) queue, used in place of a heapq list by myQueue and
+    _EventQueue_ when they are created with `queue='calendar'`.  It holds 
+    tuples whose first entry is the time, and pops them in sorted order.
+
+    Time is divided into buckets of width `width`.  The entries of the 
+    bucket currently being worked through are kept as a heap.  Entries
+    falling in later buckets are simply appended to an (unsorted) list for 
+    their bucket, and the bucket is only heapified when the queue reaches 
+    it.  There is also a heap of the indices of nonempty later buckets.
+    So with `n` pending events and about `target` events per bucket, a 
+    push costs O(1) if it lands in a later bucket and O(log target) if it
+    lands in the current bucket, instead of O(log n) for a heap.
+
+    Unless `width` is given, it is adaptive: it starts as a plain heap and 
+    once the queue is large, the width is chosen so that a bucket holds 
+    about `target` events given the current spread of pending times.  The
+    width is recalculated whenever the queue has grown or shrunk by a 
+    factor of 4 since the last calculation, or a bucket turns out to be 
+    much fuller than expected.
+    '''
+    def __init__(self, width = None, target = 32, min_size = 1024):
+        self._fixed_ = width is not None
+        self._inv_width_ = 1./width if self._fixed_ else 0.
+        self._target_ = target
+        self._min_size_ = min_size
+        self._current_ = []     #heap of entries in the current bucket
+        self._current_index_ = 0
+        self._buckets_ = {}     #bucket index -> unsorted list of entries
+        self._bucket_heap_ = [] #heap of keys of _buckets_
+        self._len_ = 0
+        self._sized_at_ = min_size
+
+    def __len__(self):
+        return self._len_
+
+    def push(self, entry):
+        b = int(entry[0]*self._inv_width_)
+        if b <= self._current_index_:
+            heapq.heappush(self._current_, entry)
+        else:
+            bucket = self._buckets_.get(b)
+            if bucket is None:
+                self._buckets_[b] = [entry]
+                heapq.heappush(self._bucket_heap_, b)
+            else:
+                bucket.append(entry)
+        self._len_ += 1
+        if self._len_ > 4*self._sized_at_ and not self._fixed_:
+            self.rebuild(self.entries())
+
+    def pop(self):
+        while not self._current_:
+            b = heapq.heappop(self._bucket_heap_)
+            self._current_ = self._buckets_.pop(b)
+            self._current_index_ = b
+            heapq.heapify(self._current_)
+            if len(self._current_) > 16*self._target_ and not self._fixed_:
+                self.rebuild(self.entries())
+        entry = heapq.heappop(self._current_)
+        self._len_ -= 1
+        if 4*self._len_ < self._sized_at_ and self._sized_at_ > self._min_size_:
+            self.rebuild(self.entries())
+        return entry
+
+    def entries(self):
+        r'''returns a list of all the entries (in no particular order)'''
+        entries = list(self._current_)
+        for bucket in self._buckets_.values():
+            entries.extend(bucket)
+        return entries
+
+    def rebuild(self, entries):
+        r'''replaces the contents with entries, recalculating the bucket 
+        width if it is adaptive.'''
+        n = len(entries)
+        self._sized_at_ = max(n, self._min_size_)
+        if not self._fixed_:
+            self._inv_width_ = 0.
+            if n >= self._min_size_:
+                times = np.fromiter((entry[0] for entry in entries), 
+                                    dtype = float, count = n)
+                low, high = np.percentile(times, [10, 90])
+                if high > low:
+                    self._inv_width_ = 0.8*n/(self._target_*(high-low))
+        inv_width = self._inv_width_
+        self._buckets_ = {}
+        self._len_ = n
+        if n == 0:
+            self._current_ = []
+            self._bucket_heap_ = []
+            return
+        self._current_index_ = int(min(entry[0] for entry in entries)*inv_width)
+        current = []
+        for entry in entries:
+            b = int(entry[0]*inv_width)
+            if b <= self._current_index_:
+                current.append(entry)
+            else:
+                bucket = self._buckets_.get(b)
+                if bucket is None:
+                    self._buckets_[b] = [entry]
+                else:
+                    bucket.append(entry)
+        heapq.heapify(current)
+        self._current_ = current
+        self._bucket_heap_ = list(self._buckets_)
+        heapq.heapify(self._bucket_heap_)
+
+def _priority_queue_(queue):
+    r'''returns `(storage, push, pop)` for the priority queue backend named
+    by queue (either 'heap' or 'calendar').  storage supports len, and push
+    and pop add and remove entries.'''
+    if queue == 'heap':
+        storage = []
+        return storage, functools.partial(heapq.heappush, storage), \
+                functools.partial(heapq.heappop, storage)
+    elif queue == 'calendar':
+        storage = _Calendar_()
+        return storage, storage.push, storage.pop
+    else:
+        raise EoN.EoNError("queue must be 'heap' or 'calendar'")
+
 class myQueue(object):
     r'''
     This class is used to store and act on a priority queue of events for 
-    event-driven simulations.  It is based on heapq.
+    event-driven simulations.  It is based on heapq (or on _Calendar_ if 
+    queue is 'calendar').
 
     Each queue is given a tmax (default is infinity) so that any event at later 
     time is ignored.
@@ -45,47 +282,165 @@ class myQueue(object):
     Previously I used a class of events, but sorting using the __lt__ function 
     I wrote was significantly slower than simply using tuples.
     '''
-    def __init__(self, tmax=float("Inf")):
-        self._Q_ = []
+    def __init__(self, tmax=float("Inf"), queue = 'heap'):
+        self._Q_, self._push_, self._pop_ = _priority_queue_(queue)
         self.tmax=tmax
         self.counter = 0 #tie-breaker for putting things in priority queue
     def add(self, time, function, args = ()):
         r'''time is the time of the event.  args are the arguments of the
         function not including the first argument which must be time'''
         if time<self.tmax:   
-            heapq.heappush(self._Q_, (time, self.counter, function, args))
+            self._push_((time, self.counter, function, args))
             self.counter += 1
     def pop_and_run(self):
-        r'''Pops the next event off the queue and performs the function'''
-        t, counter, function, args = heapq.heappop(self._Q_)
+        r'''Pops the next event off the queue and performs the function.  
+        Returns the time of the event.'''
+        t, counter, function, args = self._pop_()
         function(t, *args)
+        return t
     def __len__(self): 
         r'''this will allow us to use commands like "while Q:" '''
         return len(self._Q_)
         
         
+class _EventQueue_(object):
+    r'''
+    A priority queue of typed events used by the simulations on a 
+    CompiledGraph.  It plays the role of myQueue, but rather than storing a
+    function and a tuple of arguments for each event, an event is just
+    `(time, event_type, source, target)` where event_type is a small integer
+    code and source and target are node indices.  The engine pops events and
+    does the dispatch itself.
+
+    The records are held in parallel arrays (event_type in a bytearray, 
+    source and target in arrays of 64-bit integers) and the heap holds only
+    `(time, serial, slot)`, where slot is the position of the record in 
+    those arrays.  Slots are reused once their event is popped or cancelled.
+    serial breaks ties in time in the order the events were added (exactly 
+    as `counter` does in myQueue).
+
+    push returns a token which can be given to cancel to remove the event.
+    Cancellation is lazy: the record's slot is freed at once, but its heap
+    entry stays until it reaches the top (where it is recognized as stale 
+    because the serial stored for its slot no longer matches) or until 
+    more than half of the heap is stale, at which point the heap is 
+    rebuilt from the live entries.  So the cost of a cancelled event is
+    O(1) and the heap never holds more than twice the live events.
+
+    As in myQueue, any event at time tmax or later is ignored.  A source of
+    None is stored as -1.  queue is 'heap' or 'calendar' as for myQueue.
+    '''
+    def __init__(self, tmax=float("Inf"), queue = 'heap'):
+        self._Q_, self._push_, self._pop_ = _priority_queue_(queue)
+        self.tmax = tmax
+        self.counter = 0
+        self._type_ = bytearray()
+        self._source_ = array.array('q')
+        self._target_ = array.array('q')
+        self._serial_ = array.array('q') #serial of the event in each slot, -1 if free
+        self._free_ = []
+        self._stale_ = 0 #number of heap entries that have been cancelled
+
+    def push(self, time, event_type, source, target):
+        r'''adds the event (unless time is at least tmax) and returns a 
+        token for cancelling it.  Returns None if the event is ignored.'''
+        if time<self.tmax:
+            serial = self.counter
+            if self._free_:
+                slot = self._free_.pop()
+                self._type_[slot] = event_type
+                self._source_[slot] = source
+                self._target_[slot] = target
+                self._serial_[slot] = serial
+            else:
+                slot = len(self._type_)
+                self._type_.append(event_type)
+                self._source_.append(source)
+                self._target_.append(target)
+                self._serial_.append(serial)
+            self._push_((time, serial, slot))
+            self.counter += 1
+            return (serial << 32) | slot
+
+    def cancel(self, token):
+        r'''cancels the event with this token.  Returns True if the event 
+        was pending and False if it had already happened or been cancelled 
+        (or token is None).'''
+        if token is None:
+            return False
+        slot = token & 0xFFFFFFFF
+        if self._serial_[slot] != token >> 32:
+            return False
+        self._serial_[slot] = -1
+        self._free_.append(slot)
+        self._stale_ += 1
+        if 2*self._stale_ > len(self._Q_):
+            self._compact_()
+        return True
+
+    def _compact_(self):
+        r'''removes all cancelled entries from the heap'''
+        serials = self._serial_
+        if isinstance(self._Q_, list):
+            self._Q_[:] = [entry for entry in self._Q_ 
+                            if serials[entry[2]] == entry[1]]
+            heapq.heapify(self._Q_)
+        else:
+            self._Q_.rebuild([entry for entry in self._Q_.entries()
+                            if serials[entry[2]] == entry[1]])
+        self._stale_ = 0
+
+    def pop(self):
+        r'''removes the next event and returns 
+        `(time, event_type, source, target)`'''
+        serials = self._serial_
+        time, serial, slot = self._pop_()
+        while serials[slot] != serial: #cancelled
+            self._stale_ -= 1
+            time, serial, slot = self._pop_()
+        serials[slot] = -1
+        self._free_.append(slot)
+        return time, self._type_[slot], self._source_[slot], self._target_[slot]
+
+    def __len__(self):
+        r'''the number of pending events that have not been cancelled'''
+        return len(self._Q_) - self._stale_
+        
+#event codes for _EventQueue_
+_TRANS_EVENT_ = 0
+_REC_EVENT_ = 1
+_INTERVENTION_EVENT_ = 2
+
 class _ListDict_(object):
     r'''
-    The Gillespie algorithm with rejection-sampling will involve a step 
-    that samples a random element from a set.  This is slow in Python.  
-    So I'm introducing a new class based on a stack overflow answer by
+    The Gillespie algorithm will involve a step that samples a random 
+    element from a set.  This is slow in Python.  So I'm introducing a new 
+    class based on a stack overflow answer by
     Amber (http://stackoverflow.com/users/148870/amber) 
     for a question by
     tba (http://stackoverflow.com/users/46521/tba) 
     found at
     http://stackoverflow.com/a/15993515/2966723
+
+    If weighted, the weights are held in a binary sum tree aligned with 
+    `items`: `_tree_[_capacity_ + position]` is the weight of 
+    `items[position]` and every other entry is the sum of its two children,
+    so `_tree_[1]` is the total weight.  Adding or removing an item, 
+    changing its weight and choosing an item with probability proportional
+    to its weight are all O(log n), whatever the distribution of weights.  
+    The sums are recomputed from the children rather than incremented, so
+    the total weight does not drift through roundoff (it is exactly 0 when
+    nothing is left).
     '''
-    def __init__(self, weighted = False):
+    def __init__(self, weighted = False, rng = _global_rng_):
+        self.rng = rng
         self.item_to_position = {}
         self.items = []
 
         self.weighted = weighted
         if self.weighted:
-            self.weight = defaultdict(int) #presume all weights positive
-            self.max_weight = 0
-            self._total_weight = 0
-            self.max_weight_count = 0
-            
+            self._capacity_ = 1
+            self._tree_ = [0., 0.]
 
     def __len__(self):
         return len(self.items)
@@ -93,12 +448,32 @@ class _ListDict_(object):
     def __contains__(self, item):
         return item in self.item_to_position
 
-    def _update_max_weight(self):
-        C = Counter(self.weight.values())  #may be a faster way to do this, we only need to count the max.
-        self.max_weight = max(C.keys())
-        self.max_weight_count = C[self.max_weight]
+    def _set_weight_(self, position, weight):
+        tree = self._tree_
+        index = self._capacity_ + position
+        tree[index] = weight
+        index >>= 1
+        while index:
+            tree[index] = tree[2*index] + tree[2*index+1]
+            index >>= 1
+
+    def _grow_(self):
+        r'''doubles the number of leaves in the tree'''
+        old_capacity = self._capacity_
+        capacity = 2*old_capacity
+        tree = [0.]*capacity + self._tree_[old_capacity:] + [0.]*old_capacity
+        for index in range(capacity-1, 0, -1):
+            tree[index] = tree[2*index] + tree[2*index+1]
+        self._capacity_ = capacity
+        self._tree_ = tree
+
+    def weight(self, item):
+        return self._tree_[self._capacity_ + self.item_to_position[item]]
+
+    def set_weight(self, item, weight):
+        r'''sets the weight of item, which must already be present'''
+        self._set_weight_(self.item_to_position[item], weight)
 
-        
     def add(self, item, weight_increment = None):
         r'''
         If not present, then adds the thing (with weight if appropriate)
@@ -108,65 +483,55 @@ class _ListDict_(object):
             increments weight if already present, cannot overwrite weight.
         '''
         if weight_increment is not None: #will break if passing a weight to unweighted case
-            if weight_increment >0 or self.weight[item] != self.max_weight:
-                self.weight[item] = self.weight[item] + weight_increment
-                self._total_weight += weight_increment
-                if self.weight[item] > self.max_weight:
-                    self.max_weight_count = 1
-                    self.max_weight = self.weight[item]
-                elif self.weight[item] == self.max_weight:
-                    self.max_weight_count += 1
-            else: #it's a negative increment and was at max
-                self.max_weight_count -= 1
-                self.weight[item] = self.weight[item] + weight_increment
-                self._total_weight += weight_increment
-                self.max_weight_count -= 1 
-                if self.max_weight_count == 0:
-                    self._update_max_weight               
+            position = self.item_to_position.get(item)
+            if position is not None:
+                self._set_weight_(position, 
+                        self._tree_[self._capacity_ + position] + weight_increment)
+                return
         elif self.weighted:
             raise Exception('if weighted, must assign weight_increment')
 
         if item in self: #we've already got it, do nothing else
             return
+        position = len(self.items)
         self.items.append(item)
-        self.item_to_position[item] = len(self.items)-1
+        self.item_to_position[item] = position
+        if weight_increment is not None:
+            if position == self._capacity_:
+                self._grow_()
+            self._set_weight_(position, weight_increment)
 
     def remove(self, choice):
         position = self.item_to_position.pop(choice)
         last_item = self.items.pop()
-        if position != len(self.items):
+        last_position = len(self.items)
+        if position != last_position:
             self.items[position] = last_item
             self.item_to_position[last_item] = position
-            
+            if self.weighted:
+                self._set_weight_(position, 
+                            self._tree_[self._capacity_ + last_position])
         if self.weighted:
-            weight = self.weight.pop(choice)
-            self._total_weight -= weight
-            if weight == self.max_weight:  
-                #if we find ourselves in this case often
-                #it may be better just to let max_weight be the
-                #largest weight *ever* encountered, even if all remaining weights are less
-                #
-                self.max_weight_count -= 1
-                if self.max_weight_count == 0 and len(self)>0:
-                    self._update_max_weight()
+            self._set_weight_(last_position, 0.)
 
     def choose_random(self):
-        # r'''chooses a random node.  If there is a weight, it will use rejection
-        # sampling to choose a random node until it succeeds'''
+        r'''chooses a random item.  If weighted, with probability proportional
+        to its weight, by descending the sum tree.'''
         if self.weighted:
-            while True:
-                choice = random.choice(self.items)
-                if random.random() < self.weight[choice]/self.max_weight:
-                    break
-            # r = random.random()*self.total_weight
-            # for item in self.items:
-            #     r-= self.weight[item]
-            #     if r<0:
-            #         break
-            return choice
-
+            tree = self._tree_
+            capacity = self._capacity_
+            r = self.rng.random()*tree[1]
+            index = 1
+            while index < capacity:
+                index *= 2
+                #go right if r is beyond the left subtree (unless roundoff
+                #would take us into an empty right subtree)
+                if r >= tree[index] and tree[index+1] > 0:
+                    r -= tree[index]
+                    index += 1
+            return self.items[index - capacity]
         else:
-            return random.choice(self.items)
+            return self.rng.choice(self.items)
         
 
     def random_removal(self):
@@ -177,11 +542,560 @@ class _ListDict_(object):
 
     def total_weight(self):
         if self.weighted:
-            return self._total_weight
+            return self._tree_[1]
+        else:
+            return len(self.items)
+
+
+class _Recorder_(object):
+    r'''Used in place of one of the lists S, I, R when the simulation is 
+    only reporting at report_times.  It has the two list operations that
+    the simulations use (append and [-1]), but only the latest value is 
+    kept.'''
+    __slots__ = ('last',)
+    def __init__(self, value):
+        self.last = value
+    def append(self, value):
+        self.last = value
+    def __getitem__(self, index):
+        return self.last
+
+class _ReportTimes_(object):
+    r'''Used in place of the list times when the simulation is only 
+    reporting at report_times.  
+    
+    The simulations append the time of each event to times before the 
+    statuses are updated.  So when the time passes a report time, the 
+    _Recorder_ objects still hold the state just before the event, which is
+    the state at the report time.  This gives the same values as `subsample`
+    would from the full output.  Like the list, times[-1] is the time of 
+    the latest event.'''
+    def __init__(self, report_times, recorders, tmin):
+        self.last = tmin
+        self.report_times = np.asarray(report_times, dtype = float)
+        self._recorders_ = recorders
+        self._values_ = [[] for recorder in recorders]
+        self._next_ = 0 #index of the next report time
+        self._next_time_ = self.report_times[0] if len(self.report_times) else float('Inf')
+    def append(self, time):
+        self.last = time
+        if time > self._next_time_:
+            self._record_until_(time)
+    def __getitem__(self, index):
+        return self.last
+    def _record_until_(self, time):
+        r'''records the current state for all report times before time'''
+        stop = bisect.bisect_left(self.report_times, time, self._next_)
+        for values, recorder in zip(self._values_, self._recorders_):
+            values.extend([recorder.last]*(stop - self._next_))
+        self._next_ = stop
+        if stop < len(self.report_times):
+            self._next_time_ = self.report_times[stop]
+        else:
+            self._next_time_ = float('Inf')
+    def output(self, stop = None):
+        r'''records the final state at any remaining report times, and 
+        returns report_times and the statuses at those times.  If stop (the
+        _StoppingRule_ of the simulation) ended it early, the state is 
+        unknown at the report times after it stopped, and these get NaN.'''
+        if stop is None or stop.reason is None:
+            end = len(self.report_times)
+        else:
+            end = max(self._next_, bisect.bisect_right(self.report_times, stop.time))
+        remaining = len(self.report_times) - end
+        for values, recorder in zip(self._values_, self._recorders_):
+            values.extend([recorder.last]*(end - self._next_))
+            values.extend([float('nan')]*remaining)
+        self._next_ = len(self.report_times)
+        return (self.report_times,) + tuple(scipy.array(values) 
+                                            for values in self._values_)
+
+def _make_recorders_(report_times, tmin, *initial_values):
+    r'''returns `times, status1, status2, ...` for a simulation to record 
+    its output in.  If report_times is None these are lists, starting with
+    tmin and the initial values.  Otherwise they are a _ReportTimes_ and 
+    _Recorder_ objects.'''
+    if report_times is None:
+        return ([tmin],) + tuple([value] for value in initial_values)
+    if len(report_times) and report_times[0] < tmin:
+        raise EoN.EoNError("report_times[0]<tmin")
+    recorders = tuple(_Recorder_(value) for value in initial_values)
+    return (_ReportTimes_(report_times, recorders, tmin),) + recorders
+
+class _StoppingRule_(object):
+    r'''Built from the stop_when argument of the simulations.  It is called
+    after each event as `stop(t, S, I, R)` (or `stop(t, S, I)` for SIS) with
+    the current numbers in each status, and returns a true value (the 
+    reason for stopping) if the simulation should stop.  The reason is kept
+    in `reason` and the time in `time`.
+
+    stop_when is either a function, called the same way, whose return value
+    is used as the reason, or a dict of thresholds.  In the dict, a status 
+    'I' or 'R' (or 'infections', the cumulative number of infections 
+    including the initial infections) with value X means stop once it is at 
+    least X, and 'S' with value X means stop once S is at most X.  The 
+    reason is then the key that was reached.
+
+    Events at tmin (the initial infections of the event-driven simulations)
+    never stop the simulation.'''
+    def __init__(self, stop_when, statuses, tmin, initial_I = 0):
+        self.reason = None
+        self.time = None
+        self._tmin_ = tmin
+        self.infections = initial_I
+        self._last_I_ = initial_I
+        if callable(stop_when):
+            self._fxn_ = stop_when
+            self._thresholds_ = []
+            self._infection_threshold_ = None
+        else:
+            self._fxn_ = None
+            self._thresholds_ = []
+            self._infection_threshold_ = None
+            for key, value in stop_when.items():
+                if key == 'infections':
+                    self._infection_threshold_ = value
+                elif key in statuses:
+                    self._thresholds_.append((statuses.index(key), value, key))
+                else:
+                    raise EoN.EoNError("cannot stop on {}".format(key))
+
+    def __call__(self, t, *counts):
+        I = counts[1]
+        if I > self._last_I_:
+            self.infections += 1
+        self._last_I_ = I
+        if t <= self._tmin_:
+            return None
+        if self._fxn_ is not None:
+            reason = self._fxn_(t, *counts) or None
+        else:
+            reason = None
+            for index, value, key in self._thresholds_:
+                if (counts[index] <= value) if index == 0 else (counts[index] >= value):
+                    reason = key
+                    break
+            else:
+                if self._infection_threshold_ is not None and \
+                        self.infections >= self._infection_threshold_:
+                    reason = 'infections'
+        if reason is not None:
+            self.reason = reason
+            self.time = t
+        return reason
+
+def _final_output_(output, stop, state):
+    r'''adds the reason for stopping (if there is a stopping rule) and the 
+    final SimulationState (if it is not None) to the output of a 
+    simulation.'''
+    extras = ()
+    if stop is not None:
+        extras += (stop.reason,)
+    if state is not None:
+        extras += (state,)
+    if not extras:
+        return output
+    elif isinstance(output, tuple):
+        return output + extras
+    else:
+        return (output,) + extras
+
+class SimulationState(object):
+    r'''
+    The state of an SIR or SIS simulation when it ended.  This is returned 
+    by fast_SIR, fast_SIS, Gillespie_SIR and Gillespie_SIS if `return_state`
+    is True, and any of these can continue from it if it is passed as 
+    `initial_state`.  The parameters 
+    (tau, gamma, weights) of the continued simulation may differ from the 
+    original, so many futures can be branched from one shared history, for 
+    example to compare interventions that start when the epidemic reaches
+    some size (see `stop_when`).
+
+    Only the statuses of the nodes are kept, not the pending events.  For 
+    Markovian (exponentially distributed) transmission and recovery this 
+    loses nothing, because the time until each future event does not 
+    depend on how long it has been pending, so these are drawn afresh when
+    the simulation continues.  This is also what allows the parameters to 
+    change.  This is not true for fast_nonMarkov_SIR and fast_nonMarkov_SIS,
+    whose pending events depend on the history, so these raise an EoNError
+    if given `initial_state` or `return_state`.
+
+    It holds only lists of nodes and numbers, so it can be pickled.
+
+    :Attributes:
+
+    **t** number
+        the time of the last event of the simulation (if it was stopped by
+        `stop_when`, this is when it stopped).  Because the events are 
+        Markovian, the state holds from t until the next event, so the
+        continued simulation starts at t.
+
+    **infecteds** list
+        the nodes infected at time t.
+
+    **recovereds** list
+        the nodes recovered at time t (empty for SIS).
+
+    **SIR** boolean
+        whether it is from an SIR simulation.
+
+    **random_state** tuple
+        the states of Python's `random` module and of numpy's global random
+        number generator when the simulation ended.
+
+    **rng** 
+        if the simulation was given `rng`, a copy of its source of random 
+        numbers when the simulation ended (otherwise None).  Passing it as
+        `rng` to a continued simulation makes that reproducible.
+
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        import matplotlib.pyplot as plt
+
+        G = nx.fast_gnp_random_graph(100000, 5./100000)
+        t, S, I, R, reason, state = EoN.fast_SIR(G, 1., 1., rho = 0.001, 
+                                                stop_when = {'I': 2000},
+                                                return_state = True)
+        plt.plot(t, I, color = 'k')
+        for tau in [0.2, 0.4, 0.6]:
+            t, S, I, R = EoN.fast_SIR(G, tau, 1., initial_state = state)
+            plt.plot(t, I, label = str(tau))
+        plt.legend()
+    '''
+    def __init__(self, t, infecteds, recovereds = (), SIR = True, 
+                    random_state = None, rng = None):
+        self.t = t
+        self.infecteds = list(infecteds)
+        self.recovereds = list(recovereds)
+        self.SIR = SIR
+        self._status_ = dict.fromkeys(self.infecteds, 'I')
+        self._status_.update(dict.fromkeys(self.recovereds, 'R'))
+        if random_state is None:
+            random_state = (random.getstate(), np.random.get_state())
+        self.random_state = random_state
+        self.rng = rng
+
+    def __repr__(self):
+        return 'SimulationState(t={}, {} infected, {} recovered)'.format(
+                            self.t, len(self.infecteds), len(self.recovereds))
+
+    def status(self, node):
+        r'''returns the status ('S', 'I' or 'R') of node at time t'''
+        return self._status_.get(node, 'S')
+
+    def restore_random_state(self):
+        r'''sets Python's `random` module and numpy's global random number
+        generator back to their states at the end of the simulation, so 
+        that simulations continued from this state can be reproduced.'''
+        random.setstate(self.random_state[0])
+        np.random.set_state(self.random_state[1])
+
+def _simulation_state_(G, status, times, SIR, rng = _global_rng_):
+    r'''returns the SimulationState at the end of a simulation.  status is 
+    either a dict giving 'I' or 'R' for nodes that are not susceptible, or 
+    (for the compiled simulations) an int8 array with 1 for I and 2 for R.
+    In either case if G is a CompiledGraph it is indexed by node index.
+    times is the simulation's record of event times, so times[-1] is the 
+    time of the last event (the stopping time if stop_when stopped it).'''
+    t = times[-1]
+    if isinstance(status, np.ndarray):
+        infecteds = np.flatnonzero(status == 1).tolist()
+        recovereds = np.flatnonzero(status == 2).tolist()
+    else:
+        infecteds = [node for node in status if status[node] == 'I']
+        recovereds = [node for node in status if status[node] == 'R']
+    if isinstance(G, CompiledGraph):
+        infecteds = [G.label(index) for index in infecteds]
+        recovereds = [G.label(index) for index in recovereds]
+    return SimulationState(t, infecteds, recovereds, SIR = SIR, 
+                            rng = None if rng is _global_rng_ else copy.deepcopy(rng))
+
+def _resume_(initial_state, initial_infecteds, initial_recovereds, rho, SIR):
+    r'''returns tmin, initial_infecteds and initial_recovereds to continue a
+    simulation from the SimulationState initial_state.'''
+    if initial_infecteds is not None or initial_recovereds is not None \
+            or rho is not None:
+        raise EoN.EoNError("cannot define initial_state with initial_infecteds, initial_recovereds or rho")
+    if initial_state.recovereds and not SIR:
+        raise EoN.EoNError("cannot continue an SIS simulation from a state with recovered nodes")
+    return (initial_state.t, list(initial_state.infecteds), 
+            list(initial_state.recovereds))
+
+class CompiledGraph(object):
+    r'''
+    An integer-indexed copy of a contact network stored in compressed sparse
+    row (CSR) form.
+
+    The simulation code walks the network through `G.neighbors(...)` and
+    keys the node data by the node labels.  For a NetworkX graph this means
+    dict-of-dicts lookups and hashing arbitrary labels at every step, and on
+    large networks these dominate both the run time and the memory.  If the
+    same network is used for many simulations, it is better to compile it
+    once and pass the CompiledGraph to the simulation code in place of `G`.
+
+    The nodes are relabeled 0, 1, ..., N-1 in the order of `G.nodes()`.  The
+    neighbors of the node with index `i` are
+        `indices[indptr[i]:indptr[i+1]]`
+    (in increasing order) and any edge weights are held in arrays aligned 
+    with `indices`.  The simulations walk these positions directly, so an 
+    edge weight is read by position rather than looked up by its two ends.
+
+    The simulations take and return the original node labels (so
+    `initial_infecteds` and the output of `return_full_data=True` are in
+    terms of the labels of `G`), and any user-defined function that is
+    called once per node or edge during a simulation (for example 
+    `trans_time_fxn` in `fast_nonMarkov_SIR`) is called with the labels, 
+    as it would be for `G`.  Only the batched functions (see `batched` in
+    `discrete_SIR`), which are called with arrays, are given the integer
+    indices.  Use `label` and `index` to convert.
+
+    :Arguments:
+
+    **G** networkx Graph
+        The network to compile.
+    **edge_weights** string or iterable of strings (default empty)
+        The edge attributes to store (for example the `transmission_weight`
+        to be used in simulations).  Only the weights compiled here are
+        available to the simulations.
+    **node_weights** string or iterable of strings (default empty)
+        The node attributes to store (for example the `recovery_weight`).
+
+    :Attributes:
+
+    **indptr** numpy array of length N+1
+        the neighbors of node i are found between positions indptr[i] and
+        indptr[i+1] of `indices`
+    **indices** numpy array of length 2|E| (|E| if G is directed)
+        the concatenated neighbor lists.
+    **edge_weights** dict
+        `edge_weights[label]` is a numpy array aligned with `indices`.
+    **node_weights** dict
+        `node_weights[label]` is a numpy array of length N.
+
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+
+        G = nx.fast_gnp_random_graph(100000, 5./100000)
+        H = EoN.CompiledGraph(G)
+
+        for counter in range(1000):
+            t, S, I, R = EoN.fast_SIR(H, 1, 1, rho = 0.001)
+    '''
+    def __init__(self, G, edge_weights = (), node_weights = ()):
+        if isinstance(edge_weights, str):
+            edge_weights = (edge_weights,)
+        if isinstance(node_weights, str):
+            node_weights = (node_weights,)
+        self.directed = G.is_directed()
+        nodelist = list(G.nodes())
+        N = len(nodelist)
+        self._N_ = N
+        if nodelist == list(range(N)):
+            #no need to hold a dict (which for a large network is expensive)
+            self.nodelist = range(N)
+            self.node_index = None
+        else:
+            self.nodelist = nodelist
+            self.node_index = {node: index for index, node in enumerate(nodelist)}
+
+        index = self.index
+        if N < 2**31:
+            index_type = np.int32
+        else:
+            index_type = np.int64
+        self.indptr = np.zeros(N+1, dtype = np.int64)
+        self.indptr[1:] = np.cumsum([len(G.adj[u]) for u in nodelist])
+        indices = np.fromiter((index(v) for u in nodelist for v in G.adj[u]),
+                                dtype = index_type, count = self.indptr[-1])
+        #sort each neighbor list, so edge_position can bisect it.
+        rows = np.repeat(np.arange(N, dtype = np.int64), np.diff(self.indptr))
+        order = np.lexsort((indices, rows))
+        self.indices = indices[order]
+        self.edge_weights = {}
+        for label in edge_weights:
+            self.edge_weights[label] = np.fromiter(
+                                        (G.adj[u][v][label] for u in nodelist
+                                                            for v in G.adj[u]),
+                                        dtype = float, count = self.indptr[-1])[order]
+        self.node_weights = {}
+        for label in node_weights:
+            self.node_weights[label] = np.fromiter((G.nodes[u][label] for u in nodelist),
+                                                dtype = float, count = N)
+        self._make_views_()
+
+    def _make_views_(self):
+        #indexing a memoryview of a numpy array is about twice as fast as
+        #indexing the array, and it returns python numbers.
+        self._indptr_ = memoryview(self.indptr)
+        self._indices_ = memoryview(self.indices)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_indptr_'], state['_indices_']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._make_views_()
+
+    def order(self):
+        return self._N_
+
+    def number_of_nodes(self):
+        return self._N_
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        else:  #self loops appear once in indices.
+            loops = int(np.count_nonzero(self.indices ==
+                            np.repeat(np.arange(self._N_), np.diff(self.indptr))))
+            return (len(self.indices) + loops)//2
+
+    def __len__(self):
+        return self._N_
+
+    def __iter__(self):
+        return iter(range(self._N_))
+
+    def nodes(self):
+        return range(self._N_)
+
+    def has_node(self, node):
+        r'''True if node is one of the indices 0, ..., N-1'''
+        return isinstance(node, numbers.Integral) and 0 <= node < self._N_
+
+    def neighbors(self, node):
+        r'''returns the indices of the neighbors of node, as a read-only 
+        sequence (a memoryview of `indices`, so nothing is copied)'''
+        return self._indices_[self._indptr_[node]:self._indptr_[node+1]]
+
+    def degree(self, node):
+        return self._indptr_[node+1] - self._indptr_[node]
+
+    def edge_position(self, u, v):
+        r'''returns the position of the edge u-v in `indices` (and so in the
+        arrays of `edge_weights`)'''
+        end = self._indptr_[u+1]
+        position = bisect.bisect_left(self._indices_, v, self._indptr_[u], end)
+        if position == end or self._indices_[position] != v:
+            raise EoN.EoNError("{} and {} are not neighbors".format(u, v))
+        return position
+
+    def reverse_edge_positions(self):
+        r'''returns an array giving for each edge position (u to v) the
+        position of the edge from v to u.  G must be undirected.'''
+        rows = np.repeat(np.arange(self._N_, dtype = np.int64), np.diff(self.indptr))
+        columns = self.indices.astype(np.int64)
+        forward = np.argsort(rows*self._N_ + columns, kind = 'stable')
+        backward = np.argsort(columns*self._N_ + rows, kind = 'stable')
+        reverse = np.empty(len(columns), dtype = np.int64)
+        reverse[backward] = forward
+        return reverse
+
+    def edge_weight(self, u, v, label):
+        r'''returns the weight `label` of the edge u-v.  This bisects the 
+        neighbors of u, so the simulations read the weights by position 
+        instead.'''
+        return self.edge_weights[label][self.edge_position(u, v)]
+
+    def node_weight(self, node, label):
+        return self.node_weights[label][node]
+
+    def index(self, node):
+        r'''returns the index of the node with label `node`'''
+        if self.node_index is None:
+            if isinstance(node, numbers.Integral) and 0 <= node < self._N_:
+                return int(node)
+            raise KeyError(node)
+        return self.node_index[node]
+
+    def label(self, index):
+        r'''returns the label of the node with index `index`'''
+        return self.nodelist[index]
+
+    def to_indices(self, nodes):
+        r'''
+        Converts the input that simulations accept as `initial_infecteds`: a
+        single node label or an iterable of node labels (or None) into a list
+        of indices (or None).'''
+        if nodes is None:
+            return None
+        if self.node_index is None:
+            is_node = isinstance(nodes, numbers.Integral)
+        else:
+            try:
+                is_node = nodes in self.node_index
+            except TypeError: #unhashable, so must be an iterable.
+                is_node = False
+        if is_node:
+            return [self.index(nodes)]
+        return [self.index(node) for node in nodes]
+
+    def to_networkx(self):
+        r'''
+        Reconstructs a NetworkX graph (with the original labels and the
+        compiled weights).'''
+        if self.directed:
+            H = nx.DiGraph()
         else:
-            return len(self)
-    def update_total_weight(self):
-        self._total_weight = sum(self.weight[item] for item in self.items)
+            H = nx.Graph()
+        for node in range(self._N_):
+            H.add_node(self.label(node), **{label: self.node_weights[label][node]
+                                            for label in self.node_weights})
+        for u in range(self._N_):
+            for position in range(self._indptr_[u], self._indptr_[u+1]):
+                v = self._indices_[position]
+                H.add_edge(self.label(u), self.label(v),
+                            **{label: self.edge_weights[label][position]
+                                for label in self.edge_weights})
+        return H
+
+def _compiled_weights_(G, transmission_weight, recovery_weight):
+    r'''returns the arrays of the edge weights transmission_weight and the
+    node weights recovery_weight of the CompiledGraph G (or None for a 
+    weight that is None).  Raises an EoNError if either was not compiled 
+    into G, rather than failing during the simulation.'''
+    if transmission_weight is not None and transmission_weight not in G.edge_weights:
+        raise EoN.EoNError("edge weight '{}' was not compiled into G".format(transmission_weight))
+    if recovery_weight is not None and recovery_weight not in G.node_weights:
+        raise EoN.EoNError("node weight '{}' was not compiled into G".format(recovery_weight))
+    return (G.edge_weights.get(transmission_weight), 
+            G.node_weights.get(recovery_weight))
+
+def _in_edge_positions_(G):
+    r'''returns (in_indptr, in_positions) for the CompiledGraph G: the 
+    positions of the edges into node i are 
+    `in_positions[in_indptr[i]:in_indptr[i+1]]`.  For an undirected G these
+    are the reverses of the edges out of i.'''
+    if not G.directed:
+        return G._indptr_, memoryview(G.reverse_edge_positions())
+    in_indptr = np.zeros(G.order()+1, dtype = np.int64)
+    in_indptr[1:] = np.cumsum(np.bincount(G.indices, minlength = G.order()))
+    return (memoryview(in_indptr), 
+            memoryview(np.argsort(G.indices, kind = 'stable').astype(np.int64)))
+
+def _compiled_Simulation_Investigation_(G, node_history, transmissions, SIR = True):
+    r'''Simulations on a CompiledGraph record everything in terms of the
+    node indices.  This translates node_history and transmissions back to the
+    original labels and creates the Simulation_Investigation object.'''
+
+    relabeled_history = defaultdict(node_history.default_factory)
+    for node, history in node_history.items():
+        relabeled_history[G.label(node)] = history
+    relabeled_transmissions = [(t, None if u is None else G.label(u), G.label(v))
+                                for t, u, v in transmissions]
+    return EoN.Simulation_Investigation(G.to_networkx(), relabeled_history,
+                                        relabeled_transmissions, SIR=SIR)
+
 
 def _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = True):
     r'''The original (v0.96 and earlier) returned infection_times and recovery_times.
@@ -261,10 +1175,187 @@ def _simple_test_transmission_(u, v, p):
     return random.random()<p
 
 
+def _frontier_edges_(G, frontier):
+    r'''returns (positions, lengths) where positions is an array of the edge 
+    positions of the CompiledGraph G leaving the nodes in the array frontier
+    (grouped by node, in the order of frontier) and lengths the number of
+    edges leaving each.  So the source of each edge is
+    `np.repeat(frontier, lengths)` and its target `G.indices[positions]`.'''
+    starts = G.indptr[frontier]
+    lengths = G.indptr[frontier+1] - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(len(offsets)) + offsets, lengths
+
+def _discrete_transmissions_(G, frontier, at_risk, p, generator, return_sources = False,
+                                test_transmission = None, args = (), edge_weights = ()):
+    r'''One generation of transmission from the nodes in the array frontier 
+    of the CompiledGraph G to those neighbors v with at_risk[v] True.  
+    Returns the array of edge positions along which transmission happens 
+    (grouped by source) and, if return_sources, the array of their sources 
+    (otherwise None).
+
+    Transmission happens with probability p, unless test_transmission is 
+    given, in which case it is a batched test called as 
+    `test_transmission(sources, targets, *args, rng = generator, **weights)`
+    with weights holding the arrays of the edge_weights named in 
+    edge_weights.'''
+    positions, lengths = _frontier_edges_(G, frontier)
+    exposed = at_risk[G.indices[positions]]
+    positions = positions[exposed]
+    if test_transmission is None and not return_sources:
+        return positions[generator.random(len(positions)) < p], None
+    sources = np.repeat(frontier, lengths)[exposed]
+    if test_transmission is None:
+        transmitted = generator.random(len(positions)) < p
+    else:
+        weights = {label: G.edge_weights[label][positions] for label in edge_weights}
+        transmitted = np.asarray(test_transmission(sources, G.indices[positions], 
+                                                    *args, rng = generator, 
+                                                    **weights), dtype = bool)
+    return positions[transmitted], sources[transmitted]
+
+def _labeled_time_fxns_(G, trans_time_fxn, rec_time_fxn, trans_and_rec_time_fxn):
+    r'''The user-defined functions of fast_nonMarkov_SIR and 
+    fast_nonMarkov_SIS take node labels, but on the CompiledGraph G the 
+    simulation works with the node indices.  Returns the three functions 
+    (any of which may be None) wrapped to translate their nodes to labels, 
+    and the keys of the delays returned by trans_and_rec_time_fxn back to 
+    indices.'''
+    label = G.label
+    index = G.index
+    if trans_time_fxn:
+        user_trans_time_fxn = trans_time_fxn
+        def trans_time_fxn(source, target, *args):
+            return user_trans_time_fxn(label(source), label(target), *args)
+    if rec_time_fxn:
+        user_rec_time_fxn = rec_time_fxn
+        def rec_time_fxn(node, *args):
+            return user_rec_time_fxn(label(node), *args)
+    if trans_and_rec_time_fxn:
+        user_trans_and_rec_time_fxn = trans_and_rec_time_fxn
+        def trans_and_rec_time_fxn(node, neighbors, *args):
+            trans_delays, rec_delay = user_trans_and_rec_time_fxn(label(node),
+                                            [label(v) for v in neighbors], *args)
+            return {index(v): delay for v, delay in trans_delays.items()}, rec_delay
+    return trans_time_fxn, rec_time_fxn, trans_and_rec_time_fxn
+
+def _unbatched_test_(G, test_transmission):
+    r'''Wraps a user-defined test_transmission(u, v, *args) of discrete_SIR, 
+    which takes node labels, as a batched test on the node indices of the 
+    CompiledGraph G (see _discrete_transmissions_).  It is still called 
+    once for each edge.'''
+    label = G.label
+    def batched_test(sources, targets, *args, **kwargs):
+        return [test_transmission(label(u), label(v), *args) 
+                    for u, v in zip(sources.tolist(), targets.tolist())]
+    return batched_test
+
+def _choose_infectors_(targets, sources, generator):
+    r'''For the transmissions from sources to targets (arrays), returns the 
+    distinct targets and for each target one of its sources chosen 
+    uniformly.'''
+    order = generator.permutation(len(targets))
+    targets, first = np.unique(targets[order], return_index = True)
+    return targets, sources[order][first]
+
+def _discrete_compiled_(G, p, initial_infecteds, initial_recovereds, rho, tmin,
+                        tmax, return_full_data, rng, SIR = True, 
+                        test_transmission = None, args = (), edge_weights = ()):
+    r'''
+    Does the work of basic_discrete_SIR (and discrete_SIR with the default
+    or a batched test_transmission) and of basic_discrete_SIS when G is a 
+    CompiledGraph.  If test_transmission is given (see 
+    _discrete_transmissions_) p is not used.
+
+    Each generation is a few numpy operations: the edges leaving the 
+    infected nodes are gathered from the CSR arrays, those whose target is
+    susceptible each transmit with probability p (one vectorized draw), and
+    the newly infected nodes are the distinct targets of the successful
+    transmissions.  The status of the nodes is held in an int8 array (0 for
+    S, 1 for I, 2 for R).
+
+    initial_infecteds and initial_recovereds are assumed to already be 
+    given as node indices.
+    '''
+    N = G.order()
+    generator = rng.generator
+    if initial_infecteds is None:  #create initial infecteds list if not given
+        if rho is None:
+            initial_number = 1
+        else:
+            initial_number = int(round(N*rho))
+        initial_infecteds = rng.sample(G.nodes(), initial_number)
+    infecteds = np.unique(np.asarray(initial_infecteds, dtype = np.int64))
+    status = np.zeros(N, dtype = np.int8)
+    if SIR and initial_recovereds is not None:
+        status[np.asarray(initial_recovereds, dtype = np.int64)] = 2
+    status[infecteds] = 1
+
+    if return_full_data:
+        node_history = defaultdict(lambda : ([tmin], ['S']))
+        transmissions = []
+        for node in np.flatnonzero(status == 2).tolist():
+            node_history[node] = ([tmin], ['R'])
+        for node in infecteds.tolist():
+            node_history[node] = ([tmin], ['I'])
+            transmissions.append((tmin, None, node))
+
+    t = [tmin]
+    I = [len(infecteds)]
+    R = [int(np.count_nonzero(status == 2))]
+    S = [N - I[0] - R[0]]
+    while len(infecteds) and t[-1] < tmax:
+        if SIR:
+            at_risk = status == 0
+        else:  #anyone not currently infected.
+            at_risk = status != 1
+        positions, sources = _discrete_transmissions_(G, infecteds, at_risk, p, 
+                                                        generator, return_full_data,
+                                                        test_transmission, args,
+                                                        edge_weights)
+        targets = G.indices[positions]
+        if return_full_data:
+            new_infecteds, infectors = _choose_infectors_(targets, sources, generator)
+            transmissions.extend((t[-1], u, v) for u, v in 
+                                    zip(infectors.tolist(), new_infecteds.tolist()))
+            next_time = t[-1]+1
+            if next_time <= tmax:
+                for u in infecteds.tolist():
+                    node_history[u][0].append(next_time)
+                    node_history[u][1].append('R' if SIR else 'S')
+                for v in new_infecteds.tolist():
+                    node_history[v][0].append(next_time)
+                    node_history[v][1].append('I')
+        else:
+            new_infecteds = np.unique(targets).astype(np.int64)
+
+        status[infecteds] = 2 if SIR else 0
+        status[new_infecteds] = 1
+        infecteds = new_infecteds
+
+        t.append(t[-1]+1)
+        if SIR:
+            R.append(R[-1]+I[-1])
+            I.append(len(infecteds))
+            S.append(S[-1]-I[-1])
+        else:
+            I.append(len(infecteds))
+            S.append(N-I[-1])
+
+    if return_full_data:
+        return _compiled_Simulation_Investigation_(G, node_history, transmissions, 
+                                                    SIR = SIR)
+    elif SIR:
+        return scipy.array(t), scipy.array(S), scipy.array(I), scipy.array(R)
+    else:
+        return scipy.array(t), scipy.array(S), scipy.array(I)
+
+
 def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(), 
                 initial_infecteds=None, initial_recovereds = None, 
                 rho = None, tmin = 0, tmax = float('Inf'),
-                return_full_data = False):
+                return_full_data = False, rng = None, batched = False,
+                edge_weights = ()):
     #tested in test_discrete_SIR
     r'''
     Simulates an SIR epidemic on G in discrete time, allowing user-specified transmission rules
@@ -293,6 +1384,10 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
                            NetworkX Graph)
         The network on which the epidemic will be simulated.
         
+        If G is a CompiledGraph and test_transmission is the default, each
+        generation is done with a few vectorized numpy operations, which 
+        is much faster for large networks.
+        
     **test_transmission** function(u,v,*args)
         (see below for args definition)
         A function that determines whether u transmits to v.
@@ -306,6 +1401,9 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
         equivalent to
         test_transmission(u,v)
 
+        If G is a CompiledGraph, u and v are the node labels (as for a 
+        NetworkX graph).
+
     **args** a list or tuple
         The arguments of test_transmission coming after the nodes.  If 
         simply having transmission with probability p it should be 
@@ -315,6 +1413,25 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
         [note the comma is needed to tell Python that this is really a 
         tuple]
 
+    **batched** boolean (default False)
+        If True, G must be a CompiledGraph and test_transmission tests all 
+        the edges from infected to susceptible nodes in a generation at 
+        once.  It is called like
+        test_transmission(sources, targets, *args, rng = generator, **weights)
+        where sources and targets are numpy arrays of node indices, 
+        generator is the simulation's source of random numbers (a numpy 
+        Generator, or the `numpy.random` module if `rng` is None) and 
+        weights holds (keyed by label) the arrays of the edge weights named 
+        in `edge_weights`, for the same edges.  It returns a boolean array 
+        which is True for the edges along which transmission happens.  So 
+        a rule that depends on distance or on attributes can be written 
+        with numpy rather than being called once per edge, and drawing 
+        from generator makes it reproducible with `rng`.
+
+    **edge_weights** string or iterable of strings (default empty)
+        Only used if batched is True.  The edge weights (compiled into G) 
+        which are passed to test_transmission.
+
     **initial_infecteds** node or iterable of nodes (default None)
         if a single node, then this node is initially infected
         if an iterable, then whole set is initially infected
@@ -341,6 +1458,16 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
 
             
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides each transmission (for the default test_transmission), 
+        chooses the initial infections unless initial_infecteds is given,
+        and picks the recorded infector when several neighbors infect a
+        node at once.  A seed or numpy Generator makes the simulation
+        reproducible; with None, Python's `random` module is used.  A
+        user-defined
+        test_transmission must draw its own random numbers, unless it is 
+        batched (see `batched`), in which case it is passed the generator.
+
     :Returns: 
         
         
@@ -368,10 +1495,55 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
     
     Because this sample uses the defaults, it is equivalent to a call to 
     basic_discrete_SIR
+
+    A batched test, in which transmission is more likely along heavier 
+    edges::
+
+        import numpy as np
+        
+        for edge in G.edges():
+            G.edges[edge]['weight'] = np.random.random()
+        H = EoN.CompiledGraph(G, edge_weights = 'weight')
+
+        def test_transmission(sources, targets, p, rng, weight):
+            return rng.random(len(targets)) < p*weight
+
+        t, S, I, R = EoN.discrete_SIR(H, test_transmission, args = (0.9,),
+                                        initial_infecteds = range(20),
+                                        batched = True, edge_weights = 'weight',
+                                        rng = 42)
     '''
     if rho is not None and initial_infecteds is not None:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
 
+    rng = _get_rng_(rng)
+    if batched and not isinstance(G, CompiledGraph):
+        raise EoN.EoNError("a batched test_transmission requires G to be a CompiledGraph")
+    if test_transmission is _simple_test_transmission_ and isinstance(G, CompiledGraph):
+        return _discrete_compiled_(G, args[0], G.to_indices(initial_infecteds),
+                                    G.to_indices(initial_recovereds), rho, tmin,
+                                    tmax, return_full_data, rng)
+    if batched:
+        if isinstance(edge_weights, str):
+            edge_weights = (edge_weights,)
+        for label in edge_weights:
+            if label not in G.edge_weights:
+                raise EoN.EoNError("edge weight '{}' was not compiled into G".format(label))
+        return _discrete_compiled_(G, None, G.to_indices(initial_infecteds),
+                                    G.to_indices(initial_recovereds), rho, tmin,
+                                    tmax, return_full_data, rng, 
+                                    test_transmission = test_transmission, 
+                                    args = args, edge_weights = edge_weights)
+    if isinstance(G, CompiledGraph):
+        return _discrete_compiled_(G, None, G.to_indices(initial_infecteds),
+                                    G.to_indices(initial_recovereds), rho, tmin,
+                                    tmax, return_full_data, rng, 
+                                    test_transmission = _unbatched_test_(G, 
+                                                            test_transmission), 
+                                    args = args)
+    if test_transmission is _simple_test_transmission_:
+        def test_transmission(u, v, p):
+            return rng.random()<p
     
     
     if initial_infecteds is None:  #create initial infecteds list if not given
@@ -379,7 +1551,7 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
     #else it is assumed to be a list of nodes.
@@ -396,9 +1568,9 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
     
     N=G.order()
     t = [tmin]
-    S = [N-len(initial_infecteds)]
+    R = [0 if initial_recovereds is None else len(set(initial_recovereds))]
     I = [len(initial_infecteds)]
-    R = [0]
+    S = [N-I[0]-R[0]]
     
     susceptible = defaultdict(lambda: True)  
     #above line is equivalent to u.susceptible=True for all nodes.
@@ -426,7 +1598,7 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
 
         if return_full_data:
             for v in infector.keys():
-                transmissions.append((t[-1], random.choice(infector[v]), v))
+                transmissions.append((t[-1], rng.choice(infector[v]), v))
             next_time = t[-1]+1
             if next_time <= tmax:
                 for u in infecteds:
@@ -453,7 +1625,7 @@ def discrete_SIR(G, test_transmission=_simple_test_transmission_, args=(),
 def basic_discrete_SIR(G, p, initial_infecteds=None, 
                                 initial_recovereds = None, rho = None,
                                 tmin = 0, tmax=float('Inf'), 
-                                return_full_data = False):
+                                return_full_data = False, rng = None):
     #tested in test_basic_discrete_SIR   
     r'''
     Performs simple discrete SIR simulation assuming constant transmission 
@@ -468,8 +1640,10 @@ def basic_discrete_SIR(G, p, initial_infecteds=None,
 
     :Arguments: 
 
-    **G**    networkx Graph
-            The network the disease will transmit through.
+    **G**    networkx Graph or CompiledGraph
+            The network the disease will transmit through.  For large 
+            networks a CompiledGraph is much faster: each generation is 
+            then done with a few vectorized numpy operations.
             
     **p** number
             transmission probability
@@ -500,6 +1674,12 @@ def basic_discrete_SIR(G, p, initial_infecteds=None,
     **return_full_data**  boolean (default False)
         Tells whether a Simulation_Investigation object should be returned.  
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides each transmission and, unless initial_infecteds is given, 
+        which nodes start infected.  A seed or numpy Generator makes the 
+        simulation reproducible; with None, Python's `random` module is 
+        used (numpy's global generator if G is a CompiledGraph).
+
     :Returns: 
         
     if return_full_data is False returns 
@@ -537,10 +1717,11 @@ def basic_discrete_SIR(G, p, initial_infecteds=None,
 
     return discrete_SIR(G, _simple_test_transmission_, (p,), 
                                     initial_infecteds, initial_recovereds, 
-                                    rho, tmin, tmax, return_full_data)
+                                    rho, tmin, tmax, return_full_data, rng)
 
 def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
-                                tmin = 0, tmax = 100, return_full_data = False):
+                                tmin = 0, tmax = 100, return_full_data = False,
+                                rng = None):
     
     '''Does a simulation of the simple case of all nodes transmitting
     with probability p independently to each susceptible neighbor and then
@@ -552,8 +1733,10 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
     
     :Arguments: 
 
-    **G** networkx Graph
-            The network the disease will transmit through.
+    **G** networkx Graph or CompiledGraph
+            The network the disease will transmit through.  As for 
+            basic_discrete_SIR a CompiledGraph is much faster for large
+            networks.
             
     **p** number
             transmission probability
@@ -572,6 +1755,10 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
     **return_full_data**  boolean (default False)
             Tells whether a Simulation_Investigation object should be returned.  
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides each transmission and which nodes start infected, as in 
+        basic_discrete_SIR.
+
     :Returns: 
 
     if return_full_data is False
@@ -601,23 +1788,28 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
     
     if rho is not None and initial_infecteds is not None:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
+    rng = _get_rng_(rng)
+    if isinstance(G, CompiledGraph):
+        return _discrete_compiled_(G, p, G.to_indices(initial_infecteds), None, 
+                                    rho, tmin, tmax, return_full_data, rng, 
+                                    SIR = False)
 
     if initial_infecteds is None:  #create initial infecteds list if not given
         if rho is None:
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
     #else it is assumed to be a list of nodes.
 
     if return_full_data:
-        transmissions = {}
+        transmissions = []
         node_history = defaultdict(lambda : ([tmin], ['S']))
         for u in initial_infecteds:
             node_history[u] = ([tmin], ['I'])
-            transmissions.append(tmin, None, u)
+            transmissions.append((tmin, None, u))
     N=G.order()
     t = [tmin]
     S = [N-len(initial_infecteds)]
@@ -629,10 +1821,10 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
         infector={}
         for u in infecteds:
             for v in G.neighbors(u):
-                if v not in infecteds and random.random()<p:
+                if v not in infecteds and rng.random()<p:
                     if v not in new_infecteds:
                         new_infecteds.add(v)
-                        infector[v] = u
+                        infector[v] = [u]
                     else:
                         infector[v].append(u)
                         
@@ -642,7 +1834,7 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
 
         if return_full_data:
             for v in infector.keys():
-                transmissions.append((t[-1], random.choice(infector[v]), v))
+                transmissions.append((t[-1], rng.choice(infector[v]), v))
             next_time = t[-1]+1
             if next_time<= tmax:
                 for u in infecteds:
@@ -664,7 +1856,284 @@ def basic_discrete_SIS(G, p, initial_infecteds=None, rho = None,
 
     
     
-def percolate_network(G, p):
+def _random_words_(generator, size):
+    r'''returns an array of size uniformly random 64 bit words (uint64) 
+    from generator, which is a numpy Generator or numpy.random.'''
+    if isinstance(generator, np.random.Generator):
+        return generator.integers(0, 2**64, size, dtype = np.uint64)
+    return generator.randint(0, 2**64, size, dtype = np.uint64)
+
+def _bernoulli_words_(generator, p, size, digits = 32):
+    r'''returns an array of size uint64 words whose bits are independently
+    1 with probability p (rounded to `digits` binary digits).
+
+    If p = 0.b_1 b_2 ... b_digits in binary, then starting from x = 0 and 
+    working from b_digits up to b_1, x becomes x | R if the digit is 1 and
+    x & R if it is 0, where R is a new random word.  Each step takes the 
+    probability q that a bit is 1 to 1/2 + q/2 or to q/2, so at the end it
+    is p.  Trailing zero digits are skipped, so p = 1/2 costs one random 
+    word, p = 3/4 two, and so on.'''
+    q = int(round(p*2**digits))
+    if q >= 2**digits:
+        return np.full(size, np.iinfo(np.uint64).max, dtype = np.uint64)
+    words = np.zeros(size, dtype = np.uint64)
+    if q <= 0:
+        return words
+    while q % 2 == 0:
+        q //= 2
+        digits -= 1
+    for digit in range(digits):
+        if (q >> digit) & 1:
+            words |= _random_words_(generator, size)
+        else:
+            words &= _random_words_(generator, size)
+    return words
+
+def _count_bits_(words, replicates):
+    r'''words is a 2D array of uint64 with a row for each of a set of nodes.
+    Returns an array giving for each replicate (bit) how many of the rows 
+    have it set.'''
+    bits = np.unpackbits(words.astype('<u8', copy = False).view(np.uint8), 
+                            axis = 1, bitorder = 'little')
+    return bits.sum(axis = 0, dtype = np.int64)[:replicates]
+
+def _rows_from_bits_(keys, bits, W):
+    r'''keys are node*W + word and bits are uint64 words.  Returns the 
+    array of the distinct nodes and a 2D array with a row of W words for 
+    each, with all the bits given for it or-ed together.'''
+    keys, inverse = np.unique(keys, return_inverse = True)
+    combined = np.zeros(len(keys), dtype = np.uint64)
+    np.bitwise_or.at(combined, inverse, bits)
+    nodes, rows = np.unique(keys//W, return_inverse = True)
+    words = np.zeros((len(nodes), W), dtype = np.uint64)
+    words[rows, keys % W] = combined
+    return nodes, words
+
+def _bit_parallel_discrete_(G, p, replicates, initial_infecteds, initial_recovereds,
+                            rho, tmin, tmax, rng, SIR):
+    r'''
+    Does the work of basic_discrete_SIR_replicates and 
+    basic_discrete_SIS_replicates on the CompiledGraph G.
+
+    Replicate r is bit r % 64 of word r // 64, so each node has a row of W 
+    words.  `at_risk[node]` has the bits of the replicates in which the
+    node can be infected (susceptible for SIR, not infected for SIS) and 
+    the infected nodes are held as an array of nodes (`infecteds`) with 
+    the rows of their infected bits (`words`).  In a generation, the row of
+    each edge from an infected node is `words[source] & at_risk[target]`, 
+    and each nonzero word of it is and-ed with a word of Bernoulli(p) bits.
+    The results are or-ed together by target to give the new infections. 
+    So each random word and each numpy operation serves 64 replicates.
+
+    initial_infecteds and initial_recovereds are assumed to already be 
+    given as node indices.
+    '''
+    N = G.order()
+    W = (replicates+63)//64
+    generator = rng.generator
+    at_risk = np.full((N, W), np.iinfo(np.uint64).max, dtype = np.uint64)
+    all_replicates = np.zeros(W, dtype = np.uint64)
+    for replicate in range(replicates):
+        all_replicates[replicate//64] |= np.uint64(1) << np.uint64(replicate % 64)
+
+    if initial_recovereds is not None:
+        at_risk[np.asarray(initial_recovereds, dtype = np.int64)] = 0
+    if initial_infecteds is not None:
+        infecteds = np.unique(np.asarray(initial_infecteds, dtype = np.int64))
+        words = np.tile(all_replicates, (len(infecteds), 1))
+    else:  #each replicate has its own random initial infections
+        initial_number = 1 if rho is None else int(round(N*rho))
+        nodes = np.array([node for replicate in range(replicates) 
+                            for node in rng.sample(range(N), initial_number)], 
+                            dtype = np.int64)
+        replicate_of = np.repeat(np.arange(replicates), initial_number)
+        infecteds, words = _rows_from_bits_(nodes*W + replicate_of//64,
+                                    np.uint64(1) << (replicate_of % 64).astype(np.uint64), 
+                                    W)
+    at_risk[infecteds] &= ~words
+
+    t = [tmin]
+    I = [_count_bits_(words, replicates)]
+    if SIR:
+        R = [_count_bits_(~at_risk, replicates) - I[0]]
+    while len(infecteds) and t[-1] < tmax:
+        positions, lengths = _frontier_edges_(G, infecteds)
+        targets = G.indices[positions].astype(np.int64)
+        exposed = np.repeat(words, lengths, axis = 0) & at_risk[targets]
+        edges, word_index = np.nonzero(exposed)
+        transmitted = exposed[edges, word_index] & _bernoulli_words_(generator, p, len(edges))
+        hit = np.flatnonzero(transmitted)
+        new_infecteds, new_words = _rows_from_bits_(targets[edges[hit]]*W + word_index[hit], 
+                                                    transmitted[hit], W)
+        if not SIR:  #the infected nodes recover, and are at risk again.
+            at_risk[infecteds] |= words
+        at_risk[new_infecteds] &= ~new_words
+        infecteds = new_infecteds
+        words = new_words
+        t.append(t[-1]+1)
+        I.append(_count_bits_(words, replicates))
+        if SIR:
+            R.append(R[-1] + I[-2])
+
+    I = np.array(I).T
+    if SIR:
+        R = np.array(R).T
+        return np.array(t), N - I - R, I, R
+    else:
+        return np.array(t), N - I, I
+
+def basic_discrete_SIR_replicates(G, p, replicates = 64, initial_infecteds = None,
+                                    initial_recovereds = None, rho = None, 
+                                    tmin = 0, tmax = float('Inf'), rng = None):
+    #tested in test_SIR_replicates_match_basic_discrete_SIR
+    r'''
+    Performs many independent simulations of basic_discrete_SIR on the same
+    network at once.
+    
+    The status of each node in each replicate is held as one bit of a 64 
+    bit word, so 64 replicates are advanced by each numpy operation and 
+    each random word gives the transmission coins of 64 replicates.  This 
+    is much faster per replicate than calling basic_discrete_SIR 
+    repeatedly, which makes it suitable for estimating the distribution of
+    outcomes (such as the probability of an epidemic or the final size) 
+    from thousands of replicates.
+
+    p is rounded to 32 binary digits (an error below 1e-9).
+
+    :Arguments: 
+
+    **G**    networkx Graph or CompiledGraph
+            The network the disease will transmit through.  A networkx 
+            graph is compiled at the start of each call.
+            
+    **p** number
+            transmission probability
+            
+    **replicates** positive integer (default 64)
+            the number of simulations.  Multiples of 64 use the words fully.
+
+    **initial_infecteds**  node or iterable of nodes (default None)
+            if a single node, then this node is initially infected in every
+            replicate.
+            if an iterable, then whole set is initially infected in every 
+            replicate.
+            if None, then each replicate chooses its own random initial 
+            infections based on rho.  If rho is also None, a random single 
+            node is chosen.
+            If both initial_infecteds and rho are assigned, then there
+            is an error.
+       
+    **initial_recovereds**  as for initial_infecteds, but for initially 
+            recovered nodes (in every replicate).
+            
+    **rho**  number  (default None)
+            initial fraction infected. number initially infected
+            is int(round(G.order()*rho))
+        
+    **tmin**  float  (default 0)
+        start time
+        
+    **tmax**  float  (default infinity)
+        stop time (if not extinct first in every replicate).  
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the transmissions of all the replicates together, 64 
+        replicates to each 64 bit word, and the initial infections of each
+        replicate unless initial_infecteds is given.  With None numpy's global generator is 
+        used; a seed makes the whole set of replicates reproducible.
+
+    :Returns: 
+        
+    **t, S, I, R**    numpy arrays
+        t is the array of times (one per generation, until the last 
+        replicate dies out) and S, I and R have shape `(replicates, len(t))`,
+        so `I[r]` is the number infected at each time in replicate r.  
+    
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        import numpy as np
+        G = nx.fast_gnp_random_graph(100000, 0.00005)
+        H = EoN.CompiledGraph(G)
+        t, S, I, R = EoN.basic_discrete_SIR_replicates(H, 0.3, replicates = 6400)
+        final_sizes = R[:, -1]
+        print('probability of an epidemic:', np.mean(final_sizes > 1000))
+    '''
+    if rho is not None and initial_infecteds is not None:
+        raise EoN.EoNError("cannot define both initial_infecteds and rho")
+    rng = _get_rng_(rng)
+    if not isinstance(G, CompiledGraph):
+        G = CompiledGraph(G)
+    return _bit_parallel_discrete_(G, p, replicates, G.to_indices(initial_infecteds),
+                                    G.to_indices(initial_recovereds), rho, tmin, 
+                                    tmax, rng, SIR = True)
+
+def basic_discrete_SIS_replicates(G, p, replicates = 64, initial_infecteds = None, 
+                                    rho = None, tmin = 0, tmax = 100, rng = None):
+    #tested in test_SIS_replicates_match_basic_discrete_SIS
+    r'''
+    Performs many independent simulations of basic_discrete_SIS on the same
+    network at once, in the same way as basic_discrete_SIR_replicates.
+
+    :Arguments: 
+
+    **G**    networkx Graph or CompiledGraph
+            The network the disease will transmit through.
+            
+    **p** number
+            transmission probability (rounded to 32 binary digits)
+            
+    **replicates** positive integer (default 64)
+            the number of simulations.
+
+    **initial_infecteds**  node or iterable of nodes (default None)
+            as for basic_discrete_SIR_replicates.
+       
+    **rho**  number  (default None)
+            initial fraction infected. number initially infected
+            is int(round(G.order()*rho))
+        
+    **tmin**  float  (default 0)
+        start time
+        
+    **tmax**  float  (default 100)
+        stop time (if not extinct first in every replicate).  
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the transmissions of all the replicates (as words of 
+        Bernoulli bits) and the initial infections of each replicate unless
+        initial_infecteds is given.  With None numpy's global generator is used.
+
+    :Returns: 
+        
+    **t, S, I**    numpy arrays
+        t is the array of times and S and I have shape 
+        `(replicates, len(t))`.
+    
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        G = nx.fast_gnp_random_graph(100000, 0.00005)
+        t, S, I = EoN.basic_discrete_SIS_replicates(G, 0.6, replicates = 640, 
+                                                        rho = 0.01, tmax = 50)
+        endemic_level = I[:, -1].mean()
+    '''
+    if rho is not None and initial_infecteds is not None:
+        raise EoN.EoNError("cannot define both initial_infecteds and rho")
+    rng = _get_rng_(rng)
+    if not isinstance(G, CompiledGraph):
+        G = CompiledGraph(G)
+    return _bit_parallel_discrete_(G, p, replicates, G.to_indices(initial_infecteds),
+                                    None, rho, tmin, tmax, rng, SIR = False)
+
+
+def percolate_network(G, p, rng = None):
     #tested indirectly in test_basic_discrete_SIR   
 
     r'''
@@ -679,11 +2148,16 @@ def percolate_network(G, p):
 
     :Arguments: 
 
-    **G**    networkx Graph
-        The contact network
+    **G**    networkx Graph or CompiledGraph
+        The contact network.  If it is a CompiledGraph, all the edges are 
+        kept or removed with one vectorized draw.
     **p** number between 0 and 1
         the probability of keeping edge
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides which edges are kept.  With None, Python's `random` module 
+        is used (numpy's global generator if G is a CompiledGraph).
+
     :Returns: 
         
     **H**   NetworkX Graph
@@ -704,13 +2178,107 @@ def percolate_network(G, p):
         #H is now a graph with about 60% of the edges of G
 '''
 
+    rng = _get_rng_(rng)
     H = nx.Graph()
+    if isinstance(G, CompiledGraph):
+        H.add_nodes_from(G.nodelist)
+        u, v = _undirected_edges_(G)
+        kept = rng.generator.random(len(u)) < p
+        H.add_edges_from(zip(map(G.label, u[kept].tolist()), 
+                                map(G.label, v[kept].tolist())))
+        return H
     H.add_nodes_from(G.nodes())
     for edge in G.edges():
-        if random.random()<p:
+        if rng.random()<p:
             H.add_edge(*edge)
     return H
 
+def _undirected_edges_(G):
+    r'''returns arrays u, v of the indices of the ends of each edge of the 
+    undirected CompiledGraph G, with u < v (self loops are left out, as 
+    they play no part in percolation).'''
+    u = np.repeat(np.arange(G.order(), dtype = np.int64), np.diff(G.indptr))
+    v = G.indices.astype(np.int64)
+    forward = u < v
+    return u[forward], v[forward]
+
+def _union_find_(N, u, v):
+    r'''returns an array root with root[i] the smallest of the N nodes in 
+    the component of node i of the graph with edges u[k]-v[k].
+
+    This is a union-find done for all the edges at once: each pass hooks the
+    larger root of the two ends of every edge that still joins different 
+    components onto the smaller, and then compresses the paths by pointer
+    jumping.  Since a node only ever points to a smaller node there are no 
+    cycles, and the edges left shrink quickly, so there are few passes.'''
+    root = np.arange(N, dtype = np.int64)
+    while len(u):
+        ru = root[u]
+        rv = root[v]
+        joining = ru != rv
+        u, v, ru, rv = u[joining], v[joining], ru[joining], rv[joining]
+        np.minimum.at(root, np.maximum(ru, rv), np.minimum(ru, rv))
+        while True:
+            jumped = root[root]
+            if np.array_equal(jumped, root):
+                break
+            root = jumped
+    return root
+
+def percolation_components(G, p, rng = None):
+    #tested in test_percolation_components_match_connected_components
+    r'''
+    Performs bond percolation on G, keeping each edge with probability p,
+    and returns the connected components of the percolated network without
+    building it.
+
+    All the edges are kept or removed with one vectorized draw, and the 
+    components are found by a union-find over the kept edges, so the time
+    and memory are linear in the number of edges with small constants.
+    This is what `estimate_SIR_prob_size` uses when G is a CompiledGraph.
+
+    :Arguments: 
+
+    **G**    networkx Graph or CompiledGraph (undirected)
+        The contact network.  A networkx graph is compiled first.
+    **p** number between 0 and 1
+        the probability of keeping an edge
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides which edges are kept, with one array of uniform numbers 
+        for all edges.  With None numpy's global generator is used.
+
+    :Returns: 
+        
+    **labels, sizes**   numpy arrays
+        labels[i] is the component (numbered from 0) of the node with index
+        i (the i-th node of `G.nodes()`), and sizes[c] is the number of 
+        nodes in component c.  So `sizes[labels]` gives the size of the 
+        component of each node and `np.bincount(sizes)` the number of 
+        components of each size.
+        
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        G = nx.fast_gnp_random_graph(1000000, 0.000002)
+        H = EoN.CompiledGraph(G)
+        labels, sizes = EoN.percolation_components(H, 0.6)
+        print('largest component', sizes.max())
+    '''
+    rng = _get_rng_(rng)
+    if not isinstance(G, CompiledGraph):
+        G = CompiledGraph(G)
+    if G.directed:
+        raise EoN.EoNError("percolation_components requires an undirected graph")
+    u, v = _undirected_edges_(G)
+    kept = rng.generator.random(len(u)) < p
+    root = _union_find_(G.order(), u[kept], v[kept])
+    roots, labels = np.unique(root, return_inverse = True)
+    return labels, np.bincount(labels)
+
 def _edge_exists_(u, v, H):
     r'''
     Tests if directed edge u, v exists in graph H.
@@ -738,7 +2306,8 @@ def percolation_based_discrete_SIR(G, p,
                                             initial_recovereds = None,
                                             rho = None, tmin = 0,
                                             tmax = float('Inf'),
-                                            return_full_data = False):
+                                            return_full_data = False, 
+                                            rng = None):
     #tested in test_basic_discrete_SIR   
     r'''
     perfoms a simple SIR epidemic but using percolation as the underlying 
@@ -796,6 +2365,10 @@ def percolation_based_discrete_SIR(G, p,
     **return_full_data**  boolean (default False)
             Tells whether a Simulation_Investigation object should be returned.  
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides which edges of the percolated network are kept and, 
+        unless initial_infecteds is given, which nodes start infected.
+
     :Returns: 
         
     **t, S, I, R** Scipy arrays
@@ -823,15 +2396,16 @@ def percolation_based_discrete_SIR(G, p,
 
 '''
 
-    H = percolate_network(G, p)
+    rng = _get_rng_(rng)
+    H = percolate_network(G, p, rng)
     return discrete_SIR(H, test_transmission=H.has_edge, 
                                 initial_infecteds=initial_infecteds, 
                                 initial_recovereds = initial_recovereds,
                                 rho = rho, tmin = tmin, tmax = tmax, 
-                                return_full_data=return_full_data)
+                                return_full_data=return_full_data, rng = rng)
                                 
 
-def estimate_SIR_prob_size(G, p):
+def estimate_SIR_prob_size(G, p, rng = None):
     #tested in test_estimate_SIR_prob_size
     r'''
     Uses percolation to estimate the probability and size of epidemics 
@@ -854,11 +2428,19 @@ def estimate_SIR_prob_size(G, p):
 
     :Arguments: 
 
-    **G**    networkx Graph
-            The network the disease will transmit through.
+    **G**    networkx Graph or CompiledGraph
+            The network the disease will transmit through.  If it is a 
+            CompiledGraph, the components are found with 
+            `percolation_components` rather than by building the 
+            percolated network.
     **p** number
             transmission probability
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        decides which edges of the percolated network are kept, so a given
+        seed always gives the same estimate.  With None, the global 
+        generators are used.
+
     :Returns: 
         
     **PE, AR**   both floats between 0 and 1 
@@ -879,29 +2461,138 @@ def estimate_SIR_prob_size(G, p):
         PE, AR = EoN.estimate_SIR_prob_size(G, 0.6)
 
     '''
-    H = percolate_network(G, p)
+    if isinstance(G, CompiledGraph):
+        labels, sizes = percolation_components(G, p, rng)
+        returnval = float(sizes.max())/G.order()
+        return returnval, returnval
+    H = percolate_network(G, p, rng)
     size = max((len(CC) for CC in nx.connected_components(H)))
     returnval = float(size)/G.order()
     return returnval, returnval
 
 
-def directed_percolate_network(G, tau, gamma, weights = True):
-    #indirectly tested in test_estimate_SIR_prob_size
+def _largest_component_by_edges_(N, u, v, generator):
+    r'''returns an array giant of length len(u)+1, where giant[m] is the 
+    size of the largest component after adding the first m edges u[k]-v[k]
+    in a random order to N isolated nodes.
+
+    This is the sweep of Newman and Ziff.  The edges that join two 
+    components are exactly those of the minimum spanning forest when each 
+    edge is weighted by its position in the order, so these (at most N-1) 
+    edges are found with scipy and only they are added by the union-find.'''
+    M = len(u)
+    rank = generator.permutation(M)
+    forest = scipy.sparse.csgraph.minimum_spanning_tree(
+                        scipy.sparse.coo_matrix((rank + 1., (u, v)), shape = (N, N)))
+    forest = forest.tocoo()
+    order = np.argsort(forest.data)
+    joins = (forest.data[order] - 1).astype(np.int64)
+    parent = list(range(N))
+    size = [1]*N
+    biggest = 1
+    largest = []
+    for a, b in zip(forest.row[order].tolist(), forest.col[order].tolist()):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        if size[a] > biggest:
+            biggest = size[a]
+        largest.append(biggest)
+    giant = np.zeros(M+1, dtype = np.int64)
+    giant[0] = 1 if N else 0
+    giant[joins + 1] = largest
+    return np.maximum.accumulate(giant)
+
+def estimate_SIR_prob_size_curve(G, ps, n_samples = 1, rng = None):
+    #tested in test_curve_matches_estimate_SIR_prob_size
     r'''
-    performs directed percolation, assuming that transmission and recovery 
-    are Markovian
-    
-    
-    From figure 6.13 of Kiss, Miller, & Simon.  Please cite the
-    book if using this algorithm.  
-    
-    This performs directed percolation corresponding to an SIR epidemic
-    assuming that transmission is at rate tau and recovery at rate 
-    gamma
+    Estimates the probability and size of epidemics for each of many 
+    transmission probabilities, as `estimate_SIR_prob_size` does for one.
 
-    :See Also:
+    This uses the algorithm of Newman and Ziff: the edges are put in a 
+    random order and added one at a time, recording the size of the 
+    largest component after each.  The largest component of percolation 
+    with probability p is then the average of these over the number of 
+    edges, which has a binomial distribution.  So the whole curve costs 
+    about as much as one percolation.
 
-    `nonMarkov_directed_percolate_network` which allows for duration and 
+    :Arguments: 
+
+    **G**    networkx Graph or CompiledGraph
+            The network the disease will transmit through.
+    **ps** iterable of numbers
+            the transmission probabilities
+    **n_samples** positive integer (default 1)
+            the number of random orders of the edges to average over.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        orders the edges at random for each of the n_samples sweeps.  With 
+        None numpy's global generator is used.
+
+    :Returns: 
+        
+    **PE, AR**   numpy arrays
+        the estimates of the probability and attack rate of epidemics for
+        each p in ps (the two are equal, as in `estimate_SIR_prob_size`).
+
+    :SAMPLE USE:
+
+    ::
+
+        import networkx as nx
+        import EoN
+        import numpy as np
+        import matplotlib.pyplot as plt
+    
+        G = nx.fast_gnp_random_graph(100000, 0.00005)
+        ps = np.linspace(0, 1, 201)
+        PE, AR = EoN.estimate_SIR_prob_size_curve(G, ps, n_samples = 10)
+        plt.plot(ps, AR)
+    '''
+    rng = _get_rng_(rng)
+    if not isinstance(G, CompiledGraph):
+        G = CompiledGraph(G)
+    N = G.order()
+    u, v = _undirected_edges_(G)
+    M = len(u)
+    giant = np.zeros(M+1)
+    for sample in range(n_samples):
+        giant += _largest_component_by_edges_(N, u, v, rng.generator)
+    giant /= n_samples*N
+    estimates = []
+    for p in ps:
+        mean = M*p
+        spread = 10*np.sqrt(M*p*(1-p)) + 1
+        m = np.arange(max(0, int(mean - spread)), min(M, int(mean + spread)) + 1)
+        estimates.append(np.dot(scipy.stats.binom.pmf(m, M, p), giant[m]))
+    estimates = np.array(estimates)
+    return estimates, estimates.copy()
+
+
+def directed_percolate_network(G, tau, gamma, weights = True, rng = None):
+    #indirectly tested in test_estimate_SIR_prob_size
+    r'''
+    performs directed percolation, assuming that transmission and recovery 
+    are Markovian
+    
+    
+    From figure 6.13 of Kiss, Miller, & Simon.  Please cite the
+    book if using this algorithm.  
+    
+    This performs directed percolation corresponding to an SIR epidemic
+    assuming that transmission is at rate tau and recovery at rate 
+    gamma
+
+    :See Also:
+
+    `nonMarkov_directed_percolate_network` which allows for duration and 
         time to infect to come from other distributions.
     
     `nonMarkov_directed_percolate_network` which allows for more complex 
@@ -909,16 +2600,23 @@ def directed_percolate_network(G, tau, gamma, weights = True):
     
     :Arguments: 
 
-    **G**    networkx Graph
-        The network the disease will transmit through.
-    **tau**   positive float 
+    **G**    networkx Graph or CompiledGraph
+        The network the disease will transmit through.  If it is a
+        CompiledGraph, the durations and delays are drawn as arrays.
+    **tau**   positive float
         transmission rate
-    **gamma**   positive float 
+    **gamma**   positive float
         recovery rate
     **weights**   boolean    (default True)
         if True, then includes information on time to recovery
         and delay to transmission.  If False, just the directed graph.
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the infectious period of each node and the transmission time
+        along each edge, which decide which directed edges are kept.  With 
+        None, Python's `random` module is used (numpy's global generator if
+        G is a CompiledGraph).
+
     :Returns: 
         :
     **H**   networkx DiGraph  (directed graph)
@@ -945,17 +2643,23 @@ def directed_percolate_network(G, tau, gamma, weights = True):
     '''
     
     #simply calls directed_percolate_network_with_timing, using markovian rules.
-    
+    rng = _get_rng_(rng)
+    if isinstance(G, CompiledGraph):
+        kept, durations, delays = _Markov_percolation_compiled_(G, tau, gamma,
+                                                                rng.generator)
+        if weights:
+            return _percolated_digraph_(G, kept, durations, delays)
+        return _percolated_digraph_(G, kept)
     def trans_time_fxn(u, v, tau):
         if tau>0:
-            return random.expovariate(tau)
+            return rng.expovariate(tau)
         else:
             return float('Inf')
     trans_time_args = (tau,)
     
     def rec_time_fxn(u, gamma):
         if gamma>0:
-            return random.expovariate(gamma)
+            return rng.expovariate(gamma)
         else:
             return float('Inf')
     rec_time_args = (gamma,)
@@ -1057,7 +2761,7 @@ def _in_component_(G, target):
 
 
 def get_infected_nodes(G, tau, gamma, initial_infecteds=None, 
-                initial_recovereds = None):
+                initial_recovereds = None, rng = None):
     r'''
     Finds all eventually infected nodes in an SIR simulation, through a 
     percolation approach 
@@ -1100,6 +2804,11 @@ def get_infected_nodes(G, tau, gamma, initial_infecteds=None,
         if a single node, then this node is initially recovered
         if an iterable, then whole set is initially recovered
 
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        used for the directed percolation that decides who is infected, 
+        and to choose a single initial infection if initial_infecteds is 
+        None.
+
     :Returns: 
             
     **infected_nodes** set
@@ -1119,6 +2828,7 @@ def get_infected_nodes(G, tau, gamma, initial_infecteds=None,
         #finds the nodes infected if 0 and 5 are the initial nodes infected
         #and tau=2, gamma=1
     '''    
+    rng = _get_rng_(rng)
     if initial_recovereds is None:
         initial_recovereds = set()
     elif G.has_node(initial_recovereds):
@@ -1127,7 +2837,7 @@ def get_infected_nodes(G, tau, gamma, initial_infecteds=None,
         initial_recovereds = set(initial_recovereds)
     if initial_infecteds is None:
         while True:
-            node = random.choice(G.nodes())
+            node = rng.choice(list(G.nodes()))
             if node not in initial_recovereds:
                 break
         initial_infecteds=set([node])
@@ -1137,14 +2847,14 @@ def get_infected_nodes(G, tau, gamma, initial_infecteds=None,
         initial_infecteds = set(initial_infecteds)
     if initial_infecteds.intersection(initial_recovereds):
         raise EoN.EoNError("initial infecteds and initial recovereds overlap")
-    H = directed_percolate_network(G, tau, gamma)
+    H = directed_percolate_network(G, tau, gamma, rng = rng)
     for node in initial_recovereds:
         H.remove_node(node)
     infected_nodes = _out_component_(H, initial_infecteds)
     return infected_nodes
 
 
-def estimate_directed_SIR_prob_size(G, tau, gamma):
+def estimate_directed_SIR_prob_size(G, tau, gamma, rng = None):
     #tested in test_estimate_SIR_prob_size
     '''
     Predicts probability and attack rate assuming continuous-time Markovian SIR disease on network G
@@ -1160,15 +2870,22 @@ def estimate_directed_SIR_prob_size(G, tau, gamma):
 
     :Arguments: 
 
-    **G**    networkx Graph
-        The network the disease will transmit through.
-    **tau**   positive float 
+    **G**    networkx Graph or CompiledGraph
+        The network the disease will transmit through.  If it is a
+        CompiledGraph, the durations and delays are drawn as arrays and the
+        percolated network is held as a sparse matrix.
+    **tau**   positive float
         transmission rate
-    **gamma**   positive float 
+    **gamma**   positive float
         recovery rate
 
-    :Returns: 
-        
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the infectious periods and transmission times of the 
+        directed percolation, so a given seed always gives the same 
+        estimate.
+
+    :Returns:
+
     **PE, AR**  numbers (between 0 and 1)
         Estimates of epidemic probability and attack rate found by 
         performing directed percolation, finding largest strongly 
@@ -1186,8 +2903,14 @@ def estimate_directed_SIR_prob_size(G, tau, gamma):
         PE, AR = EoN.estimate_directed_SIR_prob_size(G, 2, 1)
     
     '''
-    
-    H = directed_percolate_network(G, tau, gamma)
+
+    if isinstance(G, CompiledGraph):
+        rng = _get_rng_(rng)
+        kept, durations, delays = _Markov_percolation_compiled_(G, tau, gamma,
+                                                                rng.generator)
+        H = _percolation_matrix_(G, kept)
+        return estimate_SIR_prob_size_from_dir_perc(H)
+    H = directed_percolate_network(G, tau, gamma, rng = rng)
     return estimate_SIR_prob_size_from_dir_perc(H)
 
 def estimate_SIR_prob_size_from_dir_perc(H):
@@ -1200,8 +2923,12 @@ def estimate_SIR_prob_size_from_dir_perc(H):
 
     :Arguments: 
 
-    **H**  directed graph 
-        The outcome of directed percolation on the contact network G
+    **H**  directed graph or scipy sparse matrix
+        The outcome of directed percolation on the contact network G.  If
+        it is a sparse (adjacency) matrix, the strongly connected components
+        are found with `scipy.sparse.csgraph.connected_components` and the
+        in and out components by breadth first search, which takes far less
+        memory than a networkx DiGraph.
 
     :Returns: 
         
@@ -1224,6 +2951,17 @@ def estimate_SIR_prob_size_from_dir_perc(H):
 
     '''
 
+    if scipy.sparse.issparse(H):
+        H = scipy.sparse.csr_matrix(H)
+        N = float(H.shape[0])
+        n_components, labels = scipy.sparse.csgraph.connected_components(H,
+                                            directed = True, connection = 'strong')
+        u = int(np.argmax(labels == np.argmax(np.bincount(labels))))
+        outC = scipy.sparse.csgraph.breadth_first_order(H, u, directed = True,
+                                                    return_predecessors = False)
+        inC = scipy.sparse.csgraph.breadth_first_order(H.T.tocsr(), u,
+                                    directed = True, return_predecessors = False)
+        return len(inC)/N, len(outC)/N
     Hscc = max((nx.strongly_connected_components(H)), key = len)
     u = list(Hscc)[0]  #random.choice(Hscc)
     inC = _in_component_(H, u) #includes both H_{IN} and H_{SCC}
@@ -1237,14 +2975,16 @@ def estimate_nonMarkov_SIR_prob_size_with_timing(G,
                                                 trans_time_fxn, 
                                                 rec_time_fxn, 
                                                 trans_time_args=(),
-                                                rec_time_args=()):
+                                                rec_time_args=(),
+                                                batched = False):
     '''
     estimates probability and size for user-input transmission and recovery time functions.
-    
-    :Arguments: 
-    
-    **G** Networkx Graph
-        the input graph
+
+    :Arguments:
+
+    **G** Networkx Graph or CompiledGraph
+        the input graph.  If it is a CompiledGraph, the percolated network 
+        is held as a sparse matrix.
     **trans_time_fxn** function
         trans_time_fxn(u, v, *trans_time_args) 
         returns the delay from u's infection to transmission to v.
@@ -1256,9 +2996,11 @@ def estimate_nonMarkov_SIR_prob_size_with_timing(G,
         weights of nodes.
     **rec_time_args** tuple
         any additional arguments required by rec_time_fxn
+    **batched** boolean (default False)
+        as for `nonMarkov_directed_percolate_network_with_timing`.
+
+    :Returns:
 
-    :Returns: 
-        
     **PE, AR**  numbers (between 0 and 1)
         Estimates of epidemic probability and attack rate found by 
         finding largest strongly connected component and finding in/out 
@@ -1301,8 +3043,17 @@ def estimate_nonMarkov_SIR_prob_size_with_timing(G,
                                                     )
 
     '''
-    
-    H = nonMarkov_directed_percolate_network_with_timing(G, 
+
+    if batched and not isinstance(G, CompiledGraph):
+        raise EoN.EoNError("batched time functions require G to be a CompiledGraph")
+    if isinstance(G, CompiledGraph):
+        durations, delays = _timing_percolation_compiled_(G, trans_time_fxn,
+                                                rec_time_fxn, trans_time_args,
+                                                rec_time_args, batched)
+        sources, targets = _directed_edges_(G)
+        H = _percolation_matrix_(G, delays <= durations[sources])
+        return estimate_SIR_prob_size_from_dir_perc(H)
+    H = nonMarkov_directed_percolate_network_with_timing(G,
                                                         trans_time_fxn,
                                                         rec_time_fxn,
                                                         trans_time_args,
@@ -1310,7 +3061,7 @@ def estimate_nonMarkov_SIR_prob_size_with_timing(G,
     return estimate_SIR_prob_size_from_dir_perc(H)
     
     
-def estimate_nonMarkov_SIR_prob_size(G, xi, zeta, transmission):
+def estimate_nonMarkov_SIR_prob_size(G, xi, zeta, transmission, batched = False):
     '''
     Predicts epidemic probability and size using nonMarkov_directed_percolate_network.
     
@@ -1322,20 +3073,24 @@ def estimate_nonMarkov_SIR_prob_size(G, xi, zeta, transmission):
     
     :Arguments: 
 
-    **G** (networkx Graph)
-            The input graph
+    **G** (networkx Graph or CompiledGraph)
+            The input graph.  If it is a CompiledGraph, the percolated
+            network is held as a sparse matrix.
 
     **xi** dict
-        xi[u] gives all necessary information to determine what u's 
+        xi[u] gives all necessary information to determine what u's
         infectiousness is.
     **zeta** dict
         zeta[v] gives everything needed about v's susceptibility
 
     **transmission** user-defined function
-        transmission(xi[u], zeta[v]) determines whether u transmits to 
+        transmission(xi[u], zeta[v]) determines whether u transmits to
         v.  Returns True or False depending on whether the transmission would
         happen
 
+    **batched** boolean (default False)
+        as for `nonMarkov_directed_percolate_network`.
+
     :Returns: 
         
     **PE, AR**  numbers (between 0 and 1)
@@ -1378,7 +3133,13 @@ def estimate_nonMarkov_SIR_prob_size(G, xi, zeta, transmission):
             
 
     '''
-    
+
+    if batched and not isinstance(G, CompiledGraph):
+        raise EoN.EoNError("a batched transmission requires G to be a CompiledGraph")
+    if isinstance(G, CompiledGraph):
+        H = _percolation_matrix_(G, _nonMarkov_percolation_kept_(G, xi, zeta,
+                                                        transmission, batched))
+        return estimate_SIR_prob_size_from_dir_perc(H)
     H = nonMarkov_directed_percolate_network(G, xi, zeta, transmission)
     return estimate_SIR_prob_size_from_dir_perc(H)
         
@@ -1386,8 +3147,8 @@ def nonMarkov_directed_percolate_network_with_timing(G,
                                                     trans_time_fxn, 
                                                     rec_time_fxn,
                                                     trans_time_args=(),
-                                                    rec_time_args=(), 
-                                                    weights=True):
+                                                    rec_time_args=(),
+                                                    weights=True, batched = False):
     r'''
     Performs directed percolation on G for user-specified transmission time
     and recovery time distributions.
@@ -1411,8 +3172,9 @@ def nonMarkov_directed_percolate_network_with_timing(G,
 
     The arguments are very much like in fast_nonMarkov_SIR
         
-    **G**  Networkx Graph
-        the input graph
+    **G**  Networkx Graph or CompiledGraph
+        the input graph.  It may be a CompiledGraph (`H` still has the 
+        labels of G).
     **trans_time_fxn** user-defined function
         returns the delay from u's infection to transmission to v.
         
@@ -1435,7 +3197,19 @@ def nonMarkov_directed_percolate_network_with_timing(G,
     **weights** boolean
         if true, then return directed network with the delay and duration as
         weights.
-    
+    **batched** boolean (default False)
+        If True, G must be a CompiledGraph and the functions are called
+        only once each, as
+
+        durations = rec_time_fxn(nodes, *rec_time_args)
+
+        delays = trans_time_fxn(sources, targets, *trans_time_args)
+
+        where nodes is the array of all node indices and sources and
+        targets are the arrays of the ends of every edge (in each
+        direction).  They return arrays, so they can be written with
+        numpy's random number generators.
+
     :Returns:
         
     **H** directed graph.
@@ -1448,6 +3222,17 @@ def nonMarkov_directed_percolate_network_with_timing(G,
     as weights.  Else it's just a directed graph.
 
     '''
+    if batched and not isinstance(G, CompiledGraph):
+        raise EoN.EoNError("batched time functions require G to be a CompiledGraph")
+    if isinstance(G, CompiledGraph):
+        durations, delays = _timing_percolation_compiled_(G, trans_time_fxn,
+                                                rec_time_fxn, trans_time_args,
+                                                rec_time_args, batched)
+        sources, targets = _directed_edges_(G)
+        kept = delays <= durations[sources]
+        if weights:
+            return _percolated_digraph_(G, kept, durations, delays)
+        return _percolated_digraph_(G, kept)
     H = nx.DiGraph()
     if weights:
         for u in G.nodes():
@@ -1467,7 +3252,7 @@ def nonMarkov_directed_percolate_network_with_timing(G,
                     H.add_edge(u,v)
     return H
 
-def nonMarkov_directed_percolate_network(G, xi, zeta, transmission):
+def nonMarkov_directed_percolate_network(G, xi, zeta, transmission, batched = False):
     r'''
     performs directed percolation on a network following user-specified rules.
     
@@ -1497,20 +3282,27 @@ def nonMarkov_directed_percolate_network(G, xi, zeta, transmission):
     
     :Arguments: 
 
-    **G** networkx Graph
-        The input graph
+    **G** networkx Graph or CompiledGraph
+        The input graph.  Unless batched is True, xi and zeta are keyed by
+        the node labels even if G is a CompiledGraph.
 
     **xi** dict
-        xi[u] gives all necessary information to determine what us 
+        xi[u] gives all necessary information to determine what us
         infectiousness is.
     **zeta** dict
         zeta[v] gives everything needed about vs susceptibility
 
     **transmission** user-defined function
         transmission(xi[u], zeta[v]) determines whether u transmits to v.
-        
+
         returns True if transmission happens and False if it does not
 
+    **batched** boolean (default False)
+        If True, G must be a CompiledGraph, xi and zeta are arrays indexed
+        by node index, and transmission is called only once, with the
+        arrays xi[sources] and zeta[targets] over every edge (in each
+        direction).  It returns a boolean array.
+
     :Returns: 
         
     **H** networkx DiGraph (directed graph)
@@ -1522,6 +3314,11 @@ def nonMarkov_directed_percolate_network(G, xi, zeta, transmission):
     Look at the sample for estimate_nonMarkov_SIR_prob_size to infer it.
     
 '''
+    if batched and not isinstance(G, CompiledGraph):
+        raise EoN.EoNError("a batched transmission requires G to be a CompiledGraph")
+    if isinstance(G, CompiledGraph):
+        return _percolated_digraph_(G, _nonMarkov_percolation_kept_(G, xi, zeta,
+                                                        transmission, batched))
     H = nx.DiGraph()
     for u in G.nodes():
         H.add_node(u)
@@ -1529,6 +3326,96 @@ def nonMarkov_directed_percolate_network(G, xi, zeta, transmission):
             if transmission(xi[u],zeta[v]):
                 H.add_edge(u,v)
     return H
+
+def _directed_edges_(G):
+    r'''returns arrays sources, targets of the indices of the ends of each
+    edge position of the CompiledGraph G (so each undirected edge appears
+    once in each direction).'''
+    sources = np.repeat(np.arange(G.order(), dtype = np.int64), np.diff(G.indptr))
+    return sources, G.indices.astype(np.int64)
+
+def _exponential_times_(generator, rate, size):
+    r'''returns an array of size exponential times with the given rate
+    (infinite if rate is 0).'''
+    if rate > 0:
+        return generator.standard_exponential(size)/rate
+    return np.full(size, float('Inf'))
+
+def _Markov_percolation_compiled_(G, tau, gamma, generator):
+    r'''returns (kept, durations, delays) for directed percolation of the 
+    CompiledGraph G with transmission rate tau and recovery rate gamma: the
+    exponential durations (one per node) and delays (one per edge position)
+    and the boolean array of the edge positions with delay <= duration.'''
+    sources, targets = _directed_edges_(G)
+    durations = _exponential_times_(generator, gamma, G.order())
+    delays = _exponential_times_(generator, tau, len(sources))
+    return delays <= durations[sources], durations, delays
+
+def _timing_percolation_compiled_(G, trans_time_fxn, rec_time_fxn, trans_time_args,
+                                    rec_time_args, batched):
+    r'''returns the arrays durations (one per node) and delays (one per edge
+    position) for the directed percolation of the CompiledGraph G.  If
+    batched, rec_time_fxn and trans_time_fxn are each called once, with
+    the arrays of all the nodes and of all the sources and targets (as node
+    indices).  Otherwise they are called for each node and edge with the 
+    node labels, as for a networkx graph.'''
+    sources, targets = _directed_edges_(G)
+    if batched:
+        durations = np.asarray(rec_time_fxn(np.arange(G.order()), *rec_time_args),
+                                dtype = float)
+        delays = np.asarray(trans_time_fxn(sources, targets, *trans_time_args),
+                            dtype = float)
+    else:
+        label = G.label
+        durations = np.fromiter((rec_time_fxn(u, *rec_time_args)
+                                    for u in G.nodelist),
+                                dtype = float, count = G.order())
+        delays = np.fromiter((trans_time_fxn(label(u), label(v), *trans_time_args)
+                                for u, v in zip(sources.tolist(), targets.tolist())),
+                            dtype = float, count = len(sources))
+    return durations, delays
+
+def _nonMarkov_percolation_kept_(G, xi, zeta, transmission, batched):
+    r'''returns the boolean array of the edge positions of the CompiledGraph
+    G kept by nonMarkov_directed_percolate_network.'''
+    sources, targets = _directed_edges_(G)
+    if batched:
+        xi = np.asarray(xi)
+        zeta = np.asarray(zeta)
+        return np.asarray(transmission(xi[sources], zeta[targets]), dtype = bool)
+    label = G.label
+    return np.fromiter((transmission(xi[label(u)], zeta[label(v)])
+                            for u, v in zip(sources.tolist(), targets.tolist())),
+                        dtype = bool, count = len(sources))
+
+def _percolation_matrix_(G, kept):
+    r'''returns the scipy sparse (CSR) adjacency matrix of the directed
+    percolation of the CompiledGraph G that keeps the edge positions where
+    kept is True.'''
+    sources, targets = _directed_edges_(G)
+    N = G.order()
+    return scipy.sparse.csr_matrix((np.ones(np.count_nonzero(kept), dtype = np.int8),
+                                    (sources[kept], targets[kept])), shape = (N, N))
+
+def _percolated_digraph_(G, kept, durations = None, delays = None):
+    r'''returns the networkx DiGraph (with the labels of G) of the directed
+    percolation of the CompiledGraph G that keeps the edge positions where
+    kept is True, with the durations and delays as weights if they are
+    given.'''
+    sources, targets = _directed_edges_(G)
+    H = nx.DiGraph()
+    if durations is None:
+        H.add_nodes_from(G.nodelist)
+        H.add_edges_from(zip(map(G.label, sources[kept].tolist()),
+                                map(G.label, targets[kept].tolist())))
+    else:
+        H.add_nodes_from((G.label(u), {'duration': duration})
+                            for u, duration in enumerate(durations.tolist()))
+        H.add_edges_from((G.label(u), G.label(v), {'delay_to_infection': delay})
+                            for u, v, delay in zip(sources[kept].tolist(),
+                                                    targets[kept].tolist(),
+                                                    delays[kept].tolist()))
+    return H
     
     
     
@@ -1667,7 +3554,223 @@ def _process_rec_SIR_(time, node, times, S, I, R, status):
     R.append(R[-1]+1) #one more recovered
     status[node] = 'R'
     
-def _trans_and_rec_time_Markovian_const_trans_(node, sus_neighbors, tau, rec_rate_fxn):
+def _remove_edges_compiled_(G, edges, removed, pending, Q):
+    r'''Used for interventions in _fast_nonMarkov_SIR_compiled_.  Marks the
+    edges (given as pairs of node indices) as removed and cancels any 
+    transmission pending along them.'''
+    for u, v in edges:
+        removed[G.edge_position(u, v)] = 1
+        Q.cancel(pending.pop((u, v), None))
+        if not G.directed:
+            removed[G.edge_position(v, u)] = 1
+            Q.cancel(pending.pop((v, u), None))
+
+def _in_adjacency_(G):
+    r'''returns (in_indptr, in_neighbors) for the CompiledGraph G: the 
+    transpose of its CSR form, so the nodes with an edge to node i are
+    `in_neighbors[in_indptr[i]:in_indptr[i+1]]`.  For an undirected G this 
+    is just (indptr, indices).'''
+    if not G.directed:
+        return G._indptr_, G._indices_
+    N = G.order()
+    sources = np.repeat(np.arange(N, dtype = np.int64), np.diff(G.indptr))
+    order = np.argsort(G.indices, kind = 'stable')
+    in_indptr = np.zeros(N+1, dtype = np.int64)
+    in_indptr[1:] = np.cumsum(np.bincount(G.indices, minlength = N))
+    return memoryview(in_indptr), memoryview(sources[order])
+
+def _fast_nonMarkov_SIR_compiled_(G, trans_and_rec_time_fxn, 
+                                    trans_and_rec_time_args, initial_infecteds,
+                                    initial_recovereds, rho, tmin, tmax, 
+                                    interventions, queue, stop_when, 
+                                    report_times, return_full_data, 
+                                    return_state, rng):
+    r'''
+    Does the work of fast_nonMarkov_SIR when G is a CompiledGraph.
+
+    Rather than dicts keyed by node, the status, recovery time and predicted
+    infection time of the nodes are held in numpy arrays indexed by node 
+    index: status is an int8 array (0 for S, 1 for I, 2 for R) and the times 
+    are float64 arrays.  This is 17 bytes per node, and avoids any hashing
+    of nodes during the simulation.  The arrays are accessed through 
+    memoryviews which is much faster than indexing the numpy arrays one 
+    entry at a time.
+
+    Events are held in an _EventQueue_ and the processing of transmissions 
+    and recoveries (_process_trans_SIR_ and _process_rec_SIR_ in the 
+    networkx version) is done directly in the loop.
+
+    If there are interventions, each is an event in the queue.  Every 
+    transmission is then scheduled (rather than only those that would beat 
+    the currently predicted infection time of the target, since the earlier
+    one might be cancelled), and the token of each pending transmission is 
+    kept in `pending` (keyed by `(source, target)`) so that interventions 
+    can cancel it.  Removed edges are flagged in the bytearray `removed`, 
+    aligned with G.indices.  If G is directed, the transmissions into a 
+    node come along its in-edges, so these are found from the transpose 
+    (in_indptr, in_neighbors).
+
+    initial_infecteds and initial_recovereds are assumed to already be given
+    as node indices.
+    '''
+    N = G.order()
+    status_array = np.zeros(N, dtype = np.int8)
+    rec_time_array = np.full(N, tmin-1, dtype = np.float64)
+    pred_inf_time_array = np.full(N, float('Inf'), dtype = np.float64)
+    status = memoryview(status_array)
+    rec_time = memoryview(rec_time_array)
+    pred_inf_time = memoryview(pred_inf_time_array)
+    indptr = G._indptr_
+    indices = G._indices_
+    
+    if initial_recovereds is not None:
+        for node in initial_recovereds:
+            status[node] = 2
+    initial_R = int(np.count_nonzero(status_array == 2))
+        
+    Q = _EventQueue_(tmax, queue)
+    push = Q.push
+    pop = Q.pop
+
+    if initial_infecteds is None:  #create initial infecteds list if not given
+        if rho is None:
+            initial_number = 1
+        else:
+            initial_number = int(round(N*rho))
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
+    elif G.has_node(initial_infecteds):
+        initial_infecteds=[initial_infecteds]
+
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SIR', tmin)
+    times, S, I, R = _make_recorders_(report_times, tmin, N-initial_R, 0, 
+                                        initial_R)
+    transmissions = []
+
+    for u in initial_infecteds:
+        pred_inf_time[u] = tmin
+        push(tmin, _TRANS_EVENT_, -1, u)
+
+    if interventions:
+        interventions = list(interventions)
+        removed = bytearray(len(G.indices))
+        pending = {}
+        in_indptr, in_neighbors = _in_adjacency_(G)
+        for k, (when, action, items) in enumerate(interventions):
+            if action not in ('vaccinate', 'isolate', 'remove_edges'):
+                raise EoN.EoNError("unknown intervention {}".format(action))
+            push(when, _INTERVENTION_EVENT_, k, -1)
+    else:
+        removed = None
+        pending = None
+
+    while Q:
+        time, event_type, source, target = pop()
+        if event_type == _TRANS_EVENT_:
+            if pending is not None:
+                pending.pop((source, target), None)
+            if status[target] == 0:  #nothing happens if already infected.
+                status[target] = 1
+                pred_inf_time[target] = time
+                times.append(time)
+                transmissions.append((time, None if source<0 else source, 
+                                        target))
+                S.append(S[-1]-1) #one less susceptible
+                I.append(I[-1]+1) #one more infected
+                R.append(R[-1])   #no change to recovered
+                
+                if removed is None:
+                    suscep_neighbors = [v for v in 
+                                        indices[indptr[target]:indptr[target+1]]
+                                        if status[v] == 0]
+                else:
+                    suscep_neighbors = [indices[position] for position in 
+                                        range(indptr[target], indptr[target+1])
+                                        if not removed[position] and 
+                                        status[indices[position]] == 0]
+                trans_delay, rec_delay = trans_and_rec_time_fxn(target, 
+                                                suscep_neighbors,
+                                                *trans_and_rec_time_args)
+                target_rec_time = time + rec_delay
+                rec_time[target] = target_rec_time
+                if target_rec_time<=tmax:
+                    push(target_rec_time, _REC_EVENT_, target, target)
+                for v in trans_delay:
+                    inf_time = time + trans_delay[v]
+                    if inf_time<= target_rec_time and inf_time<=tmax:
+                        if pending is not None:
+                            pending[(target, v)] = push(inf_time, _TRANS_EVENT_, 
+                                                        target, v)
+                        elif inf_time < pred_inf_time[v]:
+                            push(inf_time, _TRANS_EVENT_, target, v)
+                            pred_inf_time[v] = inf_time
+        elif event_type == _REC_EVENT_:
+            times.append(time)
+            S.append(S[-1])   #no change to number susceptible
+            I.append(I[-1]-1) #one less infected
+            R.append(R[-1]+1) #one more recovered
+            status[target] = 2
+        else:
+            when, action, items = interventions[source]
+            if action == 'vaccinate':
+                vaccinated = 0
+                for node in G.to_indices(items):
+                    if status[node] == 0:
+                        status[node] = 2
+                        rec_time[node] = time
+                        vaccinated += 1
+                        for position in range(in_indptr[node], in_indptr[node+1]):
+                            Q.cancel(pending.pop((in_neighbors[position], node), None))
+                if vaccinated:  #a single event in the output
+                    times.append(time)
+                    S.append(S[-1]-vaccinated)
+                    I.append(I[-1])
+                    R.append(R[-1]+vaccinated)
+            elif action == 'isolate':
+                nodes = G.to_indices(items)
+                edges = [(u, indices[position]) for u in nodes
+                            for position in range(indptr[u], indptr[u+1])
+                            if not removed[position]]
+                if G.directed:
+                    edges.extend((in_neighbors[position], u) for u in nodes
+                                    for position in 
+                                    range(in_indptr[u], in_indptr[u+1]))
+                _remove_edges_compiled_(G, edges, removed, pending, Q)
+            else:
+                _remove_edges_compiled_(G, [(G.index(u), G.index(v)) 
+                                            for u, v in items], 
+                                        removed, pending, Q)
+        if stop is not None and stop(time, S[-1], I[-1], R[-1]):
+            break
+
+    state = _simulation_state_(G, status_array, times, SIR = True, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+
+    times = times[len(initial_infecteds):]
+    S=S[len(initial_infecteds):]
+    I=I[len(initial_infecteds):]
+    R=R[len(initial_infecteds):]
+
+    if not return_full_data:
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I), scipy.array(R)), stop, state)
+    else:
+        infected = np.flatnonzero((status_array != 0) & 
+                                    np.isfinite(pred_inf_time_array))
+        recovered = np.flatnonzero(status_array == 2)
+        infection_times = dict(zip(infected.tolist(), 
+                                    pred_inf_time_array[infected].tolist()))
+        recovery_times = dict(zip(recovered.tolist(), 
+                                    rec_time_array[recovered].tolist()))
+        node_history = _transform_to_node_history_(infection_times, recovery_times, 
+                                                    tmin, SIR = True)
+        return _final_output_(_compiled_Simulation_Investigation_(G, 
+                                    node_history, transmissions), stop, state)
+
+def _trans_and_rec_time_Markovian_const_trans_(node, sus_neighbors, tau, 
+                                                rec_rate_fxn, rng = _global_rng_):
     r'''I introduced this with a goal of making the code run faster.  It looks
     like the fancy way of selecting the infectees and then choosing their 
     infection times is slower than just cycling through, finding infection
@@ -1675,16 +3778,16 @@ def _trans_and_rec_time_Markovian_const_trans_(node, sus_neighbors, tau, rec_rat
     commented out the more "sophisticated" approach.
     '''
     
-    duration = random.expovariate(rec_rate_fxn(node))
+    duration = rng.expovariate(rec_rate_fxn(node))
 
         
-    trans_prob = 1-scipy.exp(-tau*duration)
-    number_to_infect = scipy.random.binomial(len(sus_neighbors),trans_prob)
+    trans_prob = 1-np.exp(-tau*duration)
+    number_to_infect = rng.binomial(len(sus_neighbors),trans_prob)
         #print(len(suscep_neighbors),number_to_infect,trans_prob, tau, duration)
-    transmission_recipients = random.sample(sus_neighbors,number_to_infect)
+    transmission_recipients = rng.sample(sus_neighbors,number_to_infect)
     trans_delay = {}
     for v in transmission_recipients:
-        trans_delay[v] = _truncated_exponential_(tau, duration)
+        trans_delay[v] = _truncated_exponential_(tau, duration, rng)
     return trans_delay, duration
 #     duration = random.expovariate(rec_rate_fxn(node))
 #     trans_delay = {}
@@ -1718,9 +3821,34 @@ def _trans_and_rec_time_Markovian_const_trans_(node, sus_neighbors, tau, rec_rat
     #    trans_delay[v] = _truncated_exponential_(tau, duration)
     return trans_delay, duration
 
+def _trans_and_rec_time_Markovian_compiled_(node, sus_neighbors, indptr, 
+                                            indices, trans_rates, gamma, 
+                                            rec_weights, rng = _global_rng_):
+    r'''Used by fast_SIR with a transmission_weight on a CompiledGraph.  The
+    delays are drawn as by its trans_time_fxn and rec_time_fxn, but the 
+    rate of each edge is read from trans_rates at its position (walking the
+    edges of node) rather than looked up from its two ends.'''
+    rec_rate = gamma if rec_weights is None else gamma*rec_weights[node]
+    if rec_rate > 0:
+        duration = rng.expovariate(rec_rate)
+    else:
+        duration = float('Inf')
+    susceptible = set(sus_neighbors)
+    trans_delay = {}
+    for position in range(indptr[node], indptr[node+1]):
+        v = indices[position]
+        if v in susceptible:
+            rate = trans_rates[position]
+            if rate > 0:
+                trans_delay[v] = rng.expovariate(rate)
+    return trans_delay, duration
+
 def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None, 
                 rho = None, tmin = 0, tmax=float('Inf'), transmission_weight = None, 
-                recovery_weight = None, return_full_data = False):
+                recovery_weight = None, return_full_data = False, 
+                interventions = None, queue = 'heap', stop_when = None, 
+                report_times = None, initial_state = None, 
+                return_state = False, rng = None):
     r'''
     fast SIR simulation for exponentially distributed infection and 
     recovery times
@@ -1733,7 +3861,7 @@ def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None,
 
     :Arguments: 
 
-    **G** networkx Graph
+    **G** networkx Graph or CompiledGraph
         The underlying network
 
     **tau** number
@@ -1785,6 +3913,58 @@ def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None,
         Tells whether a Simulation_Investigation object should be returned.  
 
     
+    **interventions** iterable of tuples (default None)
+        Only available if G is a CompiledGraph.  See fast_nonMarkov_SIR.
+
+    **queue** string (default 'heap')
+        the priority queue used to hold pending events: either 'heap'
+        (heapq) or 'calendar' (a calendar queue with adaptive bucket
+        width, which is faster when very many events are pending, for 
+        example with a large initial infection).
+
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, checked after each event.
+        Either a dict of thresholds, for example `{'I': 100}` (stop once 
+        I >= 100), `{'R': 1000}` or `{'infections': 1000}` (stop once the 
+        cumulative number of infections, including the initial ones, 
+        reaches 1000), or `{'S': 9000}` (stop once S <= 9000); or a 
+        function called as `stop_when(t, S, I, R)` (`stop_when(t, S, I)` 
+        for SIS) which returns a true value to stop.  If stop_when is given,
+        the reason for stopping (the key reached, the return value of the 
+        function, or None if it was not stopped early) is returned as an 
+        additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times rather than at
+        every event (giving the same values as `subsample` would), and the
+        times returned are report_times.  report_times[0] must not be 
+        earlier than tmin.  Cannot be used with return_full_data.  If the 
+        simulation is stopped early by stop_when, the values at the report
+        times after it stopped are NaN.
+
+    **initial_state** SimulationState (default None)
+        if given, the simulation continues from this state, which was 
+        returned by an earlier simulation with `return_state=True`.  It 
+        starts at time initial_state.t (tmin is ignored) with the nodes 
+        that were infected or recovered then.  The parameters need not be the same 
+        as in the earlier simulation.  Cannot be used with 
+        initial_infecteds, initial_recovereds or rho.
+
+    **return_state** boolean (default False)
+        if True, a SimulationState holding the statuses of the nodes at the 
+        last event of the simulation (see `SimulationState`) is 
+        returned as an additional final output.  It can be passed as 
+        initial_state to continue the simulation.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        the source of random numbers.  If None, Python's `random` module 
+        (and numpy's global generator) is used.
+        Otherwise all random numbers are drawn from a numpy Generator 
+        (rng itself, or one seeded with rng), so a given rng always gives
+        the same result and nothing global is used or changed.  For 
+        independent simulations in parallel, use seeds from 
+        `numpy.random.SeedSequence(seed).spawn`.
+
     :Returns:
         
     **times, S, I, R** Scipy arrays
@@ -1815,6 +3995,25 @@ def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None,
         plt.plot(t, I)
     '''
     #tested in test_SIR_dynamics
+    rng = _get_rng_(rng)
+    if isinstance(G, CompiledGraph):
+        trans_weights, rec_weights = _compiled_weights_(G, transmission_weight,
+                                                        recovery_weight)
+        if trans_weights is not None:
+            #read the rate of each edge by its position.
+            return _fast_nonMarkov_SIR_(G, 
+                            trans_and_rec_time_fxn=_trans_and_rec_time_Markovian_compiled_,
+                            trans_and_rec_time_args=(G._indptr_, G._indices_, 
+                                                    memoryview(tau*trans_weights),
+                                                    gamma, rec_weights, rng),
+                            initial_infecteds = initial_infecteds, 
+                            initial_recovereds = initial_recovereds, 
+                            rho=rho, tmin = tmin, tmax = tmax, 
+                            interventions = interventions, queue = queue,
+                            stop_when = stop_when, report_times = report_times,
+                            return_full_data = return_full_data, 
+                            initial_state = initial_state, 
+                            return_state = return_state, rng = rng)
     if transmission_weight is not None or tau*gamma == 0:
         trans_rate_fxn, rec_rate_fxn = EoN._get_rate_functions_(G, tau, gamma, 
                                                     transmission_weight,
@@ -1822,26 +4021,30 @@ def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None,
         def trans_time_fxn(source, target, trans_rate_fxn):
             rate = trans_rate_fxn(source, target)
             if rate >0:
-                return random.expovariate(rate)
+                return rng.expovariate(rate)
             else:
                 return float('Inf')
         def rec_time_fxn(node, rec_rate_fxn):
             rate = rec_rate_fxn(node)
             if rate >0:
-                return random.expovariate(rate)
+                return rng.expovariate(rate)
             else:
                 return float('Inf') 
 
         trans_time_args = (trans_rate_fxn,)
         rec_time_args = (rec_rate_fxn,)
-        return fast_nonMarkov_SIR(G, trans_time_fxn = trans_time_fxn, 
+        return _fast_nonMarkov_SIR_(G, trans_time_fxn = trans_time_fxn, 
                         rec_time_fxn = rec_time_fxn,
                         trans_time_args = trans_time_args, 
                         rec_time_args = rec_time_args, 
                         initial_infecteds = initial_infecteds, 
                         initial_recovereds = initial_recovereds, 
                         rho=rho, tmin = tmin, tmax = tmax, 
-                        return_full_data = return_full_data)
+                        interventions = interventions, queue = queue,
+                        stop_when = stop_when, report_times = report_times,
+                        return_full_data = return_full_data, 
+                        initial_state = initial_state, 
+                        return_state = return_state, rng = rng)
     else:
         #the transmission rate is tau for all edges.  We can use this
         #to speed up the code.
@@ -1851,13 +4054,17 @@ def fast_SIR(G, tau, gamma, initial_infecteds = None, initial_recovereds = None,
                                                     transmission_weight,
                                                     recovery_weight)
         
-        return fast_nonMarkov_SIR(G, 
+        return _fast_nonMarkov_SIR_(G, 
                         trans_and_rec_time_fxn=_trans_and_rec_time_Markovian_const_trans_,
-                        trans_and_rec_time_args=(tau, rec_rate_fxn),
+                        trans_and_rec_time_args=(tau, rec_rate_fxn, rng),
                         initial_infecteds = initial_infecteds, 
                         initial_recovereds = initial_recovereds, 
                         rho=rho, tmin = tmin, tmax = tmax, 
-                        return_full_data = return_full_data)
+                        interventions = interventions, queue = queue,
+                        stop_when = stop_when, report_times = report_times,
+                        return_full_data = return_full_data, 
+                        initial_state = initial_state, 
+                        return_state = return_state, rng = rng)
 
 
 
@@ -1870,7 +4077,10 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
                         initial_infecteds = None,
                         initial_recovereds = None,
                         rho=None, tmin = 0, tmax = float('Inf'), 
-                        return_full_data = False):
+                        return_full_data = False, interventions = None, 
+                        queue = 'heap', stop_when = None, report_times = None, 
+                        initial_state = None, return_state = False, 
+                        rng = None):
     r'''
     A modification of the algorithm in figure A.3 of Kiss, Miller, & 
     Simon to allow for user-defined rules governing time of 
@@ -1893,7 +4103,11 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
 
     :Arguments: 
 
-    **G** Networkx Graph
+    **G** Networkx Graph or CompiledGraph
+        If G is a CompiledGraph, the status and event times of the nodes 
+        are held in numpy arrays (17 bytes per node) rather than dicts, so 
+        this is much lighter for large networks.  The user-defined 
+        functions below are still called with the node labels.
         
     **trans_time_fxn** a user-defined function
         returns the delay until transmission for an edge.  May depend 
@@ -1982,6 +4196,46 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
 
 
     
+    **interventions** iterable of tuples (default None)
+        Only available if G is a CompiledGraph.  Each intervention is a 
+        tuple `(time, action, items)` where action is one of
+        
+        - `'vaccinate'`: items is an iterable of nodes.  Those which are 
+          still susceptible at `time` become recovered (this is a single
+          event in the output, in which S falls and R rises by the number
+          vaccinated).
+        - `'isolate'`: items is an iterable of nodes.  All of their edges 
+          (both in- and out-edges if G is directed) are removed at `time`.
+        - `'remove_edges'`: items is an iterable of edges `(u, v)` which are 
+          removed at `time`.
+              
+        Any transmission that was scheduled along a removed edge or to a 
+        vaccinated node is cancelled.
+        
+    **queue** string (default 'heap')
+        the priority queue used to hold pending events, either 'heap' or 
+        'calendar' as for `fast_SIR`.
+
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, as for `fast_SIR`.  If it
+        is given, the reason for stopping is an additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times, as for 
+        `fast_SIR`.
+
+    **initial_state** SimulationState (default None)
+    **return_state** boolean (default False)
+        only for the Markovian simulations (see `SimulationState`).  The
+        pending events of a nonMarkov simulation depend on its history, 
+        which a SimulationState does not keep, so these raise an EoNError.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        used only to choose the initial infections if initial_infecteds is
+        not given; the user-defined functions must draw their own random 
+        numbers.  A seed 
+        or numpy Generator makes that choice reproducible.
+
     :Returns: 
         
     **times, S, I, R** Scipy arrays
@@ -2034,6 +4288,42 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
         # initial condition has first 100 nodes in G infected.
     
     '''                                 
+    if initial_state is not None or return_state:
+        raise EoN.EoNError("fast_nonMarkov_SIR cannot use initial_state or return_state")
+    if isinstance(G, CompiledGraph):
+        trans_time_fxn, rec_time_fxn, trans_and_rec_time_fxn = \
+                    _labeled_time_fxns_(G, trans_time_fxn, rec_time_fxn, 
+                                        trans_and_rec_time_fxn)
+    return _fast_nonMarkov_SIR_(G, trans_time_fxn, rec_time_fxn, 
+                        trans_and_rec_time_fxn, trans_time_args, rec_time_args,
+                        trans_and_rec_time_args, initial_infecteds, 
+                        initial_recovereds, rho, tmin, tmax, return_full_data,
+                        interventions, queue, stop_when, report_times, 
+                        rng = rng)
+
+def _fast_nonMarkov_SIR_(G, trans_time_fxn=None,
+                        rec_time_fxn=None,
+                        trans_and_rec_time_fxn = None,
+                        trans_time_args=(),
+                        rec_time_args=(),
+                        trans_and_rec_time_args = (),
+                        initial_infecteds = None,
+                        initial_recovereds = None,
+                        rho=None, tmin = 0, tmax = float('Inf'), 
+                        return_full_data = False, interventions = None, 
+                        queue = 'heap', stop_when = None, report_times = None, 
+                        initial_state = None, return_state = False, 
+                        rng = None):
+    r'''does the work of fast_nonMarkov_SIR.  fast_SIR calls it directly, 
+    since with Markovian events it can continue from and return a 
+    SimulationState.'''
+    if report_times is not None and return_full_data:
+        raise EoN.EoNError("cannot use report_times with return_full_data")
+    rng = _get_rng_(rng)
+    if initial_state is not None:
+        tmin, initial_infecteds, initial_recovereds = _resume_(
+                                initial_state, initial_infecteds, 
+                                initial_recovereds, rho, SIR = True)
     if rho and initial_infecteds:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
     if rho and initial_recovereds:
@@ -2049,6 +4339,17 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
     if not trans_and_rec_time_fxn: #we define the joint function.
         trans_and_rec_time_fxn =  _find_trans_and_rec_delays_SIR_
         trans_and_rec_time_args = (trans_time_fxn, rec_time_fxn, trans_time_args, rec_time_args)
+
+    if isinstance(G, CompiledGraph):
+        return _fast_nonMarkov_SIR_compiled_(G, trans_and_rec_time_fxn, 
+                                    trans_and_rec_time_args, 
+                                    G.to_indices(initial_infecteds),
+                                    G.to_indices(initial_recovereds), 
+                                    rho, tmin, tmax, interventions, 
+                                    queue, stop_when, report_times, 
+                                    return_full_data, return_state, rng)
+    elif interventions:
+        raise EoN.EoNError("interventions require G to be a CompiledGraph")
         
     #now we define the initial setup.
     status = defaultdict(lambda: 'S') #node status defaults to 'S'
@@ -2057,23 +4358,26 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
         for node in initial_recovereds:
             status[node] = 'R'
             rec_time[node] = tmin-1 #default value for these.  Ensures that the recovered nodes appear with a time
+    initial_R = len(status) #so far only the recovered nodes have a status
     pred_inf_time = defaultdict(lambda: float('Inf')) 
         #infection time defaults to \infty  --- this could be set to tmax, 
         #probably with a slight improvement to performance.
     
-    Q = myQueue(tmax)
+    Q = myQueue(tmax, queue)
 
     if initial_infecteds is None:  #create initial infecteds list if not given
         if rho is None:
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
     #else it is assumed to be a list of nodes.
         
-    times, S, I, R= ([tmin], [G.order()], [0], [0])  
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SIR', tmin)
+    times, S, I, R = _make_recorders_(report_times, tmin, 
+                                        G.order()-initial_R, 0, initial_R)
     transmissions = []
     
     for u in initial_infecteds:
@@ -2091,20 +4395,28 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
     #So if return_full_data is true, these are correct
 
     while Q:  #all the work is done in this while loop.
-        Q.pop_and_run()
+        time = Q.pop_and_run()
+        if stop is not None and stop(time, S[-1], I[-1], R[-1]):
+            break
 
     #the initial infections were treated as ordinary infection events at 
     #time 0.
     #So each initial infection added an entry at time 0 to lists.
     #We'd like to get rid these excess events.
+    state = _simulation_state_(G, status, times, SIR = True, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+
     times = times[len(initial_infecteds):]
     S=S[len(initial_infecteds):]
     I=I[len(initial_infecteds):]
     R=R[len(initial_infecteds):]
 
     if not return_full_data:
-        return scipy.array(times), scipy.array(S), scipy.array(I), \
-               scipy.array(R) 
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I), scipy.array(R)), stop, state)
     else:
         #strip pred_inf_time and rec_time down to just the values for nodes 
         #that became infected
@@ -2117,7 +4429,8 @@ def fast_nonMarkov_SIR(G, trans_time_fxn=None,
                 
         node_history = _transform_to_node_history_(infection_times, recovery_times, 
                                                     tmin, SIR = True)
-        return EoN.Simulation_Investigation(G, node_history, transmissions)
+        return _final_output_(EoN.Simulation_Investigation(G, node_history, 
+                                                    transmissions), stop, state)
 
 
 def _find_trans_and_rec_delays_SIS_(node, neighbors, trans_time_fxn, 
@@ -2133,7 +4446,8 @@ def _find_trans_and_rec_delays_SIS_(node, neighbors, trans_time_fxn,
 
 def _process_trans_SIS_Markov(time, G, source, target, times, S, I, Q,
                         status, rec_time, infection_times, recovery_times, 
-                        transmissions, trans_rate_fxn, rec_rate_fxn):
+                        transmissions, trans_rate_fxn, rec_rate_fxn, 
+                        rng = _global_rng_):
     r'''From figure A.6 of Kiss, Miller, & Simon.  Please cite the
     book if using this algorithm.
 
@@ -2191,12 +4505,12 @@ def _process_trans_SIS_Markov(time, G, source, target, times, S, I, Q,
     if status[target] == 'S':
         status[target] = 'I'
         transmissions.append((time, source, target))
+        times.append(time)
         I.append(I[-1]+1) #one more infected
         S.append(S[-1]-1) #one less susceptible
-        times.append(time)
         rec_rate = rec_rate_fxn(target)
         if rec_rate>0:
-            rec_time[target] = time + random.expovariate(rec_rate_fxn(target))
+            rec_time[target] = time + rng.expovariate(rec_rate_fxn(target))
         elif rec_rate == 0:
             rec_time[target] = float('Inf')
         else:
@@ -2212,8 +4526,9 @@ def _process_trans_SIS_Markov(time, G, source, target, times, S, I, Q,
                                             (G, target, v, times, S, I, Q, 
                                             status, rec_time, infection_times, 
                                             recovery_times, transmissions, 
-                                            trans_rate_fxn, rec_rate_fxn
-                                            )
+                                            trans_rate_fxn, rec_rate_fxn, rng
+                                            ),
+                                        rng = rng
                                   )
         infection_times[target].append(time)
     if source is not None:
@@ -2223,8 +4538,9 @@ def _process_trans_SIS_Markov(time, G, source, target, times, S, I, Q,
                                             S, I, Q, status, 
                                             rec_time, infection_times, 
                                             recovery_times, transmissions, 
-                                            trans_rate_fxn, rec_rate_fxn
-                                            )
+                                            trans_rate_fxn, rec_rate_fxn, rng
+                                            ),
+                                rng = rng
                              )
 
 def _process_trans_SIS_nonMarkov_(time, G, source, target, future_transmissions,
@@ -2318,7 +4634,7 @@ def _process_trans_SIS_nonMarkov_(time, G, source, target, future_transmissions,
 
 
 def _find_next_trans_SIS_Markov(Q, time, tau, source, target, status, rec_time, 
-                            trans_event_args=()):
+                            trans_event_args=(), rng = _global_rng_):
     r'''From figure A.6 of Kiss, Miller, & Simon.  Please cite the
     book if using this algorithm.
 
@@ -2362,7 +4678,7 @@ def _find_next_trans_SIS_Markov(Q, time, tau, source, target, status, rec_time,
     if rec_time[target]<rec_time[source]: 
         #if target is susceptible, then rec_time[target]<time
         if tau>0:
-            delay = random.expovariate(tau)
+            delay = rng.expovariate(tau)
         elif tau == 0:
             delay = float('Inf')
         else:
@@ -2370,7 +4686,7 @@ def _find_next_trans_SIS_Markov(Q, time, tau, source, target, status, rec_time,
         #transmission_time = max(time, rec_time[target]) + delay
         transmission_time = time + delay
         if transmission_time<rec_time[target]:
-            delay = random.expovariate(tau)
+            delay = rng.expovariate(tau)
             transmission_time = rec_time[target]+delay
         if transmission_time < rec_time[source] and transmission_time < Q.tmax:
             Q.add(transmission_time, _process_trans_SIS_Markov, 
@@ -2389,9 +4705,148 @@ def _process_rec_SIS_(time, node, times, recovery_times, S, I, status):
     I.append(I[-1]-1) #one less infected
     status[node] = 'S'
 
+def _fast_SIS_compiled_(G, tau, gamma, trans_rates, rec_rates, 
+                        initial_infecteds, rho, tmin, tmax, queue, 
+                        stop_when, report_times, return_full_data, 
+                        return_state, rng):
+    r'''
+    Does the work of fast_SIS when G is a CompiledGraph.
+
+    Status (0 for S, 1 for I) and recovery times are held in numpy arrays 
+    indexed by node, and events in an _EventQueue_.  The work of 
+    _process_trans_SIS_Markov, _find_next_trans_SIS_Markov and 
+    _process_rec_SIS_ is done directly in the loop.
+
+    trans_rates is None if every edge has rate tau, and otherwise a 
+    memoryview of the rates aligned with G.indices.  Similarly rec_rates is
+    None or a memoryview of the recovery rates of the nodes.
+
+    A transmission event stores the edge position (from source to target)
+    in place of the source, so its rate is found without searching the 
+    neighbors of the source.  The source is indices[reverse[position]] (or
+    for a directed G, found by bisecting indptr).  Initial infections have 
+    position -1.
+    
+    initial_infecteds is assumed to already be given as node indices.
+    '''
+    N = G.order()
+    status_array = np.zeros(N, dtype = np.int8)
+    status = memoryview(status_array)
+    rec_time = memoryview(np.full(N, tmin-1, dtype = np.float64))
+    indptr = G._indptr_
+    indices = G._indices_
+    if G.directed:
+        reverse = None
+    else:
+        reverse = memoryview(G.reverse_edge_positions())
+    expovariate = rng.expovariate
+
+    Q = _EventQueue_(tmax, queue)
+    push = Q.push
+    pop = Q.pop
+
+    if initial_infecteds is None:
+        if rho is None:
+            initial_number = 1
+        else:
+            initial_number = int(round(N*rho))
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
+    elif G.has_node(initial_infecteds):
+        initial_infecteds=[initial_infecteds]
+
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SI', tmin)
+    times, S, I = _make_recorders_(report_times, tmin, N, 0)
+    infection_times = defaultdict(lambda: []) #defaults to empty list
+    recovery_times = defaultdict(lambda: [])
+    transmissions = []
+
+    def find_next_trans(time, rate, source, target, position):
+        #see _find_next_trans_SIS_Markov
+        if rec_time[target]<rec_time[source]: 
+            if rate>0:
+                delay = expovariate(rate)
+            elif rate == 0:
+                delay = float('Inf')
+            else:
+                raise EoN.EoNError('rate must be non-negative')
+            transmission_time = time + delay
+            if transmission_time<rec_time[target]:
+                delay = expovariate(rate)
+                transmission_time = rec_time[target]+delay
+            if transmission_time < rec_time[source] and transmission_time < tmax:
+                push(transmission_time, _TRANS_EVENT_, position, target)
+
+    for u in initial_infecteds:
+        push(tmin, _TRANS_EVENT_, -1, u)
+
+    while Q:
+        time, event_type, position, target = pop()
+        if event_type == _TRANS_EVENT_:
+            if position < 0:
+                source = -1
+            elif reverse is None:
+                source = bisect.bisect_right(indptr, position) - 1
+            else:
+                source = indices[reverse[position]]
+            if status[target] == 0:
+                status[target] = 1
+                times.append(time)
+                I.append(I[-1]+1) #one more infected
+                S.append(S[-1]-1) #one less susceptible
+                rec_rate = gamma if rec_rates is None else rec_rates[target]
+                if rec_rate>0:
+                    rec_time[target] = time + expovariate(rec_rate)
+                elif rec_rate == 0:
+                    rec_time[target] = float('Inf')
+                else:
+                    raise EoN.EoNError('recovery rate must be non-negative')
+                if rec_time[target]<tmax:
+                    push(rec_time[target], _REC_EVENT_, target, target)
+                for edge in range(indptr[target], indptr[target+1]):
+                    find_next_trans(time, 
+                            tau if trans_rates is None else trans_rates[edge],
+                            target, indices[edge], edge)
+                if return_full_data:
+                    transmissions.append((time, None if source<0 else source, 
+                                            target))
+                    infection_times[target].append(time)
+            if source >= 0:
+                find_next_trans(time, 
+                            tau if trans_rates is None else trans_rates[position],
+                            source, target, position)
+        else:
+            times.append(time)
+            if return_full_data:
+                recovery_times[target].append(time)
+            S.append(S[-1]+1)   #one more susceptible
+            I.append(I[-1]-1) #one less infected
+            status[target] = 0
+        if stop is not None and stop(time, S[-1], I[-1]):
+            break
+
+    state = _simulation_state_(G, status_array, times, SIR = False, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+
+    times = times[len(initial_infecteds):]
+    S=S[len(initial_infecteds):]
+    I=I[len(initial_infecteds):]
+
+    if not return_full_data:
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I)), stop, state)
+    else:
+        node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = False)
+        return _final_output_(_compiled_Simulation_Investigation_(G, 
+                                    node_history, transmissions, SIR=False), stop, state)
+
 def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100, 
                 transmission_weight = None, recovery_weight = None, 
-                return_full_data = False):
+                return_full_data = False, queue = 'heap', stop_when = None, 
+                report_times = None, initial_state = None, 
+                return_state = False, rng = None):
     r'''Fast SIS simulations for epidemics on weighted or unweighted
     networks, allowing edge and node weights to scale the transmission
     and recovery rates.  Assumes exponentially distributed times to recovery
@@ -2402,7 +4857,7 @@ def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100
 
     :Arguments: 
     
-    **G** networkx Graph
+    **G** networkx Graph or CompiledGraph
         The underlying network
 
     **tau** positive float
@@ -2441,6 +4896,32 @@ def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100
     **return_full_data** boolean (default False)
         Tells whether a Simulation_Investigation object should be returned.  
 
+    **queue** string (default 'heap')
+        the priority queue used to hold pending events, either 'heap' or 
+        'calendar' as for `fast_SIR`.
+
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, as for `fast_SIR`.  If it
+        is given, the reason for stopping is an additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times, as for 
+        `fast_SIR`.
+
+    **initial_state** SimulationState (default None)
+        if given, the simulation continues from this state, as for 
+        `fast_SIR`.
+
+    **return_state** boolean (default False)
+        if True, the final SimulationState is an additional final output,
+        as for `fast_SIR`.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the transmission and recovery times and the initial 
+        infections.  A seed or numpy Generator makes the simulation 
+        reproducible without touching Python's `random` module or numpy's 
+        global generator, which are used if it is None.
+
     :Returns: 
         
     **times, S, I** each a scipy array
@@ -2472,9 +4953,26 @@ def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100
         plt.plot(t, I)
             
     '''
+    if report_times is not None and return_full_data:
+        raise EoN.EoNError("cannot use report_times with return_full_data")
+    rng = _get_rng_(rng)
+    if initial_state is not None:
+        tmin, initial_infecteds = _resume_(initial_state, initial_infecteds, 
+                                            None, rho, SIR = False)[:2]
     if rho is not None and initial_infecteds is not None:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
     
+    if isinstance(G, CompiledGraph):
+        trans_weights, rec_weights = _compiled_weights_(G, transmission_weight,
+                                                        recovery_weight)
+        trans_rates = None if trans_weights is None else memoryview(tau*trans_weights)
+        rec_rates = None if rec_weights is None else memoryview(gamma*rec_weights)
+        return _fast_SIS_compiled_(G, tau, gamma, trans_rates, rec_rates,
+                                    G.to_indices(initial_infecteds), rho, 
+                                    tmin, tmax, queue, stop_when, 
+                                    report_times, return_full_data, 
+                                    return_state, rng)
+
     trans_rate_fxn, rec_rate_fxn = EoN._get_rate_functions_(G, tau, gamma, 
                                                 transmission_weight,
                                                 recovery_weight)
@@ -2484,14 +4982,13 @@ def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
 
-    times = [tmin]
-    S = [G.order()]
-    I = [0]
-    Q = myQueue(tmax)
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SI', tmin)
+    times, S, I = _make_recorders_(report_times, tmin, G.order(), 0)
+    Q = myQueue(tmax, queue)
     status = defaultdict(lambda: 'S') #node status defaults to 'S'
     rec_time = defaultdict(lambda: tmin-1) #node recovery time defaults to -1
 
@@ -2502,31 +4999,45 @@ def fast_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin=0, tmax=100
         Q.add(tmin, _process_trans_SIS_Markov, 
                             args = (G, None, u, times, 
                                     S, I, Q, status, rec_time, infection_times, recovery_times, 
-                                    transmissions, trans_rate_fxn, rec_rate_fxn)
+                                    transmissions, trans_rate_fxn, rec_rate_fxn,
+                                    rng)
                         )
     while Q:
-        Q.pop_and_run()
+        time = Q.pop_and_run()
+        if stop is not None and stop(time, S[-1], I[-1]):
+            break
 
     #the initial infections were treated as ordinary infection events at 
     #time 0.
     #So each initial infection added an entry at time tmin to lists.
     #We'd like to get rid these excess events.
+    state = _simulation_state_(G, status, times, SIR = False, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+
     times = times[len(initial_infecteds):]
     S=S[len(initial_infecteds):]
     I=I[len(initial_infecteds):]
 
     if not return_full_data:
-        return scipy.array(times), scipy.array(S), scipy.array(I)
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I)), stop, state)
     else:
         node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = False)
-        return EoN.Simulation_Investigation(G, node_history, transmissions, SIR=False)
+        return _final_output_(EoN.Simulation_Investigation(G, node_history, 
+                                            transmissions, SIR=False), stop, state)
 
 
 def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None, 
                         trans_and_rec_time_fxn = None, trans_time_args=(),
                         rec_time_args = (), trans_and_rec_time_args=(),
                         initial_infecteds = None, rho = None, tmin=0, tmax = 100,
-                        return_full_data = False):
+                        return_full_data = False, queue = 'heap', 
+                        stop_when = None, report_times = None, 
+                        initial_state = None, return_state = False, 
+                        rng = None):
                         
     r'''Similar to fast_nonMarkov_SIR. 
     
@@ -2538,8 +5049,9 @@ def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None,
 
     :Arguments: 
     
-    **G** networkx Graph
-        The underlying network
+    **G** networkx Graph or CompiledGraph
+        The underlying network.  If G is a CompiledGraph, the user-defined 
+        functions below are still called with the node labels.
 
     **trans_time_fxn** User-defined function returning a list
     
@@ -2626,6 +5138,28 @@ def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None,
     **return_full_data** boolean (default False)
         Tells whether a Simulation_Investigation object should be returned.  
 
+    **queue** string (default 'heap')
+        the priority queue used to hold pending events, either 'heap' or 
+        'calendar' as for `fast_SIR`.
+
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, as for `fast_SIR`.  If it
+        is given, the reason for stopping is an additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times, as for 
+        `fast_SIR`.
+
+    **initial_state** SimulationState (default None)
+    **return_state** boolean (default False)
+        only for the Markovian simulations, as for `fast_nonMarkov_SIR`: 
+        these raise an EoNError.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        used only to choose the initial infections if initial_infecteds is
+        not given; the user-defined functions must draw their own random 
+        numbers.
+
     :Returns: 
         
     **times, S, I** each a scipy array
@@ -2644,6 +5178,11 @@ def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None,
 
                         
     '''
+    if report_times is not None and return_full_data:
+        raise EoN.EoNError("cannot use report_times with return_full_data")
+    if initial_state is not None or return_state:
+        raise EoN.EoNError("fast_nonMarkov_SIS cannot use initial_state or return_state")
+    rng = _get_rng_(rng)
     if rho  and initial_infecteds:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
     
@@ -2657,20 +5196,25 @@ def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None,
     if not trans_and_rec_time_fxn: #we define the joint function.
         trans_and_rec_time_fxn =  _find_trans_and_rec_delays_SIS_
         trans_and_rec_time_args = (trans_time_fxn, rec_time_fxn, trans_time_args, rec_time_args)    
-                
+
+    if isinstance(G, CompiledGraph):
+        initial_infecteds = G.to_indices(initial_infecteds)
+        trans_and_rec_time_fxn = _labeled_time_fxns_(G, None, None, 
+                                                trans_and_rec_time_fxn)[2]
                 
     if initial_infecteds is None:  #create initial infecteds list if not given
         if rho is None:
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
         
-    times, S, I = ([tmin], [G.order()], [0])  
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SI', tmin)
+    times, S, I = _make_recorders_(report_times, tmin, G.order(), 0)
 
-    Q = myQueue(tmax)
+    Q = myQueue(tmax, queue)
     status = defaultdict(lambda: 'S') #node status defaults to 'S'
     rec_time = defaultdict(lambda: tmin-1) #node recovery time defaults to -1
 
@@ -2690,31 +5234,229 @@ def fast_nonMarkov_SIS(G, trans_time_fxn=None, rec_time_fxn=None,
                 )
                     
     while Q:  #all the work is done in this while loop.
-        Q.pop_and_run()
+        time = Q.pop_and_run()
+        if stop is not None and stop(time, S[-1], I[-1]):
+            break
 
     #the initial infections were treated as ordinary infection events at 
     #time 0.
     #So each initial infection added an entry at time tmin to lists.
     #We'd like to get rid these excess events.
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, None)
+
     times = times[len(initial_infecteds):]
     S=S[len(initial_infecteds):]
     I=I[len(initial_infecteds):]
 
     if not return_full_data:
-        return scipy.array(times), scipy.array(S), scipy.array(I)
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I)), stop, None)
     else:
         node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = False)
-        return EoN.Simulation_Investigation(G, node_history, transmissions, SIR=False)
+        if isinstance(G, CompiledGraph):
+            return _final_output_(_compiled_Simulation_Investigation_(G, 
+                                    node_history, transmissions, SIR=False), stop, None)
+        return _final_output_(EoN.Simulation_Investigation(G, node_history, 
+                                            transmissions, SIR=False), stop, None)
 
 
 
 #####Now dealing with Gillespie code#####
 
 
+def _Gillespie_compiled_(G, tau, gamma, trans_weights, rec_weights, 
+                        initial_infecteds, initial_recovereds, rho, tmin, 
+                        tmax, SIR, stop_when, report_times, return_full_data, 
+                        return_state, rng):
+    r'''
+    Does the work of Gillespie_SIR (or if SIR is False, Gillespie_SIS) when
+    G is a CompiledGraph.
+
+    The status of the nodes (0 for S, 1 for I, 2 for R) is held in an int8 
+    array, and the SI links are held as the positions of the edges from 
+    infected to susceptible nodes, rather than as pairs of nodes.  So the 
+    edges of a node are walked by position, the weight of an edge is read 
+    from trans_weights at its position, and the edges into a node (whose 
+    links end when it is infected) are found from `_in_edge_positions_`, 
+    with no search for an edge from its ends.  If the edges are unweighted 
+    the links are a list, with `link_slot[position]` the index of position 
+    in it, and otherwise a weighted _ListDict_.
+
+    trans_weights and rec_weights are None or the arrays of weights from 
+    `_compiled_weights_`.  initial_infecteds and initial_recovereds are 
+    assumed to already be given as node indices.
+    '''
+    N = G.order()
+    indptr = G._indptr_
+    indices = G._indices_
+    in_indptr, in_positions = _in_edge_positions_(G)
+    sources = memoryview(_directed_edges_(G)[0])
+    tau = float(tau)
+    gamma = float(gamma)
+
+    if initial_infecteds is None:
+        if rho is None:
+            initial_number = 1
+        else:
+            initial_number = int(round(N*rho))
+        initial_infecteds = rng.sample(G.nodes(), initial_number)
+    if initial_recovereds is None:
+        initial_recovereds = []
+
+    status_array = np.zeros(N, dtype = np.int8)
+    status = memoryview(status_array)
+    for node in initial_recovereds:
+        status[node] = 2
+    for node in initial_infecteds:
+        status[node] = 1
+    initial_I = int(np.count_nonzero(status_array == 1))
+    initial_R = int(np.count_nonzero(status_array == 2))
+
+    if SIR:
+        stop = None if stop_when is None else _StoppingRule_(stop_when, 'SIR', 
+                                                    tmin, initial_I)
+        times, S, I, R = _make_recorders_(report_times, tmin, 
+                                            N-initial_I-initial_R, initial_I,
+                                            initial_R)
+        counts = (S, I, R)
+    else:
+        stop = None if stop_when is None else _StoppingRule_(stop_when, 'SI', 
+                                                    tmin, initial_I)
+        times, S, I = _make_recorders_(report_times, tmin, N-initial_I, 
+                                        initial_I)
+        counts = (S, I)
+
+    t = tmin
+    if return_full_data:
+        infection_times = defaultdict(lambda: [])
+        recovery_times = defaultdict(lambda: [])
+        transmissions = []
+        for node in initial_infecteds:
+            infection_times[node].append(t)
+            transmissions.append((t, None, node))
+        for node in initial_recovereds:
+            recovery_times[node].append(t)
+
+    if rec_weights is None:
+        infecteds = _ListDict_(rng = rng)
+    else:
+        infecteds = _ListDict_(weighted = True, rng = rng)
+        rec_weights = memoryview(rec_weights)
+
+    if trans_weights is None:
+        links = []
+        link_slot = memoryview(np.zeros(len(G.indices), dtype = np.int64))
+        def add_link(position):
+            link_slot[position] = len(links)
+            links.append(position)
+        def remove_link(position):
+            slot = link_slot[position]
+            last = links.pop()
+            if last != position:
+                links[slot] = last
+                link_slot[last] = slot
+        choose_link = functools.partial(rng.choice, links)
+        links_weight = links.__len__
+    else:
+        trans_weights = memoryview(trans_weights)
+        IS_links = _ListDict_(weighted = True, rng = rng)
+        def add_link(position):
+            IS_links.add(position, trans_weights[position])
+        remove_link = IS_links.remove
+        choose_link = IS_links.choose_random
+        links_weight = IS_links.total_weight
+
+    def infect(node):
+        infecteds.add(node, None if rec_weights is None else rec_weights[node])
+        for position in range(indptr[node], indptr[node+1]):
+            if status[indices[position]] == 0:
+                add_link(position)
+
+    for node in np.flatnonzero(status_array == 1).tolist():
+        infect(node)
+    
+    total_rate = gamma*infecteds.total_weight() + tau*links_weight()
+    if total_rate > 0:
+        t += rng.expovariate(total_rate)
+    else:
+        t = float('Inf')
+
+    while infecteds and t<tmax:
+        if rng.random()*total_rate < gamma*infecteds.total_weight(): #recover
+            recovering_node = infecteds.random_removal()
+            for position in range(indptr[recovering_node], 
+                                    indptr[recovering_node+1]):
+                if status[indices[position]] == 0:
+                    remove_link(position)
+            if SIR:
+                status[recovering_node] = 2
+            else:
+                status[recovering_node] = 0
+                for position in in_positions[in_indptr[recovering_node]:
+                                                in_indptr[recovering_node+1]]:
+                    source = sources[position]
+                    if status[source] == 1 and source != recovering_node:
+                        add_link(position)
+            if return_full_data:
+                recovery_times[recovering_node].append(t)
+            times.append(t)
+            I.append(I[-1]-1)
+            if SIR:
+                S.append(S[-1])
+                R.append(R[-1]+1)
+            else:
+                S.append(S[-1]+1)
+        else: #transmit
+            position = choose_link()
+            recipient = indices[position]
+            #the links into recipient are from its infected neighbors.
+            for in_position in in_positions[in_indptr[recipient]:
+                                                in_indptr[recipient+1]]:
+                source = sources[in_position]
+                if status[source] == 1 and source != recipient:
+                    remove_link(in_position)
+            status[recipient] = 1
+            infect(recipient)
+            if return_full_data:
+                infection_times[recipient].append(t)
+                transmissions.append((t, sources[position], recipient))
+            times.append(t)
+            S.append(S[-1]-1)
+            I.append(I[-1]+1)
+            if SIR:
+                R.append(R[-1])
+
+        if stop is not None and stop(t, *[X[-1] for X in counts]):
+            break
+
+        total_rate = gamma*infecteds.total_weight() + tau*links_weight()
+        if total_rate > 0:
+            t += rng.expovariate(total_rate)
+        else:
+            t = float('Inf')
+
+    state = _simulation_state_(G, status_array, times, SIR = SIR, rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+    elif not return_full_data:
+        return _final_output_(tuple(scipy.array(X) for X in (times,)+counts), 
+                                stop, state)
+    if SIR:
+        infection_times = {node: L[0] for node, L in infection_times.items()}
+        recovery_times = {node: L[0] for node, L in recovery_times.items()}
+    node_history = _transform_to_node_history_(infection_times, recovery_times,
+                                                tmin, SIR = SIR)
+    return _final_output_(_compiled_Simulation_Investigation_(G, node_history, 
+                                        transmissions, SIR = SIR), stop, state)
+
 def Gillespie_SIR(G, tau, gamma, initial_infecteds=None, 
                     initial_recovereds = None, rho = None, tmin = 0, 
                     tmax=float('Inf'), return_full_data = False, 
-                    recovery_weight = None, transmission_weight = None):
+                    recovery_weight = None, transmission_weight = None, 
+                    stop_when = None, report_times = None, 
+                    initial_state = None, return_state = False, rng = None):
     #tested in test_SIR_dynamics
     r'''    
     
@@ -2722,12 +5464,8 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
     
     For unweighted networks, the run time is usually slower than fast_SIR, but 
     they are close.  If we add weights, then this Gillespie implementation 
-    slows down much more.  
-    
-    I think there are better ways to implement the algorithm to remove this.  
-    This will need a new data type that allows us to quickly sample a random 
-    event with appropriate weight.  I think this is doable through a binary 
-    tree and it is in development.
+    slows down, since each event is then chosen from a binary sum tree of 
+    the weights (in O(log n) time).
     
     Rather than using figure A.1 of Kiss, Miller, & Simon, this uses a method 
     from Petter Holme 
@@ -2751,7 +5489,7 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
     
     :Arguments:
          
-    **G** networkx Graph
+    **G** networkx Graph or CompiledGraph
         The underlying network
     **tau** positive float
         transmission rate per edge
@@ -2796,6 +5534,28 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
         tau*G.adj[u][v][transmission_weight]
         If None, then just uses tau without scaling.
 
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, as for `fast_SIR`.  If it
+        is given, the reason for stopping is an additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times, as for 
+        `fast_SIR`.
+
+    **initial_state** SimulationState (default None)
+        if given, the simulation continues from this state, as for 
+        `fast_SIR`.
+
+    **return_state** boolean (default False)
+        if True, the final SimulationState is an additional final output,
+        as for `fast_SIR`.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the time to each event, which event happens and the initial 
+        infections.  A seed or numpy Generator makes the simulation 
+        reproducible; with None, Python's `random` module is used.  The 
+        SimulationState returned with `return_state` holds a copy of it.
+
     :Returns: 
         
     **times, S, I, R** each a scipy array
@@ -2827,28 +5587,43 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
         plt.plot(t, I)
     
     '''
+    if report_times is not None and return_full_data:
+        raise EoN.EoNError("cannot use report_times with return_full_data")
+    rng = _get_rng_(rng)
+    if initial_state is not None:
+        tmin, initial_infecteds, initial_recovereds = _resume_(
+                                initial_state, initial_infecteds, 
+                                initial_recovereds, rho, SIR = True)
 
     if rho is not None and initial_infecteds is not None:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
 
+    if isinstance(G, CompiledGraph):
+        trans_weights, rec_weights = _compiled_weights_(G, transmission_weight,
+                                                        recovery_weight)
+        return _Gillespie_compiled_(G, tau, gamma, trans_weights, rec_weights,
+                                    G.to_indices(initial_infecteds), 
+                                    G.to_indices(initial_recovereds), rho, 
+                                    tmin, tmax, True, stop_when, report_times,
+                                    return_full_data, return_state, rng)
     
     if return_full_data:
         infection_times = defaultdict(lambda: []) #defaults to an empty list for each node
         recovery_times = defaultdict(lambda: [])
 
-    if transmission_weight is not None:
+    if transmission_weight is None:
         def edgeweight(u,v):
-            return G.adj[u][v][transmission_weight]
+            return None
     else:
         def edgeweight(u,v):
-            return None
+            return G.adj[u][v][transmission_weight]
     
-    if recovery_weight is not None:
+    if recovery_weight is None:
         def nodeweight(u):
-            return G.node[u][recovery_weight]
+            return None
     else:
         def nodeweight(u):
-            return None
+            return G.node[u][recovery_weight]
 
     tau = float(tau)  #just to avoid integer division problems in python 2.
     gamma = float(gamma)
@@ -2858,17 +5633,18 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
         
     if initial_recovereds is None:
         initial_recovereds = []
         
-    I = [len(initial_infecteds)]
-    R = [len(initial_recovereds)]
-    S = [G.order()-I[0]-R[0]]
-    times = [tmin]
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SIR', tmin, 
+                                                    len(initial_infecteds))
+    times, S, I, R = _make_recorders_(report_times, tmin, 
+                            G.order()-len(initial_infecteds)-len(initial_recovereds),
+                            len(initial_infecteds), len(initial_recovereds))
     
     transmissions = []
     t = tmin
@@ -2885,13 +5661,13 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
             recovery_times[node].append(t)
 
     if recovery_weight is not None:
-        infecteds = _ListDict_(weighted=True)
+        infecteds = _ListDict_(weighted=True, rng=rng)
     else:
-        infecteds = _ListDict_() #unweighted - code is faster for this case
+        infecteds = _ListDict_(rng=rng) #unweighted - code is faster for this case
     if transmission_weight is not None:
-        IS_links = _ListDict_(weighted=True)
+        IS_links = _ListDict_(weighted=True, rng=rng)
     else:
-        IS_links = _ListDict_()
+        IS_links = _ListDict_(rng=rng)
 
     for node in initial_infecteds:
         infecteds.add(node, weight_increment = nodeweight(node)) #weight is none if unweighted
@@ -2905,11 +5681,11 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
     total_transmission_rate = tau*IS_links.total_weight()#IS_weight_sum
         
     total_rate = total_recovery_rate + total_transmission_rate
-    delay = random.expovariate(total_rate)
+    delay = rng.expovariate(total_rate)
     t += delay
     
     while infecteds and t<tmax:
-        if random.random()<total_recovery_rate/total_rate: #recover
+        if rng.random()<total_recovery_rate/total_rate: #recover
             recovering_node = infecteds.random_removal() #does weighted choice and removes it
             status[recovering_node]='R'
             if return_full_data:
@@ -2942,32 +5718,43 @@ def Gillespie_SIR(G, tau, gamma, initial_infecteds=None,
             I.append(I[-1]+1)
             R.append(R[-1])
             
+        if stop is not None and stop(t, S[-1], I[-1], R[-1]):
+            break
+
         total_recovery_rate = gamma*infecteds.total_weight()#I_weight_sum
         total_transmission_rate = tau*IS_links.total_weight()#IS_weight_sum
         
                 
         total_rate = total_recovery_rate + total_transmission_rate
         if total_rate>0:
-            delay = random.expovariate(total_rate)
+            delay = rng.expovariate(total_rate)
         else:
             delay = float('Inf')
         t += delay
 
-    if not return_full_data:
-        return scipy.array(times), scipy.array(S), scipy.array(I), \
-                scipy.array(R)
+    state = _simulation_state_(G, status, times, SIR = True, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+    elif not return_full_data:
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I), scipy.array(R)), stop, state)
     else:
         infection_times = {node: L[0] for node, L in infection_times.items()}
         recovery_times = {node: L[0] for node, L in recovery_times.items()}
         
 
         node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = True)
-        return EoN.Simulation_Investigation(G, node_history, transmissions)
+        return _final_output_(EoN.Simulation_Investigation(G, node_history, 
+                                                    transmissions), stop, state)
 
 
 def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
-                    tmax=100, return_full_data = False, recovery_weight=None,
-                    transmission_weight = None):
+                    tmax=100, return_full_data = False, recovery_weight=None, 
+                    transmission_weight = None, stop_when = None, 
+                    report_times = None, initial_state = None, 
+                    return_state = False, rng = None):
     r'''
     Performs SIS simulations for epidemics on networks with or without weighted edges.
     
@@ -2975,8 +5762,7 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
     transmission rate for an edge is tau*weight[edge]
     
     Based on an algorithm by Petter Holme.  It requires a weighted choice of edges
-    and this will be done by tracking the maximum edge weight and then using 
-    repeated rejection samples until a successful selection.
+    and this is done with a binary sum tree of the edge weights.
     
 
     :See Also:
@@ -2987,7 +5773,7 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
     
     :Arguments: 
         
-    **G** (NetworkX Graph)
+    **G** (NetworkX Graph or CompiledGraph)
         The underlying network
     **tau** (positive float) 
         transmission rate per edge
@@ -3024,6 +5810,26 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
         Assumes that the transmission rate from u to v is 
         tau*G.adj[u][v][transmission_weight]
         
+    **stop_when** function or dict (default None)
+        a rule for ending the simulation early, as for `fast_SIR`.  If it
+        is given, the reason for stopping is an additional final output.
+
+    **report_times** iterable (ordered, default None)
+        if given, the state is recorded only at these times, as for 
+        `fast_SIR`.
+
+    **initial_state** SimulationState (default None)
+        if given, the simulation continues from this state, as for 
+        `fast_SIR`.
+
+    **return_state** boolean (default False)
+        if True, the final SimulationState is an additional final output,
+        as for `fast_SIR`.
+
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the time to each event, which event happens and the initial 
+        infections, as in Gillespie_SIR.
+
     :Returns: 
 
     **times, S, I** scipy arrays
@@ -3054,26 +5860,40 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
         plt.plot(t, I)
 
     '''
+    if report_times is not None and return_full_data:
+        raise EoN.EoNError("cannot use report_times with return_full_data")
+    rng = _get_rng_(rng)
+    if initial_state is not None:
+        tmin, initial_infecteds = _resume_(initial_state, initial_infecteds, 
+                                            None, rho, SIR = False)[:2]
     if rho is not None and initial_infecteds is not None:
         raise EoN.EoNError("cannot define both initial_infecteds and rho")
 
+    if isinstance(G, CompiledGraph):
+        trans_weights, rec_weights = _compiled_weights_(G, transmission_weight,
+                                                        recovery_weight)
+        return _Gillespie_compiled_(G, tau, gamma, trans_weights, rec_weights,
+                                    G.to_indices(initial_infecteds), None, rho,
+                                    tmin, tmax, False, stop_when, report_times,
+                                    return_full_data, return_state, rng)
+
     if return_full_data:
         infection_times = defaultdict(lambda: []) #defaults to an empty list 
         recovery_times = defaultdict(lambda: [])  #for each node
 
-    if transmission_weight is not None:
+    if transmission_weight is None:
         def edgeweight(u,v):
-            return G.adj[u][v][transmission_weight]
+            return None
     else:
         def edgeweight(u,v):
-            return None
+            return G.adj[u][v][transmission_weight]
     
-    if recovery_weight is not None:
+    if recovery_weight is None:
         def nodeweight(u):
-            return G.node[u][recovery_weight]
+            return None
     else:
         def nodeweight(u):
-            return None
+            return G.node[u][recovery_weight]
             
     tau = float(tau)  #just to avoid integer division problems.
     gamma = float(gamma)
@@ -3083,13 +5903,15 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
             initial_number = 1
         else:
             initial_number = int(round(G.order()*rho))
-        initial_infecteds=random.sample(G.nodes(), initial_number)
+        initial_infecteds=rng.sample(G.nodes(), initial_number)
     elif G.has_node(initial_infecteds):
         initial_infecteds=[initial_infecteds]
         
-    I = [len(initial_infecteds)]
-    S = [G.order()-I[0]]
-    times = [tmin]
+    stop = None if stop_when is None else _StoppingRule_(stop_when, 'SI', tmin, 
+                                                    len(initial_infecteds))
+    times, S, I = _make_recorders_(report_times, tmin, 
+                                    G.order()-len(initial_infecteds), 
+                                    len(initial_infecteds))
     
     t = tmin
     transmissions = []
@@ -3102,14 +5924,14 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
             transmissions.append((t, None, node))
 
     if recovery_weight is None:
-        infecteds = _ListDict_()
+        infecteds = _ListDict_(rng=rng)
     else:
-        infecteds = _ListDict_(weighted=True)
+        infecteds = _ListDict_(weighted=True, rng=rng)
 
     if transmission_weight is None:
-        IS_links = _ListDict_()
+        IS_links = _ListDict_(rng=rng)
     else:
-        IS_links = _ListDict_(weighted=True)
+        IS_links = _ListDict_(weighted=True, rng=rng)
         
         
     for node in initial_infecteds:
@@ -3123,11 +5945,11 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
     total_transmission_rate = tau*IS_links.total_weight()#IS_weight_sum
             
     total_rate = total_recovery_rate + total_transmission_rate
-    delay = random.expovariate(total_rate)
+    delay = rng.expovariate(total_rate)
     t = t+delay
     
     while infecteds and t<tmax:
-        if random.random()<total_recovery_rate/total_rate: #recover
+        if rng.random()<total_recovery_rate/total_rate: #recover
             recovering_node = infecteds.random_removal()
             status[recovering_node]='S'
             if return_full_data:
@@ -3143,7 +5965,7 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
                     IS_links.add((nbr, recovering_node), weight_increment = edgeweight(recovering_node, nbr))
                         
             times.append(t)
-            S.append(S[-1])
+            S.append(S[-1]+1)
             I.append(I[-1]-1)
         else:
             transmitter, recipient = IS_links.choose_random()
@@ -3163,6 +5985,9 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
             S.append(S[-1]-1)
             I.append(I[-1]+1)
 
+        if stop is not None and stop(t, S[-1], I[-1]):
+            break
+
         total_recovery_rate = gamma*infecteds.total_weight()#I_weight_sum
         
         total_transmission_rate = tau*IS_links.total_weight()#IS_weight_sum
@@ -3170,19 +5995,510 @@ def Gillespie_SIS(G, tau, gamma, initial_infecteds=None, rho = None, tmin = 0,
 
         total_rate = total_recovery_rate + total_transmission_rate
         if total_rate>0:
-            delay = random.expovariate(total_rate)
+            delay = rng.expovariate(total_rate)
         else:
             delay = float('Inf')
         t += delay
 
-    if not return_full_data:
-        return scipy.array(times), scipy.array(S), scipy.array(I)
+    state = _simulation_state_(G, status, times, SIR = False, 
+                                rng = rng) \
+                if return_state else None
+    if report_times is not None:
+        return _final_output_(times.output(stop), stop, state)
+    elif not return_full_data:
+        return _final_output_((scipy.array(times), scipy.array(S), 
+                                scipy.array(I)), stop, state)
     else:
         node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = False)
-        return EoN.Simulation_Investigation(G, node_history, SIR=False)
+        return _final_output_(EoN.Simulation_Investigation(G, node_history, 
+                                            transmissions, SIR=False), stop, state)
+
+class _TransitionTables_(object):
+    r'''
+    The transition graphs of `Gillespie_Arbitrary` compiled into integer 
+    tables for a given CompiledGraph.
+
+    Statuses are coded 0, ..., K-1 (`codes[status]` is the code and 
+    `statuses[code]` the status).  Transitions are numbered 0, ..., T-1, with
+    the spontaneous transitions first.  A spontaneous transition acts on a
+    node index and a neighbor-induced transition on an edge position of G, 
+    whose target `G.indices[position]` is the node that changes status.
+
+    :Attributes:
+
+    **n_spontaneous** int
+        transitions numbered below this are spontaneous.
+    **transitions** list
+        the original transitions (edges of the transition graphs) in order.
+    **rates** list of floats
+    **old_status**, **new_status** lists
+        the codes of the status of the changing node before and after.
+    **source_status** list
+        for induced transitions the code of the status of the inducing 
+        node (None for spontaneous transitions).
+    **weight_labels** list
+        the `'weight_label'` of each transition (or None).
+    **time_fxns** list
+        the `'time_fxn'` of each transition (or None), used only by 
+        fast_Arbitrary.  A transition with a `'time_fxn'` need not have a
+        `'rate'` (its rate is then None).
+    **weights** list
+        `weights[transition]` is None, or a memoryview of the weights (by 
+        node index for spontaneous transitions, by edge position for
+        induced transitions).
+    **spontaneous_from** list
+        `spontaneous_from[a]` lists the spontaneous transitions of a node 
+        with status code a.
+    **induced_from** list
+        `induced_from[a*K+b]` lists the induced transitions of an edge from 
+        a status a node to a status b node.
+    '''
+    def __init__(self, G, spontaneous_transition_graph, nbr_induced_transition_graph, 
+                    statuses = ()):
+        spontaneous_transitions = list(spontaneous_transition_graph.edges())
+        induced_transitions = list(nbr_induced_transition_graph.edges())
+        for transition in induced_transitions:
+            if transition[0][0] != transition[1][0]:
+                raise EoN.EoNError("transition {} -> {} not allowed: first node must keep same status".format(transition[0],transition[1]))
+
+        self.statuses = []
+        self.codes = {}
+        for status in itertools.chain(spontaneous_transition_graph.nodes(), 
+                            itertools.chain.from_iterable(nbr_induced_transition_graph.nodes()),
+                            statuses):
+            if status not in self.codes:
+                self.codes[status] = len(self.statuses)
+                self.statuses.append(status)
+        K = len(self.statuses)
+        self.K = K
+
+        self.n_spontaneous = len(spontaneous_transitions)
+        self.transitions = spontaneous_transitions + induced_transitions
+        self.rates = []
+        self.old_status = []
+        self.new_status = []
+        self.source_status = []
+        self.weight_labels = []
+        self.time_fxns = []
+        self.weights = []
+        self.spontaneous_from = [[] for a in range(K)]
+        self.induced_from = [[] for ab in range(K*K)]
+        for number, transition in enumerate(self.transitions):
+            if number < self.n_spontaneous:
+                attributes = spontaneous_transition_graph.edges[transition]
+                old, new = self.codes[transition[0]], self.codes[transition[1]]
+                self.spontaneous_from[old].append(number)
+                self.source_status.append(None)
+                compiled_weights = G.node_weights
+            else:
+                attributes = nbr_induced_transition_graph.edges[transition]
+                old, new = self.codes[transition[0][1]], self.codes[transition[1][1]]
+                self.induced_from[self.codes[transition[0][0]]*K + old].append(number)
+                self.source_status.append(self.codes[transition[0][0]])
+                compiled_weights = G.edge_weights
+            self.time_fxns.append(attributes.get('time_fxn'))
+            if 'time_fxn' in attributes and 'rate' not in attributes:
+                self.rates.append(None)
+            else:
+                self.rates.append(float(attributes['rate']))
+            self.old_status.append(old)
+            self.new_status.append(new)
+            self.weight_labels.append(attributes.get('weight_label'))
+            if 'weight_label' in attributes:
+                try:
+                    weights = compiled_weights[attributes['weight_label']]
+                except KeyError:
+                    raise EoN.EoNError("weight '{}' of transition {} was not compiled into G".format(attributes['weight_label'], transition))
+                self.weights.append(memoryview(np.ascontiguousarray(weights, dtype = float)))
+            else:
+                self.weights.append(None)
+
+
+def _compile_Arbitrary_(G, spontaneous_transition_graph, nbr_induced_transition_graph,
+                        IC, return_statuses, time_fxns = False):
+    r'''returns the CompiledGraph (G itself if it is already compiled, 
+    otherwise with the weights named by the transition graphs), the 
+    _TransitionTables_ and an array with the initial status code of each 
+    node.  Unless time_fxns is True, a transition with a `'time_fxn'` is an
+    error.'''
+    if not isinstance(G, CompiledGraph):
+        node_labels = [spontaneous_transition_graph.edges[transition]['weight_label'] 
+                        for transition in spontaneous_transition_graph.edges()
+                        if 'weight_label' in spontaneous_transition_graph.edges[transition]]
+        edge_labels = [nbr_induced_transition_graph.edges[transition]['weight_label'] 
+                        for transition in nbr_induced_transition_graph.edges()
+                        if 'weight_label' in nbr_induced_transition_graph.edges[transition]]
+        G = CompiledGraph(G, edge_weights = set(edge_labels), node_weights = set(node_labels))
+    if G.directed:
+        raise EoN.EoNError("simulations with transition graphs require an undirected network")
+    N = G.order()
+
+    initial_statuses = [IC[G.label(node)] for node in range(N)]
+    tables = _TransitionTables_(G, spontaneous_transition_graph, 
+                                nbr_induced_transition_graph, 
+                                itertools.chain(return_statuses, set(initial_statuses)))
+    if not time_fxns and any(tables.time_fxns):
+        raise EoN.EoNError("transitions with a 'time_fxn' can only be simulated by fast_Arbitrary")
+    status = np.fromiter((tables.codes[initial] for initial in initial_statuses),
+                            dtype = np.int16 if tables.K < 2**15 else np.int32, 
+                            count = N)
+    return G, tables, status
+
+class _EventLog_(object):
+    r'''
+    A columnar record of the status changes in a simulation on a 
+    CompiledGraph, from which `return_full_data` output is built.
+
+    Each event is stored as its time (float64), the index of the node 
+    (int32), the codes of its old and new status (int8 unless there are more 
+    than 127 statuses) and the index of the neighbor that induced the change
+    (-1 if spontaneous).  This costs a few appends per event, and nothing is
+    built from it until it is needed.
+    '''
+    def __init__(self, G, statuses, possible_statuses, tmin, initial, times, 
+                    nodes, old_codes, new_codes, sources):
+        self.G = G
+        self.statuses = statuses
+        self.possible_statuses = possible_statuses
+        self.tmin = tmin
+        self.initial = np.asarray(initial)
+        self.times = np.asarray(times)
+        self.nodes = np.asarray(nodes)
+        self.old_codes = np.asarray(old_codes)
+        self.new_codes = np.asarray(new_codes)
+        self.sources = np.asarray(sources)
+        self._order_ = None
+
+    @staticmethod
+    def code_type(K):
+        r'''array typecode for the status codes if there are K statuses'''
+        if K < 2**7:
+            return 'b'
+        return 'h'
+
+    def node_history(self, node):
+        r'''returns the history (timelist, statuslist) of the node with label 
+        `node`'''
+        index = self.G.index(node)
+        if self._order_ is None:
+            #events grouped by node, and in time order for each node.
+            self._order_ = np.argsort(self.nodes, kind = 'stable')
+            self._sorted_nodes_ = self.nodes[self._order_]
+        start, end = np.searchsorted(self._sorted_nodes_, [index, index+1])
+        events = self._order_[start:end]
+        times = [self.tmin] + self.times[events].tolist()
+        statuslist = [self.statuses[code] for code in 
+                        itertools.chain([self.initial[index]], self.new_codes[events])]
+        return times, statuslist
+
+    def summary(self):
+        r'''returns t and a dict giving the number with each status at each 
+        time in t'''
+        t = np.concatenate(([self.tmin], self.times))
+        initial_counts = np.bincount(self.initial.astype(np.int64), minlength = len(self.statuses))
+        counts = {}
+        for status in self.possible_statuses:
+            code = self.statuses.index(status)
+            changes = (self.new_codes == code).astype(np.int64) - (self.old_codes == code)
+            count = np.empty(len(t), dtype = np.int64)
+            count[0] = initial_counts[code]
+            np.cumsum(changes, out = count[1:])
+            count[1:] += initial_counts[code]
+            counts[status] = count
+        return t, counts
+
+    def transmissions(self):
+        r'''returns a list of (t, u, v) for each change of status of a node v
+        induced by its neighbor u'''
+        induced = np.flatnonzero(self.sources >= 0)
+        label = self.G.label
+        return [(t, label(u), label(v)) for t, u, v in 
+                    zip(self.times[induced].tolist(), self.sources[induced].tolist(), 
+                        self.nodes[induced].tolist())]
+
+def _event_log_columns_(N, K):
+    r'''returns empty columns (times, old_codes, new_codes, nodes, sources) 
+    for an _EventLog_ of a network with N nodes and K statuses'''
+    index_type = 'i' if N < 2**31 else 'q'
+    return ([], array.array(_EventLog_.code_type(K)), array.array(_EventLog_.code_type(K)),
+                array.array(index_type), array.array(index_type))
+
+def _direct_Arbitrary_(G, tables, status, tmin, tmax, rng, return_full_data):
+    r'''The direct (Gillespie) method for Gillespie_Arbitrary.  status is a 
+    list of the status codes, which is changed in place.  Returns the 
+    columns (times, old_codes, new_codes, nodes, sources) of the event log 
+    (nodes and sources are only filled if return_full_data).'''
+    N = G.order()
+    K = tables.K
+
+    indptr = G._indptr_
+    indices = G._indices_
+    reverse = memoryview(G.reverse_edge_positions())
+
+    rates = tables.rates
+    weights = tables.weights
+    new_statuses = tables.new_status
+    spontaneous_from = tables.spontaneous_from
+    induced_from = tables.induced_from
+    n_spontaneous = tables.n_spontaneous
+    potential_transitions = [_ListDict_(weighted = weight is not None, rng = rng) 
+                                for weight in weights]
+                
+    #initialize all potential events to start.  A spontaneous transition 
+    #acts on a node, an induced transition on an edge position.
+    for node in range(N):
+        for transition in spontaneous_from[status[node]]:
+            weight = weights[transition]
+            potential_transitions[transition].add(node, weight_increment = None if weight is None else weight[node])
+        for position in range(indptr[node], indptr[node+1]):
+            if indices[position] == node:
+                continue  #a self-loop does not induce transitions
+            for transition in induced_from[status[node]*K + status[indices[position]]]:
+                weight = weights[transition]
+                potential_transitions[transition].add(position, weight_increment = None if weight is None else weight[position])
+
+    #the total rate of each transition, in a sum tree so that the next 
+    #transition can be chosen quickly.
+    transition_rates = _ListDict_(weighted=True, rng=rng)
+    for transition in range(len(rates)):
+        transition_rates.add(transition, weight_increment = rates[transition]*potential_transitions[transition].total_weight())
+
+    times, old_codes, new_codes, nodes, sources = _event_log_columns_(N, K)
+
+    t = tmin
+    
+    total_rate = transition_rates.total_weight()
+    if total_rate>0:
+        delay = rng.expovariate(total_rate)
+    else:
+        delay = float('Inf')
+    t = t+delay
+    while total_rate>0 and t<tmax:
+        times.append(t)
+        transition = transition_rates.choose_random()
+        #either node doing spontaneous or edge doing an induced event
+        actor = potential_transitions[transition].choose_random()
+        if transition < n_spontaneous:
+            node = actor
+            source = -1
+        else:
+            node = indices[actor]
+            source = indices[reverse[actor]]
+        old_status = status[node]
+        new_status = new_statuses[transition]
+        status[node] = new_status
+        old_codes.append(old_status)
+        new_codes.append(new_status)
+        if return_full_data:
+            nodes.append(node)
+            sources.append(source)
+
+        changed = set() #transitions whose total rate has changed
+        #remove node from any spontaneous lists
+        #add node to any spontaneous lists
+        for transition in spontaneous_from[old_status]:
+            potential_transitions[transition].remove(node)
+            changed.add(transition)
+        for transition in spontaneous_from[new_status]:
+            weight = weights[transition]
+            potential_transitions[transition].add(node, weight_increment = None if weight is None else weight[node])
+            changed.add(transition)
+                
+        #remove edges from any induced lists
+        #add edges to any induced lists
+        for position in range(indptr[node], indptr[node+1]):
+            nbr = indices[position]
+            if nbr == node:
+                continue
+            nbr_status = status[nbr]
+            back = reverse[position] #the edge from nbr to node
+            for transition in induced_from[nbr_status*K + old_status]:
+                potential_transitions[transition].remove(back)
+                changed.add(transition)
+            for transition in induced_from[old_status*K + nbr_status]:
+                potential_transitions[transition].remove(position)
+                changed.add(transition)
+            for transition in induced_from[nbr_status*K + new_status]:
+                weight = weights[transition]
+                potential_transitions[transition].add(back, weight_increment = None if weight is None else weight[back])
+                changed.add(transition)
+            for transition in induced_from[new_status*K + nbr_status]:
+                weight = weights[transition]
+                potential_transitions[transition].add(position, weight_increment = None if weight is None else weight[position])
+                changed.add(transition)
+
+        for transition in changed:
+            transition_rates.set_weight(transition, rates[transition]*potential_transitions[transition].total_weight())
+        total_rate = transition_rates.total_weight()
+        if total_rate>0:
+            delay = rng.expovariate(total_rate)
+        else:
+            delay = float('Inf')
+            
+        t += delay
+
+    return times, old_codes, new_codes, nodes, sources
+
+def _neighbor_matrix_(G, weights = None):
+    r'''returns the scipy.sparse CSR matrix A of the CompiledGraph G with 
+    A[v,u] the weight (default 1) of the edge from u to v, leaving out 
+    self-loops, so that A times the indicator of a status gives the number
+    (or total weight) of each node's neighbors with that status.'''
+    N = G.order()
+    rows = np.repeat(np.arange(N), np.diff(G.indptr))
+    if weights is None:
+        data = (G.indices != rows).astype(float)
+    else:
+        data = np.where(G.indices != rows, np.asarray(weights, dtype = float), 0.)
+    return scipy.sparse.csr_matrix((data, G.indices, G.indptr), shape = (N, N))
+
+def _next_reaction_Arbitrary_(G, tables, status, tmin, tmax, rng, return_full_data):
+    r'''The next reaction method (Gibson and Bruck) for Gillespie_Arbitrary,
+    with the same arguments and output as _direct_Arbitrary_.
+
+    A reaction channel is a node and a transition from its status.  For a
+    neighbor-induced transition the rate of the channel is its rate times 
+    the number (or total weight) of the node's neighbors with the inducing
+    status.  Each channel with positive rate has a putative firing time in
+    an _EventQueue_ (which can cancel an entry, so together with the dict
+    of tokens it is an indexed priority queue).  When a node changes 
+    status, only its own channels and those of its neighbors are touched.
+    A channel whose rate changes from a to b keeps its random number: its
+    time T becomes t + (a/b)(T-t).  A new random number is drawn only for a 
+    channel that becomes active.'''
+    N = G.order()
+    K = tables.K
+    T = len(tables.transitions)
+    indptr = G._indptr_
+    indices = G._indices_
+    rates = tables.rates
+    weights = tables.weights
+    new_statuses = tables.new_status
+    induced_from = tables.induced_from
+    n_spontaneous = tables.n_spontaneous
+
+    #transitions out of each status, of either kind
+    transitions_from = [[] for a in range(K)]
+    for transition in range(T):
+        transitions_from[tables.old_status[transition]].append(transition)
+
+    #pressures[key][v] is the number (or total weight) of neighbors of v 
+    #with status key[0], where key = (status, weight label)
+    np_status = np.array(status)
+    pressures = {}
+    pressure_of = [None]*T   #the pressure list used by each transition
+    by_source = [[] for a in range(K)] #(pressure, edge weights) for each status
+    for transition in range(n_spontaneous, T):
+        key = (tables.source_status[transition], tables.weight_labels[transition])
+        if key not in pressures:
+            A = _neighbor_matrix_(G, weights[transition])
+            pressures[key] = A.dot((np_status == key[0]).astype(float)).tolist()
+            by_source[key[0]].append((pressures[key], weights[transition]))
+        pressure_of[transition] = pressures[key]
+    del np_status
+
+    def channel_rate(node, transition):
+        if transition < n_spontaneous:
+            weight = weights[transition]
+            return rates[transition] if weight is None else rates[transition]*weight[node]
+        return rates[transition]*pressure_of[transition][node]
+
+    Q = _EventQueue_(tmax)
+    active_rate = {} #channel -> rate, for channels with positive rate
+    putative_time = {}
+    token = {}
+
+    def set_rate(node, transition, rate, t):
+        channel = node*T + transition
+        old_rate = active_rate.get(channel, 0)
+        if rate > 0:
+            if old_rate > 0:
+                Q.cancel(token[channel])
+                time = t + (old_rate/rate)*(putative_time[channel] - t)
+            else:
+                time = t + rng.expovariate(rate)
+            active_rate[channel] = rate
+            putative_time[channel] = time
+            token[channel] = Q.push(time, 0, transition, node)
+        elif old_rate > 0:
+            Q.cancel(token.pop(channel))
+            del active_rate[channel], putative_time[channel]
+
+    for node in range(N):
+        for transition in transitions_from[status[node]]:
+            set_rate(node, transition, channel_rate(node, transition), tmin)
+
+    times, old_codes, new_codes, nodes, sources = _event_log_columns_(N, K)
+    while Q:
+        t, event_type, transition, node = Q.pop()
+        old_status = status[node]
+        new_status = new_statuses[transition]
+        times.append(t)
+        old_codes.append(old_status)
+        new_codes.append(new_status)
+        if return_full_data:
+            source = -1
+            if transition >= n_spontaneous: #choose the neighbor responsible
+                weight = weights[transition]
+                r = rng.random()*pressure_of[transition][node]
+                for position in range(indptr[node], indptr[node+1]):
+                    nbr = indices[position]
+                    if nbr != node and status[nbr] == tables.source_status[transition]:
+                        source = nbr
+                        r -= 1 if weight is None else weight[position]
+                        if r < 0:
+                            break
+            nodes.append(node)
+            sources.append(source)
+
+        for other in transitions_from[old_status]:
+            set_rate(node, other, 0, t)
+        status[node] = new_status
+        if new_status != old_status:
+            for position in range(indptr[node], indptr[node+1]):
+                nbr = indices[position]
+                if nbr == node:
+                    continue
+                for pressure, weight in by_source[old_status]:
+                    value = pressure[nbr] - (1 if weight is None else weight[position])
+                    pressure[nbr] = value if abs(value) > 1e-12 else 0.
+                for pressure, weight in by_source[new_status]:
+                    pressure[nbr] += 1 if weight is None else weight[position]
+                nbr_status = status[nbr]
+                for other in induced_from[old_status*K + nbr_status]:
+                    set_rate(nbr, other, rates[other]*pressure_of[other][nbr], t)
+                for other in induced_from[new_status*K + nbr_status]:
+                    set_rate(nbr, other, rates[other]*pressure_of[other][nbr], t)
+        for other in transitions_from[new_status]:
+            set_rate(node, other, channel_rate(node, other), t)
+
+    return times, old_codes, new_codes, nodes, sources
+
+def _Arbitrary_output_(network, G, tables, tmin, initial, columns, return_statuses, 
+                        return_full_data):
+    r'''returns the output of Gillespie_Arbitrary or fast_Arbitrary from the 
+    event log columns (times, old_codes, new_codes, nodes, sources) given by
+    an engine.  network is the G given by the user, and G its CompiledGraph.
+    
+    Rather than updating the counts at every event, the engines log the 
+    status changes and the counts are found at the end.'''
+    times, old_codes, new_codes, nodes, sources = columns
+    if return_full_data:
+        possible_statuses = list(return_statuses) + [status for status in tables.statuses 
+                                                        if status not in return_statuses]
+        log = _EventLog_(G, tables.statuses, possible_statuses, tmin, initial, 
+                            times, nodes, old_codes, new_codes, sources)
+        return EoN.simulation_investigation._Logged_Simulation_Investigation_(network, log)
+    else:
+        log = _EventLog_(G, tables.statuses, return_statuses, tmin, initial, 
+                            times, (), old_codes, new_codes, ())
+        t, counts = log.summary()
+        return [t] + [counts[return_status] for return_status in return_statuses]
 
 def Gillespie_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_graph,
-  IC, return_statuses, tmin = 0,  tmax=100, return_full_data = False):
+  IC, return_statuses, tmin = 0,  tmax=100, return_full_data = False, 
+  rng = None, method = 'direct'):
+    #tested in test_next_reaction_matches_direct
     r'''
     Performs simulations for epidemics, allowing more flexibility than SIR/SIS.
     
@@ -3249,8 +6565,11 @@ def Gillespie_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_
     
     :Arguments: 
         
-    **G** NetworkX Graph
-        The underlying contact network
+    **G** NetworkX Graph or CompiledGraph
+        The underlying contact network (undirected).  A networkx graph is
+        compiled at the start of each call, so for repeated simulations on a
+        large network it is faster to pass a CompiledGraph, which must hold
+        any node and edge weights named by `'weight_label'` below.
             
     **spontaneous_transition_graph** Directed networkx graph
         The nodes of this graph are the possible statuses of a node in G.
@@ -3296,10 +6615,35 @@ def Gillespie_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_
     **tmax** number (default 100)
         stop time
             
-    **return_full_data** boolean
-        currently needs to be False.  True raises an error.
-        
-        
+    **return_full_data** boolean (default False)
+        Tells whether a Simulation_Investigation object should be returned.
+        The events are logged compactly during the simulation, and the
+        history of a node or the list of transmissions is only built from
+        the log when it is asked for.
+        
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        draws the time to each transition and which transition happens 
+        (with `method='next_reaction'`, the putative time of each 
+        transition).  With None, Python's `random` module is used; a seed 
+        or numpy Generator makes the simulation reproducible.
+
+    **method** string (default 'direct')
+        'direct' or 'next_reaction'.  Both simulate the same process exactly
+        (so they give the same statistics, but not the same output for a 
+        given rng).
+        
+        'direct' is Gillespie's direct method: at each event it draws the 
+        time to the next event from the total rate and then chooses which 
+        event happens.  
+        
+        'next_reaction' is Gibson and Bruck's next reaction method: each 
+        node has a putative time for each transition it could make, kept in
+        a priority queue.  When a node changes status only the times of its 
+        own transitions and its neighbors' induced transitions are updated,
+        and a changed rate rescales the existing time rather than drawing 
+        a new random number.  Which method is faster depends on the model
+        and the network, so it is worth timing both on a small example.
+
     :Returns: 
 
     **(times, status1, status2, ...)**  tuple of scipy arrays
@@ -3307,6 +6651,14 @@ def Gillespie_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_
         second (etc) entry is number at given time of status in corresponding
         position of `return_statuses`
         
+    Or if `return_full_data is True`
+
+    **full_data**  Simulation_Investigation object
+        from this we can extract the status history of all nodes, and 
+        plot the network at given times.  Its `summary` gives the number
+        with each status in `return_statuses` (followed by any other 
+        status).  Its `transmissions` lists the neighbor-induced 
+        transitions as (t, u, v) where u induced v to change status.
     
     :SAMPLE USE:
 
@@ -3365,164 +6717,506 @@ def Gillespie_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_
         plt.savefig('SEIR.png')       
 '''
 
-    if return_full_data:
-        raise EoN.EoNError("Gillespie_Arbitrary does not currently support return_full_data=True")
-
-    status = {node: IC[node] for node in G.nodes()}
-
-    times = [tmin]
-    data = {}
-    C = Counter(status.values())
-    for return_status in return_statuses:
-        data[return_status] = [C[return_status]]                
-
-    spontaneous_transitions = list(spontaneous_transition_graph.edges())
-    induced_transitions = list(nbr_induced_transition_graph.edges())
-    potential_transitions = {}
-    rate = {}# intrensic rate of a transition
-    #weight_sum = defaultdict(lambda: 0)
-    #weights = defaultdict(lambda: None)
-    #max_weight = defaultdict(lambda: 0)
-    get_weight = defaultdict(lambda: defaultdict(lambda:None))
-
-
-    for transition in spontaneous_transitions:
-        rate[transition] = spontaneous_transition_graph.edges[transition[0],transition[1]]['rate']
-        if 'weight_label' in spontaneous_transition_graph.edges[transition[0],transition[1]]:
-            wl = spontaneous_transition_graph.edges[transition[0],transition[1]]['weight_label']
-            get_weight[transition] = nx.get_node_attributes(G, wl)
-            potential_transitions[transition] = _ListDict_(weighted=True)#max_weight[transition] = max(get_weight[transition].values())
+    rng = _get_rng_(rng)
+    network = G
+    G, tables, status = _compile_Arbitrary_(G, spontaneous_transition_graph, 
+                                            nbr_induced_transition_graph, IC, 
+                                            return_statuses)
+    if method == 'direct':
+        engine = _direct_Arbitrary_
+    elif method == 'next_reaction':
+        engine = _next_reaction_Arbitrary_
+    else:
+        raise EoN.EoNError("method must be 'direct' or 'next_reaction'")
+    initial = array.array(_EventLog_.code_type(tables.K), status)
+    columns = engine(G, tables, status.tolist(), tmin, tmax, rng, return_full_data)
+    return _Arbitrary_output_(network, G, tables, tmin, initial, columns, 
+                                return_statuses, return_full_data)
+
+
+def _fast_Arbitrary_(G, tables, status, tmin, tmax, rng, return_full_data, time_fxns):
+    r'''The event-driven engine of fast_Arbitrary, with the same arguments
+    and output as _direct_Arbitrary_.  time_fxns[transition] is None or a
+    function taking node indices.
+
+    Whenever a node takes a new status a time is chosen for each of its 
+    spontaneous transitions, and for each induced transition along each 
+    edge to or from it, and these are pushed on an _EventQueue_.  A 
+    spontaneous event is `(time, 0, transition, node)` and an induced event
+    is `(time, 1, source*T + transition, target)`.  The token of an event is
+    kept in `pending` for each node whose change of status invalidates it 
+    (the node, or both ends of the edge), mapped to the other end of the 
+    edge (or -1).  When a node changes status all of its pending events are
+    cancelled and removed from the other ends' entries as well.  So the 
+    first event popped is always valid, there is no check of the status when
+    it is popped, and `pending` only holds live events.
+
+    As fast_SIR does not schedule a transmission after the recovery of the 
+    source, an induced event is not scheduled if it is after the earliest 
+    spontaneous event of either node (`next_change`), since that node will
+    have changed status by then.
+    '''
+    N = G.order()
+    K = tables.K
+    T = len(tables.transitions)
+    indptr = G._indptr_
+    indices = G._indices_
+    reverse = memoryview(G.reverse_edge_positions())
+    rates = tables.rates
+    weights = tables.weights
+    new_statuses = tables.new_status
+    spontaneous_from = tables.spontaneous_from
+    induced_from = tables.induced_from
+
+    Q = _EventQueue_(tmax)
+    push = Q.push
+    cancel = Q.cancel
+    pending = {} #node -> {token: partner} for the events its change of status invalidates
+    next_change = [float('Inf')]*N
+
+    def schedule_spontaneous(node, t):
+        next_change[node] = float('Inf')
+        for transition in spontaneous_from[status[node]]:
+            time_fxn = time_fxns[transition]
+            if time_fxn is None:
+                weight = weights[transition]
+                rate = rates[transition] if weight is None else rates[transition]*weight[node]
+                if rate <= 0:
+                    continue
+                time = t + rng.expovariate(rate)
+            else:
+                time = t + time_fxn(node)
+            if time < next_change[node]:
+                next_change[node] = time
+            token = push(time, 0, transition, node)
+            if token is not None:
+                pending.setdefault(node, {})[token] = -1
+
+    def schedule_induced(source, target, position, t):
+        for transition in induced_from[status[source]*K + status[target]]:
+            time_fxn = time_fxns[transition]
+            if time_fxn is None:
+                weight = weights[transition]
+                rate = rates[transition] if weight is None else rates[transition]*weight[position]
+                if rate <= 0:
+                    continue
+                time = t + rng.expovariate(rate)
+            else:
+                time = t + time_fxn(source, target)
+            if time >= next_change[source] or time >= next_change[target]:
+                continue
+            token = push(time, 1, source*T + transition, target)
+            if token is not None:
+                pending.setdefault(source, {})[token] = target
+                pending.setdefault(target, {})[token] = source
+
+    for node in range(N):
+        schedule_spontaneous(node, tmin)
+    for node in range(N):
+        for position in range(indptr[node], indptr[node+1]):
+            nbr = indices[position]
+            if nbr != node:
+                schedule_induced(node, nbr, position, tmin)
+
+    times, old_codes, new_codes, nodes, sources = _event_log_columns_(N, K)
+    while Q:
+        t, event_type, source, node = Q.pop()
+        if event_type == 0:
+            transition = source
+            source = -1
         else:
-            potential_transitions[transition] = _ListDict_()#max_weight[transition]=1
+            source, transition = divmod(source, T)
+        new_status = new_statuses[transition]
+        times.append(t)
+        old_codes.append(status[node])
+        new_codes.append(new_status)
+        if return_full_data:
+            nodes.append(node)
+            sources.append(source)
+
+        for token, partner in pending.pop(node, {}).items():
+            cancel(token)
+            if partner >= 0:
+                del pending[partner][token]
+        status[node] = new_status
+        schedule_spontaneous(node, t)
+        for position in range(indptr[node], indptr[node+1]):
+            nbr = indices[position]
+            if nbr != node:
+                schedule_induced(node, nbr, position, t)
+                schedule_induced(nbr, node, reverse[position], t)
+
+    return times, old_codes, new_codes, nodes, sources
+
+def fast_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_graph,
+  IC, return_statuses, tmin = 0, tmax = 100, return_full_data = False, 
+  rng = None):
+    #tested in test_fast_Arbitrary_matches_Gillespie_Arbitrary
+    r'''
+    An event-driven simulation of the same models as `Gillespie_Arbitrary`,
+    in the style of `fast_nonMarkov_SIR`, which also allows non-Markovian
+    transitions.
+    
+    When a node takes a new status, a time is chosen for each transition it
+    could make spontaneously, and for each neighbor-induced transition 
+    along each of its edges (in either direction) given the current status 
+    of the neighbor.  These are put in a priority queue, and the earliest 
+    happens.  Any event involving a node that changes status before the 
+    event happens is discarded (and new times are chosen for its new 
+    status).
+    
+    For Markovian transitions the times are exponentially distributed and
+    this simulates exactly the same process as `Gillespie_Arbitrary`.  
+    
+    Any transition can instead be given a function for the time it takes,
+    as an edge attribute `'time_fxn'` of the transition graph (in place of 
+    `'rate'` and `'weight_label'`).  The time of a spontaneous transition
+    is then measured from when the node took its status, and the time of an
+    induced transition from when the edge came to have that pair of 
+    statuses.  So for example a gamma distributed latent period gives an 
+    SEIR model with non-exponential latency.  
+
+    :Arguments: 
+        
+    **G** NetworkX Graph or CompiledGraph
+        The underlying contact network (undirected), as for 
+        `Gillespie_Arbitrary`.  If G is a CompiledGraph, the `'time_fxn'`s 
+        are still called with the node labels.
             
-    for transition in induced_transitions:
-        if transition[0][0] != transition[1][0]:
-            raise EoN.EoNError("transition {} -> {} not allowed: first node must keep same status".format(transition[0],transition[1]))
-        rate[transition] = nbr_induced_transition_graph.edges[transition[0],transition[1]]['rate']
-
-        if 'weight_label' in nbr_induced_transition_graph.edges[transition[0],transition[1]]:
-            wl = nbr_induced_transition_graph.edges[transition[0],transition[1]]['weight_label']
-            get_weight[transition] = nx.get_edge_attributes(G, wl)
-            potential_transitions[transition] = _ListDict_(weighted=True)
-        else:
-            potential_transitions[transition] = _ListDict_()
-                
-    #initialize all potential events to start.                
-    for node in G.nodes():        
-        if spontaneous_transition_graph.has_node(status[node]) and spontaneous_transition_graph.degree(status[node])>0:
-            for transition in spontaneous_transition_graph.edges(status[node]):
-                potential_transitions[transition].add(node, weight_increment = get_weight[transition][node])
-                #weight increment defaults to None if not present                    
-                    
-                    
-        for nbr in G.neighbors(node):
-            #print(status[node],status[nbr])
-            if nbr_induced_transition_graph.has_node((status[node],status[nbr])) and nbr_induced_transition_graph.degree((status[node],status[nbr])) >0:
-                for transition in nbr_induced_transition_graph.edges((status[node],status[nbr])):
-                    if (node, nbr) not in get_weight[transition]: #since edge may be in opposite order to earlier
-                        get_weight[transition][(node, nbr)] = get_weight[transition][(nbr, node)]
-                    potential_transitions[transition].add((node, nbr), weight_increment = get_weight[transition][(node, nbr)])
+    **spontaneous_transition_graph** Directed networkx graph
+        As for `Gillespie_Arbitrary`.  An edge may have an attribute 
+        `'time_fxn'` instead of `'rate'`.  It is called as 
+        `delay = time_fxn(node)` and returns a float.
+            
+    **nbr_induced_transition_graph** Directed networkx graph
+        As for `Gillespie_Arbitrary`.  An edge may have an attribute 
+        `'time_fxn'` instead of `'rate'`.  It is called as 
+        `delay = time_fxn(source, target)` where source is the inducing 
+        node and target the node that would change status, and returns a 
+        float.
+        
+    **IC** dict
+        states the initial status of each node in the network.
+            
+    **return_statuses** list or other iterable (but not a generator)
+        The statuses that we will return information for, in the order
+        we will return them.
+        
+    **tmin** number (default 0)
+        starting time
+            
+    **tmax** number (default 100)
+        stop time
+            
+    **return_full_data** boolean (default False)
+        Tells whether a Simulation_Investigation object should be returned.
+        
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        the source of random numbers for the exponentially distributed 
+        times, as for `Gillespie_Arbitrary`.  The `'time_fxn'`s use 
+        whatever source of random numbers they choose.
 
-    t = tmin
+    :Returns: 
+
+    **(times, status1, status2, ...)**  tuple of scipy arrays
+        first entry is the times at which events happen.
+        second (etc) entry is number at given time of status in corresponding
+        position of `return_statuses`
+        
+    Or if `return_full_data is True`
+
+    **full_data**  Simulation_Investigation object
+        as for `Gillespie_Arbitrary`.
     
-    total_rate = sum(rate[transition]*potential_transitions[transition].total_weight() for transition in spontaneous_transitions+induced_transitions)
-    if total_rate>0:
-        delay = random.expovariate(total_rate)
-    else:
-        delay = float('Inf')
-    t = t+delay
-    while total_rate>0 and t<tmax:
-        times.append(t)
-        r = random.random()
-        for transition in spontaneous_transitions+induced_transitions:
-            r -= rate[transition]*potential_transitions[transition].total_weight()/total_rate
-            if r<0:
-                break
-        #either node doing spontaneous or edge doing an induced event
-        if transition in spontaneous_transitions:
-            spontaneous = True
-        else:
-            spontaneous = False
-            
-        actor = potential_transitions[transition].choose_random()
-                
-        if spontaneous:
-            node = actor
-            old_status = transition[0]
-            status[node] = transition[1]
-            #node changes status
-        else:
-            #source = actor[0]
-            node = actor[1]
-            old_status = transition[0][1]
-            status[node] = transition[1][1]
-            #transmissions.add((t, source, node))
-            #node changes status
-
-        #it might look like there is a cleaner way to do this, but what if it
-        #happens that old_status == status[node]???  This way still works.
-        for x in data.keys():         
-            data[x].append(data[x][-1])
-        if old_status in return_statuses:
-            data[old_status][-1] -= 1
-        if status[node] in return_statuses:
-            data[status[node]][-1] += 1
-        
-        for transition in spontaneous_transitions: #can probably make more efficient
-            #remove node from any spontaneous lists
-            #add node to any spontaneous lists
-            if transition[0] == old_status:
-                potential_transitions[transition].remove(node)
-            if transition[0] == status[node]:
-                potential_transitions[transition].add(node, weight_increment = get_weight[transition][node])
-            #roundoff error can kill the calculation, but it's slow to do this right.
-            #so we'll only deal with it if the value is small enough that roundoff
-            #error might matter.
-            if potential_transitions[transition].total_weight() < 10**(-7) and potential_transitions[transition].total_weight()!=0:
-                potential_transitions[transition].update_total_weight()
-                
-        for transition in induced_transitions:
-            #remove edge from any induced lists
-            #add edge to any induced lists
-            for nbr in G.neighbors(node):
-                nbr_status = status[nbr]
-                if (node, nbr) not in get_weight[transition]:
-                    get_weight[transition][(node,nbr)] = get_weight[transition][(nbr,node)]
-                if transition[0] == (nbr_status, old_status):
-                    potential_transitions[transition].remove((nbr, node))
-                if transition[0] == (old_status, nbr_status):
-                    potential_transitions[transition].remove((node, nbr))
-                if transition[0] == (nbr_status, status[node]):
-                    potential_transitions[transition].add((nbr, node), weight_increment = get_weight[transition][nbr, node])
-                if transition[0] == (status[node], nbr_status):
-                    potential_transitions[transition].add((node, nbr), weight_increment = get_weight[transition][node, nbr])
-                
-                #roundoff error can kill the calculation, but it's slow to do this right.
-                #so we'll only deal with it if the value is small enough that roundoff
-                #error might matter.
-                if potential_transitions[transition].total_weight() < 10**(-7) and potential_transitions[transition].total_weight()!=0:
-                    potential_transitions[transition].update_total_weight()
-        total_rate = sum(rate[transition]*potential_transitions[transition].total_weight() for transition in spontaneous_transitions+induced_transitions)
-        if total_rate>0:
-            delay = random.expovariate(total_rate)
+    :SAMPLE USE:
+
+    This does an SEIR epidemic in which the latent period has a gamma 
+    distribution with mean 2 rather than an exponential distribution.
+
+    ::
+
+        import EoN
+        import networkx as nx
+        from collections import defaultdict
+        import matplotlib.pyplot as plt
+        import random
+        
+        N = 100000
+        G = nx.fast_gnp_random_graph(N, 5./(N-1))
+        
+        H = nx.DiGraph()
+        H.add_node('S')
+        H.add_edge('E', 'I', time_fxn = lambda node: random.gammavariate(4, 0.5))
+        H.add_edge('I', 'R', rate = 0.5)
+        
+        J = nx.DiGraph()
+        J.add_edge(('I', 'S'), ('I', 'E'), rate = 0.2)
+        IC = defaultdict(lambda: 'S')
+        for node in range(200):
+            IC[node] = 'I'
+        
+        t, S, E, I, R = EoN.fast_Arbitrary(G, H, J, IC, ('S', 'E', 'I', 'R'),
+                                            tmax = float('Inf'))
+        
+        plt.plot(t, E, label = 'Exposed') 
+        plt.plot(t, I, label = 'Infected')
+        plt.legend()
+        plt.savefig('SEIR_gamma_latency.png')
+    '''
+
+    rng = _get_rng_(rng)
+    network = G
+    G, tables, status = _compile_Arbitrary_(G, spontaneous_transition_graph, 
+                                            nbr_induced_transition_graph, IC, 
+                                            return_statuses, time_fxns = True)
+    time_fxns = list(tables.time_fxns)
+    #the functions are given node labels
+    label = G.label
+    for transition, time_fxn in enumerate(time_fxns):
+        if time_fxn is None:
+            continue
+        if transition < tables.n_spontaneous:
+            time_fxns[transition] = lambda node, time_fxn = time_fxn: time_fxn(label(node))
         else:
-            delay = float('Inf')
+            time_fxns[transition] = (lambda source, target, time_fxn = time_fxn: 
+                                        time_fxn(label(source), label(target)))
+    initial = array.array(_EventLog_.code_type(tables.K), status)
+    columns = _fast_Arbitrary_(G, tables, status.tolist(), tmin, tmax, rng, 
+                                return_full_data, time_fxns)
+    return _Arbitrary_output_(network, G, tables, tmin, initial, columns, 
+                                return_statuses, return_full_data)
+
+
+def tau_leap_Arbitrary(G, spontaneous_transition_graph, nbr_induced_transition_graph,
+  IC, return_statuses, tmin = 0, tmax = 100, epsilon = 0.03, rng = None):
+    #tested in test_tau_leap_error_shrinks_with_epsilon
+    r'''
+    An approximate, much faster, version of `Gillespie_Arbitrary` for large 
+    networks, using tau-leaping.
+
+    Rather than processing every event, it takes steps (leaps) of length dt
+    during which the rate of every transition of every node is held fixed.  
+    Each node with total rate r of leaving its status changes status with 
+    probability 1-exp(-r dt), and if it does the transition is chosen in
+    proportion to the rates.  All nodes are handled at once with numpy 
+    arrays, and the rates of the neighbor-induced transitions come from the
+    number (or total weight) of each node's neighbors with each status, held
+    in arrays and updated with sparse matrix products.
+
+    The leap is chosen adaptively (as in Cao, Gillespie and Petzold's tau
+    selection), so that the expected change, and its standard deviation, in 
+    the number with each status is at most `epsilon` times that number (or
+    1 if that is bigger).  Unlike in a well-mixed population the rates of a
+    node depend on the statuses of its neighbors, which the numbers with 
+    each status do not show (near the peak of an epidemic the number 
+    infected hardly changes while many nodes do).  So the leap also keeps 
+    the expected number of nodes changing status at most `epsilon` times 
+    the number that could change.  If the leap would contain less than one
+    event on average, a single exact Gillespie step is taken instead, so 
+    the early and late stages, when few nodes are changing, are simulated
+    exactly.
+
+    The model is given exactly as for `Gillespie_Arbitrary`.
+
+    :Arguments: 
+        
+    **G** NetworkX Graph or CompiledGraph
+        The underlying contact network (undirected).  For repeated 
+        simulations on a large network it is faster to pass a CompiledGraph,
+        which must hold any weights named by `'weight_label'` in the 
+        transition graphs.
             
-        t += delay
+    **spontaneous_transition_graph** Directed networkx graph
+        as in `Gillespie_Arbitrary`
+    **nbr_induced_transition_graph** Directed networkx graph
+        as in `Gillespie_Arbitrary`
+    **IC** dict
+        states the initial status of each node in the network.
+    **return_statuses** list or other iterable (but not a generator)
+        The statuses that we will return information for, in the order
+        we will return them.
+    **tmin** number (default 0)
+        starting time
+    **tmax** number (default 100)
+        stop time
+    **epsilon** positive float (default 0.03)
+        The accuracy/speed tradeoff.  Smaller values give shorter leaps and 
+        results closer to `Gillespie_Arbitrary`; larger values give fewer,
+        longer leaps.
+    **rng** integer, numpy SeedSequence or numpy Generator (default None)
+        the source of random numbers.  If None, numpy's global generator is
+        used.  Otherwise all random numbers are drawn from a numpy Generator
+        (rng itself, or one seeded with rng).
 
+    :Returns: 
+
+    **(times, status1, status2, ...)**  tuple of numpy arrays
+        first entry is the times at the end of each leap (or exact step).
+        second (etc) entry is number at given time of status in 
+        corresponding position of `return_statuses`
         
-    returnval = []
-    times = scipy.array(times)
-    returnval.append(times)
-    for return_status in return_statuses:
-        data[return_status] = scipy.array(data[return_status])
-        returnval.append(data[return_status])
-    return returnval
+    :SAMPLE USE:
+
+    This does the SEIR epidemic of the example in `Gillespie_Arbitrary`, 
+    and compares it with an exact simulation.
 
-    # return_full_data=False
-    # if not return_full_data:
-    #     return scipy.array(times), scipy.array(S), scipy.array(I)
-    # else:
-    #     node_history = _transform_to_node_history_(infection_times, recovery_times, tmin, SIR = False)
-    #     return EoN.Simulation_Investigation(G, node_history, SIR=False)
+    ::
+
+        import EoN
+        import networkx as nx
+        from collections import defaultdict
+        import matplotlib.pyplot as plt
+        
+        N = 1000000
+        G = EoN.CompiledGraph(nx.fast_gnp_random_graph(N, 5./(N-1)))
+        
+        H = nx.DiGraph()
+        H.add_node('S')
+        H.add_edge('E', 'I', rate = 0.6)
+        H.add_edge('I', 'R', rate = 0.1)
+        
+        J = nx.DiGraph()
+        J.add_edge(('I', 'S'), ('I', 'E'), rate = 0.1)
+        IC = defaultdict(lambda: 'S')
+        for node in range(200):
+            IC[node] = 'I'
+        
+        return_statuses = ('S', 'E', 'I', 'R')
+        
+        t, S, E, I, R = EoN.tau_leap_Arbitrary(G, H, J, IC, return_statuses,
+                                                tmax = float('Inf'))
+        plt.plot(t, I, label = 'tau leaping')
+        t, S, E, I, R = EoN.Gillespie_Arbitrary(G, H, J, IC, return_statuses,
+                                                tmax = float('Inf'))
+        plt.plot(t, I, '--', label = 'exact')
+        plt.legend()
+        plt.savefig('SEIR_tau_leap.png')       
+    '''
+    if epsilon <= 0:
+        raise EoN.EoNError("epsilon must be positive")
+    generator = _get_rng_(rng).generator
+    G, tables, status = _compile_Arbitrary_(G, spontaneous_transition_graph, 
+                                            nbr_induced_transition_graph, IC, 
+                                            return_statuses)
+    N = G.order()
+    K = tables.K
+    T = len(tables.transitions)
+    old_status = np.array(tables.old_status, dtype = np.int64)
+    new_status = np.array(tables.new_status, dtype = np.int64)
+    rates = tables.rates
+
+    #change[transition, status] is the change in the number with the status
+    #when the transition happens.
+    change = np.zeros((T, K))
+    change[np.arange(T), old_status] -= 1
+    change[np.arange(T), new_status] += 1
+
+    #pressure[(a, label)][v] is the number (or total weight) of the 
+    #neighbors of v with status a.
+    matrices = {}
+    pressure = {}
+    for transition in range(tables.n_spontaneous, T):
+        label = tables.weight_labels[transition]
+        if label not in matrices:
+            matrices[label] = _neighbor_matrix_(G, tables.weights[transition])
+        key = (tables.source_status[transition], label)
+        if key not in pressure:
+            pressure[key] = matrices[label].dot((status == key[0]).astype(float))
+
+    def transition_rates(nodes = slice(None)):
+        r'''rate[transition, i] is the rate of transition for the node
+        nodes[i]'''
+        node_status = status[nodes]
+        rate = np.empty((T, len(node_status)))
+        for transition in range(T):
+            rate[transition] = (node_status == old_status[transition])*rates[transition]
+            if transition < tables.n_spontaneous:
+                if tables.weights[transition] is not None:
+                    rate[transition] *= np.asarray(tables.weights[transition])[nodes]
+            else:
+                key = (tables.source_status[transition], tables.weight_labels[transition])
+                rate[transition] *= pressure[key][nodes]
+        return rate
+
+    def fire(nodes):
+        r'''chooses a transition for each of nodes in proportion to its rate,
+        and updates status, counts, pressure and the rates.'''
+        cumulative = np.cumsum(transition_rates(nodes), axis = 0)
+        r = generator.random(len(nodes))*cumulative[-1]
+        chosen = np.minimum((cumulative <= r).sum(axis = 0), T-1)
+        old = status[nodes]
+        new = new_status[chosen]
+
+        #the nodes whose rates change are these nodes and their neighbors
+        if pressure:
+            starts = G.indptr[nodes]
+            degrees = G.indptr[nodes+1] - starts
+            positions = (np.arange(degrees.sum()) + 
+                            np.repeat(starts - np.cumsum(degrees) + degrees, degrees))
+            affected = np.unique(np.concatenate((nodes, G.indices[positions])))
+        else:
+            affected = nodes
+        before = transition_rates(affected).sum(axis = 1)
+
+        status[nodes] = new
+        counts[:] += np.bincount(new, minlength = K) - np.bincount(old, minlength = K)
+        for (a, label), values in pressure.items():
+            delta = (new == a).astype(float) - (old == a)
+            moved = delta != 0
+            if moved.any():
+                rows = matrices[label][nodes[moved]]
+                np.add.at(values, rows.indices, 
+                            rows.data*np.repeat(delta[moved], np.diff(rows.indptr)))
+                #don't let rounding leave a tiny pressure where there is none
+                values[rows.indices[np.abs(values[rows.indices]) < 1e-12]] = 0
+
+        after = transition_rates(affected)
+        node_rates[affected] = after.sum(axis = 0)
+        transition_totals[:] += after.sum(axis = 1) - before
+
+    counts = np.bincount(status, minlength = K)
+    rate = transition_rates()
+    node_rates = rate.sum(axis = 0)
+    transition_totals = rate.sum(axis = 1)
+    del rate
+    return_codes = [tables.codes[return_status] for return_status in return_statuses]
+    times = [tmin]
+    data = [counts[return_codes]]
+    t = tmin
+    while t < tmax:
+        active = np.flatnonzero(node_rates > 0)
+        if len(active) == 0:
+            break
+        active_rates = node_rates[active]
+        total_rate = active_rates.sum()
+
+        #the leap that keeps the expected change and standard deviation of 
+        #each count within epsilon of the count, and the expected number of
+        #nodes changing within epsilon of the number of active nodes.
+        totals = np.maximum(transition_totals, 0)
+        mean = np.abs(totals.dot(change))
+        variance = totals.dot(change**2)
+        bound = np.maximum(epsilon*counts, 1)
+        with np.errstate(divide = 'ignore'):
+            dt = min(np.min(bound/mean), np.min(bound**2/variance), tmax - t,
+                        epsilon*len(active)/total_rate)
+
+        if dt*total_rate < 1:  #an exact step
+            t += generator.exponential(1./total_rate)
+            if t >= tmax:
+                break
+            cumulative = np.cumsum(active_rates)
+            index = np.searchsorted(cumulative, generator.random()*cumulative[-1], 
+                                    side = 'right')
+            fire(active[min(index, len(active)-1):][:1])
+        elif dt == float('Inf'): #only transitions that change nothing
+            break
+        else:
+            changing = active[generator.random(len(active)) < -np.expm1(-active_rates*dt)]
+            fire(changing)
+            t += dt
+        times.append(t)
+        data.append(counts[return_codes])
 
+    data = np.array(data, dtype = np.int64).reshape(len(times), len(return_codes))
+    return [np.array(times)] + [data[:, index] for index in range(len(return_codes))]
@@ -8,6 +8,17 @@ from matplotlib.animation import FuncAnimation
 from collections import defaultdict
 
 
+def _default_colordict_(possible_statuses, colordict = None):
+    r'''fills in a color for any status that colordict does not have'''
+    defaults = {'S':'#009a80','I':'#ff2020', 'R':'gray'}
+    if colordict is not None:
+        defaults.update(colordict)
+    colordict = defaults
+    others = (status for status in possible_statuses if status not in colordict)
+    for index, status in enumerate(others):
+        colordict[status] = 'C{}'.format(index % 10)
+    return colordict
+
         
 
 class Simulation_Investigation():
@@ -26,47 +37,44 @@ class Simulation_Investigation():
     #here.
     
     class _time_series_():
-        def __init__(self, t, S, I, R=None, colordict=None, label=None, **kwargs):
+        def __init__(self, t, counts, colordict=None, label=None, **kwargs):
+            #counts is a dict mapping each status to its time series
             if colordict is None:
                 raise EoN.EoNError("colordict must be defined")
-            self._S_ = S
-            self._I_ = I
-            self._R_ = R
+            self._counts_ = counts
             self._t_ = t
             self.colordict = colordict
             self.label=label
             self.plt_kwargs = kwargs
 
         def _plot_(self, ax, series_string = ''):
-            if self.label:
-                if 'S' in series_string:
-                    ax.plot(self._t_, self._S_, color = self.colordict['S'], label=self.label+': $S$', **self.plt_kwargs)
-                if 'I' in series_string:
-                    ax.plot(self._t_, self._I_, color = self.colordict['I'], label=self.label+': $I$', **self.plt_kwargs)
-                if 'R' in series_string:
-                    ax.plot(self._t_, self._R_, color = self.colordict['R'], label=self.label+': $R$', **self.plt_kwargs)
-            else:
-                if 'S' in series_string:
-                    ax.plot(self._t_, self._S_, color = self.colordict['S'], **self.plt_kwargs)
-                if 'I' in series_string:
-                    ax.plot(self._t_, self._I_, color = self.colordict['I'], **self.plt_kwargs)
-                if 'R' in series_string:
-                    ax.plot(self._t_, self._R_, color = self.colordict['R'], **self.plt_kwargs)
+            for status, count in self._counts_.items():
+                if status in series_string:
+                    if self.label:
+                        ax.plot(self._t_, count, color = self.colordict[status], label=self.label+': ${}$'.format(status), **self.plt_kwargs)
+                    else:
+                        ax.plot(self._t_, count, color = self.colordict[status], **self.plt_kwargs)
         def update_kwargs(self, **kwargs):
             self.plt_kwargs.update(kwargs)
                             
  
     def __init__(self, G, node_history, transmissions, SIR = True, pos = None, 
-                    colordict={'S':'#009a80','I':'#ff2020', 'R':'gray'}):
+                    colordict=None, possible_statuses = None):
+        if possible_statuses is None:
+            if SIR:
+                possible_statuses = ['S', 'I', 'R']
+            else:
+                possible_statuses = ['S', 'I']
         self.G = G
         self._node_history_ = node_history
         self._transmissions_ = transmissions
         self.SIR = SIR
-        self.sim_colordict = colordict
+        self._possible_statuses_ = list(possible_statuses)
+        self.sim_colordict = _default_colordict_(self._possible_statuses_, colordict)
         self.pos = pos
-        self.summary() #defines self._t_, self._S_, self._I_, and self._R_
+        self.summary() #defines self._t_ and self._counts_
         self._time_series_list_ = []
-        self._simulation_time_series_ = self._time_series_(self._t_, self._S_, self._I_, self._R_, 
+        self._simulation_time_series_ = self._time_series_(self._t_, self._counts_, 
                                     colordict=self.sim_colordict, label = 'Simulation')
         self._time_series_list_.append(self._simulation_time_series_)
         
@@ -101,7 +109,7 @@ class Simulation_Investigation():
     
         :Returns:
     
-        **status** string ('S', 'I', or 'R')
+        **status** string ('S', 'I', or 'R', or one of `possible_statuses`)
             status of node at time.
         '''
     
@@ -143,6 +151,7 @@ class Simulation_Investigation():
     def summary(self, nodelist = None):
         r'''
         Provides the population-scale summary of the dynamics: t, S, I, and R
+        (or t and the number with each of `possible_statuses`)
         
         :Arguments:
         **nodelist** (default None)
@@ -156,6 +165,9 @@ class Simulation_Investigation():
             **t, S, I, R** --- scipy arrays 
         if self.SIR is False then returns
             **t, S, I** --- scipy arrays.
+        if `possible_statuses` was given then returns
+            **t, X, Y, ...** --- scipy arrays, with an entry for each status
+            in `possible_statuses`.
                 
         Assumes that all entries in node_history start with same tmin'''
         if nodelist is None:  #calculate everything.
@@ -163,15 +175,12 @@ class Simulation_Investigation():
         if nodelist is self.G:
             try:
                 self._t_  #after first time through, don't recalculate.
-                if self.SIR:
-                    return self._t_, self._S_, self._I_, self._R_
-                else:
-                    return self._t_, self._S_, self._I_
+                return (self._t_,) + tuple(self._counts_[status] for status in self._possible_statuses_)
             except AttributeError:
                 pass
 
         times = set()
-        delta = {'S':defaultdict(int), 'I':defaultdict(int), 'R':defaultdict(int)}
+        delta = defaultdict(lambda: defaultdict(int))
         for node in nodelist:
             node_times = self._node_history_[node][0]
             node_statuses = self._node_history_[node][1]
@@ -184,36 +193,15 @@ class Simulation_Investigation():
                 times.add(time)
         t = scipy.array(sorted(list(times)))
         
-        tmin = t[0]
-        S=[delta['S'][tmin]]
-        I=[delta['I'][tmin]]
-        R=[delta['R'][tmin]]
-        for time in t[1:]:
-            S.append(S[-1]+delta['S'][time])
-            I.append(I[-1]+delta['I'][time])
-            R.append(R[-1]+delta['R'][time])
+        counts = {}
+        for status in self._possible_statuses_:
+            count = [delta[status][time] for time in t]
+            counts[status] = scipy.cumsum(count)
 
-        if nodelist == self.G:   #we're going to save these to avoid recalculating 
+        if nodelist is self.G:   #we're going to save these to avoid recalculating 
             self._t_ = t
-            self._S_ = scipy.array(S)
-            self._I_ = scipy.array(I)
-            if self.SIR:
-                self._R_ = scipy.array(R)
-            else:
-                self._R_ = None
-        
-        else:
-            S = scipy.array(S)
-            I = scipy.array(I)
-            if self.SIR:
-                R = scipy.array(R)
-            else:
-                R = None
-        
-            if self.SIR:
-                return t, S, I, R
-            else:
-                return t, S, I
+            self._counts_ = counts
+        return (t,) + tuple(counts[status] for status in self._possible_statuses_)
                 
     def t(self):
         r''' Returns the times of events
@@ -223,17 +211,22 @@ class Simulation_Investigation():
     def S(self):
         r''' Returns the number susceptible at each time.
         Generally better to get these all through summary()'''
-        return self._S_
+        return self._counts_.get('S')
 
     def I(self):
         r''' Returns the number infected at each time
         Generally better to get these all through summary()'''
-        return self._I_
+        return self._counts_.get('I')
 
     def R(self):
         r''' Returns the number recovered at each time
         Generally better to get these all through summary()'''
-        return self._R_
+        return self._counts_.get('R')
+
+    def count(self, status):
+        r''' Returns the number with the given status at each time.
+        Generally better to get these all through summary()'''
+        return self._counts_[status]
                 
     def transmissions(self):
         r'''Returns a list of tuples (t,u,v) stating that node u infected node
@@ -270,7 +263,7 @@ class Simulation_Investigation():
         
         T = nx.MultiDiGraph()
         
-        for t, u, v in self._transmissions_:
+        for t, u, v in self.transmissions():
             if u is not None:
                 T.add_edge(u, v, time=t)
         return T
@@ -310,8 +303,11 @@ class Simulation_Investigation():
         if (R is None and self.SIR):
             raise EoN.EoNError("cannot have SIR True if no R defined")
         if colordict is None:
-            colordict = self.colordict
-        ts = self._time_series_(t, S, I, R, self.SIR, colordict = colordict, label=label, **kwargs)
+            colordict = self.sim_colordict
+        counts = {'S': S, 'I': I}
+        if R is not None:
+            counts['R'] = R
+        ts = self._time_series_(t, counts, colordict = colordict, label=label, **kwargs)
         self._time_series_list_.append(ts)
         return ts
         
@@ -466,13 +462,9 @@ class Simulation_Investigation():
         ax.set_xticks([])
         ax.set_yticks([])
         
-        fakeLineS = plt.Line2D([0,0],[0,1], color=self.sim_colordict['S'], marker='o', linestyle='')
-        fakeLineI = plt.Line2D([0,0],[0,1], color=self.sim_colordict['I'], marker='o', linestyle='')
-        if self.SIR:
-            fakeLineR = plt.Line2D([0,0],[0,1], color=self.sim_colordict['R'], marker='o', linestyle='')
-            ax.legend([fakeLineS,fakeLineI,fakeLineR], ["$S$", "$I$", "$R$"])
-        else:
-            ax.legend([fakeLineS,fakeLineI], ["S", "I"])
+        fakeLines = [plt.Line2D([0,0],[0,1], color=self.sim_colordict[status], marker='o', linestyle='')
+                        for status in self._possible_statuses_]
+        ax.legend(fakeLines, ["${}$".format(status) for status in self._possible_statuses_])
             
         return drawn_nodes
 
@@ -488,32 +480,38 @@ class Simulation_Investigation():
         time_markers = []
         ts_plot_count = len(ts_plots)        
         for cnt, ts_plot in enumerate(ts_plots[:-1]):
-            if not self.SIR:
-                ts_plot = "".join([x for x in ts_plot if x != 'R'])
             ax = fig.add_subplot(ts_plot_count, 2, 2*(cnt+1))
             ax.set_xticks([])
             for ts in reversed(ts_list):
                 ts._plot_(ax, ts_plot)                
             ax.legend()
-            ax.set_title(", ".join(ts_plot))
+            ax.set_title(self._plot_title_(ts_plot))
             tm = ax.axvline(x=t, linestyle='--', color='k')
             ts_axes.append(ax)
             time_markers.append(tm)
         ax = fig.add_subplot(ts_plot_count, 2, 2*ts_plot_count)
         ax.set_xlabel(timelabel)
         ts_plot = ts_plots[-1]
-        if not self.SIR:
-            ts_plot = "".join([x for x in ts_plot if x != 'R'])
         for ts in reversed(ts_list):
             ts._plot_(ax, ts_plot)                
         ax.legend()
-        ax.set_title(", ".join(ts_plot))
+        ax.set_title(self._plot_title_(ts_plot))
         tm = ax.axvline(x=t, linestyle='--', color='k')
         ts_axes.append(ax)
         time_markers.append(tm)
         return ts_axes, time_markers
         
-    def display(self, time, ts_plots = ['S', 'I', 'R'], ts_list = None, nodelist=None, IonTop=True, timelabel=r'$t$', pos=None, **nx_kwargs):
+    def _plot_title_(self, ts_plot):
+        return ", ".join(status for status in self._possible_statuses_ if status in ts_plot)
+
+    def _ts_plots_(self, ts_plots):
+        #the plots to show, leaving out any without a status we have.
+        if ts_plots is None:
+            return list(self._possible_statuses_)
+        return [ts_plot for ts_plot in ts_plots 
+                if any(status in ts_plot for status in self._possible_statuses_)]
+        
+    def display(self, time, ts_plots = None, ts_list = None, nodelist=None, IonTop=True, timelabel=r'$t$', pos=None, **nx_kwargs):
         r'''
         Provides a plot of the network at a specific time and (optionally) 
         some of the time series
@@ -528,13 +526,15 @@ class Simulation_Investigation():
         **time** float
                 the time for the snapshot of the network.
                 
-        **ts_plots** (list of strings, default ['S', 'I', 'R'])
+        **ts_plots** (list of strings, default None)
                 denotes what should appear in the timeseries plots.  The
                 length of the list determines how many plots there are.  If
-                entry i is 'AB' then plot i has both A and B plotted.
+                entry i is 'AB' then plot i has both A and B plotted (if 
+                statuses are longer than a character, use a tuple of 
+                statuses instead).
                 .
-                So the default has a plot with 'S', a plot with 'I' and another
-                with 'R'.
+                The default has a plot for each status, so for SIR a plot 
+                with 'S', a plot with 'I' and another with 'R'.
             
         **ts_list** (list of timeseries objects - default None)
                 If multiple time series have been added, we might want to plot
@@ -602,8 +602,7 @@ class Simulation_Investigation():
         
         '''
             
-        if not self.SIR and ts_plots:
-            ts_plots = [x for x in ts_plots if x != 'R']
+        ts_plots = self._ts_plots_(ts_plots)
         if ts_plots:
             fig = plt.figure(figsize=(10,4))
             graph_ax = fig.add_subplot(121)
@@ -629,7 +628,7 @@ class Simulation_Investigation():
         return graph_ax, ts_ax_list
                 
     def _draw_infected_(self, pos, infected_nodes, ax, **nx_kwargs):
-        drawn_infected = nx.draw_networkx_nodes(self.G, pos, nodelist = infected_nodes, node_color = self.sim_colordict['I'], **nx_kwargs)
+        drawn_infected = nx.draw_networkx_nodes(self.G, pos, nodelist = infected_nodes, node_color = self.sim_colordict.get('I'), **nx_kwargs)
         return drawn_infected
         
     def _update_ani_(self, time, pos, nodelist, drawn_nodes, drawn_infected, graph_ax, ts_axes, time_markers, nx_kwargs):
@@ -637,7 +636,7 @@ class Simulation_Investigation():
         infected_nodes = [node for node in nodelist if status[node] == 'I']
         drawn_nodes.set_color([self.sim_colordict[status[node]] for node in nodelist])
         drawn_infected[0].remove()
-        drawn_infected[0] = nx.draw_networkx_nodes(self.G, pos, nodelist=infected_nodes, color = self.sim_colordict['I'], ax = graph_ax, **nx_kwargs)
+        drawn_infected[0] = nx.draw_networkx_nodes(self.G, pos, nodelist=infected_nodes, color = self.sim_colordict.get('I'), ax = graph_ax, **nx_kwargs)
         #print(len(time_markers),len(ts_axes))
         for index, ax in enumerate(ts_axes):
             time_markers[index].remove()
@@ -645,7 +644,7 @@ class Simulation_Investigation():
         return         
 
 
-    def animate(self, frame_times=None, ts_plots = ['S', 'I', 'R'], 
+    def animate(self, frame_times=None, ts_plots = None, 
                 ts_list = None, nodelist=None, IonTop=True, timelabel=r'$t$',  
                 pos = None, **nx_kwargs):
         r'''As in display, but this produces an animation.  
@@ -673,9 +672,10 @@ class Simulation_Investigation():
             The times for animation frames.  If nothing is given, then it
             uses 101 times between 0 and t[-1]
                 
-        **ts_plots** (list of strings, default 'S', 'I', 'R')
-            The default means that there will be 3 plots showing time series
-            with the first showing S, the second I, and the third R.
+        **ts_plots** (list of strings, default None)
+            The default means that there will be a plot for each status, so
+            for SIR 3 plots showing time series with the first showing S, the 
+            second I, and the third R.
             
             If one of these is not wanted, it can simply not be included in
             the list. 
@@ -717,8 +717,7 @@ class Simulation_Investigation():
         
         if frame_times is None:
             frame_times = scipy.linspace(0,self._t_[-1], 101)
-        if not self.SIR and ts_plots:
-            ts_plots = [x for x in ts_plots if x != 'R']
+        ts_plots = self._ts_plots_(ts_plots)
         if ts_plots:
             fig = plt.figure(figsize=(10,4))
             graph_ax = fig.add_subplot(121)
@@ -761,3 +760,60 @@ class Simulation_Investigation():
         #ani = simulation.animation()
         #ani.save(filename, fps=5, extra_args=['-vcodec', 'libx264'])
 
+
+class _LoggedHistory_(dict):
+    r'''A dict of node histories which builds the history of a node from the
+    event log the first time it is asked for.'''
+    def __init__(self, log):
+        self._log_ = log
+
+    def __missing__(self, node):
+        history = self._log_.node_history(node)
+        self[node] = history
+        return history
+
+class _Logged_Simulation_Investigation_(Simulation_Investigation):
+    r'''
+    A Simulation_Investigation built from the event log of a simulation 
+    (see `EoN.simulation._EventLog_`) rather than from a node_history dict.
+
+    Building every node history and the list of transmissions takes much 
+    longer than the simulation, and often only a few are needed.  So here 
+    the full summary is found directly from the log, and the history of a 
+    node (or the list of transmissions) is only built when first asked for.
+    '''
+    def __init__(self, G, log, pos = None, colordict = None):
+        #G may be a CompiledGraph, in which case the networkx graph is only
+        #built when it is needed.
+        self._log_ = log
+        possible_statuses = log.possible_statuses
+        Simulation_Investigation.__init__(self, G, _LoggedHistory_(log), None, 
+                                        SIR = 'R' in possible_statuses, pos = pos, 
+                                        colordict = colordict, 
+                                        possible_statuses = possible_statuses)
+
+    @property
+    def G(self):
+        if isinstance(self._G_, EoN.CompiledGraph):
+            self._G_ = self._G_.to_networkx()
+        return self._G_
+
+    @G.setter
+    def G(self, G):
+        self._G_ = G
+
+    def summary(self, nodelist = None):
+        if nodelist is None or nodelist is self.G:
+            try:
+                self._t_
+            except AttributeError:
+                self._t_, self._counts_ = self._log_.summary()
+            return (self._t_,) + tuple(self._counts_[status] for status in self._possible_statuses_)
+        return Simulation_Investigation.summary(self, nodelist)
+    summary.__doc__ = Simulation_Investigation.summary.__doc__
+
+    def transmissions(self):
+        if self._transmissions_ is None:
+            self._transmissions_ = self._log_.transmissions()
+        return self._transmissions_
+    transmissions.__doc__ = Simulation_Investigation.transmissions.__doc__
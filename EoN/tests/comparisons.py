@@ -0,0 +1,47 @@
+r'''
+Helpers for the tests that compare two engines which should agree in 
+distribution, for example an approximate engine with an exact one.  Each 
+engine is run once on each of the seeds 0, 1, ..., runs-1, so a comparison 
+always gives the same result, and the tolerances passed to `assert_close` 
+are several standard errors of the compared statistics, so that they do not 
+depend on the particular seeds.
+'''
+
+import numpy as np
+
+
+def final_size(output):
+    r'''returns the last value of the last status in the output of a
+    simulation (the final size for SIR)'''
+    return output[-1][-1]
+
+
+def final_and_peak(output):
+    r'''returns the final size and the largest value of the second last 
+    status (the peak prevalence for SIR and SEIR)'''
+    return output[-1][-1], np.max(output[-2])
+
+
+def seeded_values(simulate, runs, statistic = final_size):
+    r'''returns an array of statistic(simulate(seed)) for seed in 
+    range(runs)'''
+    return np.array([statistic(simulate(seed)) for seed in range(runs)])
+
+
+def seeded_means(simulate, runs, statistic = final_size):
+    r'''returns the mean of statistic(simulate(seed)) over seed in 
+    range(runs)'''
+    return seeded_values(simulate, runs, statistic).mean(axis = 0)
+
+
+def outbreaks(finals, N, threshold = 0.1):
+    r'''returns the fraction of minor outbreaks among the final sizes finals,
+    and the mean size of the major ones, which are those larger than 
+    threshold*N'''
+    finals = np.asarray(finals)
+    major = finals > threshold*N
+    return 1 - major.mean(), finals[major].mean()
+
+
+def assert_close(first, second, tolerance):
+    assert np.all(np.abs(np.asarray(first) - np.asarray(second)) < tolerance)
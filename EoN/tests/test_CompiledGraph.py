@@ -0,0 +1,84 @@
+r'''
+Checks the CompiledGraph lookups against the NetworkX graph it was compiled
+from, and the Gillespie simulations on a CompiledGraph (which walk the edge
+positions) against those on the NetworkX graph and against fast_SIR and
+fast_SIS.
+'''
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+N = 1000
+network = nx.fast_gnp_random_graph(N, 5./(N-1), seed = 10)
+weights = np.random.RandomState(0)
+for u, v in network.edges():
+    network.edges[u, v]['weight'] = 2*weights.random_sample()
+for node in network:
+    network.nodes[node]['speed'] = 0.5 + weights.random_sample()
+G = EoN.CompiledGraph(network, edge_weights = 'weight', node_weights = 'speed')
+
+
+def test_neighbors_and_edge_weights():
+    for u in network:
+        assert sorted(G.neighbors(u)) == sorted(network.neighbors(u))
+        for v in network.neighbors(u):
+            assert G.indices[G.edge_position(u, v)] == v
+            assert G.edge_weight(u, v, 'weight') == network.edges[u, v]['weight']
+    non_neighbor = next(v for v in network if v != 0 and v not in network[0])
+    with pytest.raises(EoN.EoNError):
+        G.edge_position(0, non_neighbor)
+
+
+def test_uncompiled_weights_raise_EoNError():
+    for simulation in (EoN.fast_SIR, EoN.fast_SIS, EoN.Gillespie_SIR,
+                        EoN.Gillespie_SIS):
+        with pytest.raises(EoN.EoNError):
+            simulation(G, 1., 1., transmission_weight = 'distance')
+        with pytest.raises(EoN.EoNError):
+            simulation(G, 1., 1., recovery_weight = 'distance')
+
+
+def _mean_final_(simulation, H, runs, **kwargs):
+    return np.mean([simulation(H, 0.6, 1., rho = 0.01, rng = seed,
+                                **kwargs)[-1][-1]
+                    for seed in range(runs)])
+
+
+def _mean_prevalence_(simulation, H, runs, **kwargs):
+    r'''the SIS prevalence averaged over 1 <= t <= 3, which is much less noisy
+    than the prevalence at a single time.'''
+    return np.mean([simulation(H, 0.6, 1., rho = 0.1, rng = seed, tmax = 3,
+                                report_times = np.linspace(1, 3, 11),
+                                **kwargs)[-1]
+                    for seed in range(runs)])
+
+
+def test_Gillespie_on_CompiledGraph_matches_networkx():
+    assert abs(_mean_final_(EoN.Gillespie_SIR, G, 100) -
+                _mean_final_(EoN.Gillespie_SIR, network, 100)) < 0.02*N
+    assert abs(_mean_prevalence_(EoN.Gillespie_SIS, G, 30) -
+                _mean_prevalence_(EoN.Gillespie_SIS, network, 30)) < 0.02*N
+
+
+def test_weighted_Gillespie_on_CompiledGraph_matches_fast():
+    weighted = dict(transmission_weight = 'weight', recovery_weight = 'speed')
+    assert abs(_mean_final_(EoN.Gillespie_SIR, G, 100, **weighted) -
+                _mean_final_(EoN.fast_SIR, G, 100, **weighted)) < 0.02*N
+    assert abs(_mean_prevalence_(EoN.Gillespie_SIS, G, 30, **weighted) -
+                _mean_prevalence_(EoN.fast_SIS, G, 30, **weighted)) < 0.02*N
+
+
+def test_Gillespie_full_data_on_CompiledGraph():
+    for simulation, kwargs in ((EoN.Gillespie_SIR, {}),
+                                (EoN.Gillespie_SIS, {'tmax': 5})):
+        full_data = simulation(G, 0.6, 1., initial_infecteds = range(10),
+                                rng = 4, return_full_data = True, **kwargs)
+        output = simulation(G, 0.6, 1., initial_infecteds = range(10), rng = 4,
+                            **kwargs)
+        for summary, expected in zip(full_data.summary(), output):
+            assert np.array_equal(summary, expected)
+        for t, source, target in full_data.transmissions()[10:]:
+            assert network.has_edge(source, target)
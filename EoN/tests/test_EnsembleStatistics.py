@@ -0,0 +1,89 @@
+r'''
+EnsembleStatistics keeps only running sums and sketches.  Merging two of
+them must give what adding all their simulations to one would, and the
+quantiles must be within relative_accuracy of the exact quantiles of the
+values it was given.  The "simulations" here are random step functions with
+values from 0 to a few thousand, so the sketch has many bins and some
+zeros.
+'''
+
+import numpy as np
+import pytest
+
+import EoN
+
+report_times = np.linspace(0, 10, 21)
+
+
+def _simulations_(count, seed):
+    rng = np.random.default_rng(seed)
+    for simulation in range(count):
+        times = np.concatenate(([0.], np.sort(rng.uniform(0, 12, 50))))
+        S = rng.integers(0, 3000, len(times))
+        I = rng.integers(0, 40, len(times))*rng.integers(0, 2, len(times))
+        yield times, S, I
+
+
+def _assert_same_(statistics, expected):
+    assert statistics.n == expected.n
+    for status in 'SI':
+        assert np.allclose(statistics.mean(status), expected.mean(status),
+                            rtol = 1e-12, atol = 0)
+        assert np.allclose(statistics.variance(status),
+                            expected.variance(status), rtol = 1e-9, atol = 0)
+        for q in (0, 0.1, 0.5, 0.9, 1):
+            assert np.array_equal(statistics.quantile(status, q),
+                                    expected.quantile(status, q))
+        assert statistics.final_histogram[status] == \
+                expected.final_histogram[status]
+        assert statistics.peak_histogram[status] == \
+                expected.peak_histogram[status]
+
+
+def test_merge_equals_sequential_accumulation():
+    simulations = list(_simulations_(300, 1))
+    expected = EoN.EnsembleStatistics(report_times)
+    for simulation in simulations:
+        expected.add(*simulation)
+
+    parts = [EoN.EnsembleStatistics(report_times) for part in range(3)]
+    for index, simulation in enumerate(simulations):
+        #uneven parts, one of them much smaller than the others
+        parts[0 if index < 10 else 1 + index % 2].add(*simulation)
+    merged = EoN.EnsembleStatistics(report_times)
+    merged.merge(EoN.EnsembleStatistics(report_times))
+    for part in parts:
+        merged.merge(part)
+    _assert_same_(merged, expected)
+
+
+def test_merge_checks_report_times_and_statuses():
+    first = EoN.EnsembleStatistics(report_times)
+    first.add(*next(_simulations_(1, 2)))
+    second = EoN.EnsembleStatistics(report_times[:-1])
+    second.add(*next(_simulations_(1, 3)))
+    with pytest.raises(EoN.EoNError):
+        first.merge(second)
+    third = EoN.EnsembleStatistics(report_times, statuses = ['S', 'E'])
+    third.add(*next(_simulations_(1, 4)))
+    with pytest.raises(EoN.EoNError):
+        first.merge(third)
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.05])
+def test_quantile_is_within_relative_accuracy(relative_accuracy):
+    statistics = EoN.EnsembleStatistics(report_times,
+                                        relative_accuracy = relative_accuracy)
+    values = {'S': [], 'I': []}
+    for times, S, I in _simulations_(501, 5):
+        statistics.add(times, S, I)
+        observation = np.searchsorted(times, report_times, side = 'right') - 1
+        values['S'].append(S[observation])
+        values['I'].append(I[observation])
+    for status in 'SI':
+        ordered = np.sort(values[status], axis = 0)
+        assert np.allclose(statistics.mean(status), ordered.mean(axis = 0))
+        for q in (0, 0.05, 0.25, 0.5, 0.75, 0.95, 1):
+            exact = ordered[int(q*(len(ordered) - 1))]
+            estimate = statistics.quantile(status, q)
+            assert np.all(np.abs(estimate - exact) <= (1 + 1e-9)*relative_accuracy*exact)
@@ -0,0 +1,51 @@
+r'''
+The next reaction method of Gillespie_Arbitrary keeps one putative time per
+possible transition in a queue, rather than choosing the next event from the
+total rate as the direct method does.  Both are exact, so from one infected
+hub they must give the same chance of a minor outbreak and the same mean 
+size of major ones.
+'''
+
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+import EoN
+from EoN.tests.comparisons import assert_close, outbreaks, seeded_values
+
+N = 500
+G = nx.fast_gnp_random_graph(N, 4./(N-1), seed = 2)
+hub = max(G.nodes(), key = G.degree)
+
+H = nx.DiGraph()
+H.add_edge('I', 'R', rate = 1.)
+J = nx.DiGraph()
+J.add_edge(('I', 'S'), ('I', 'I'), rate = 0.7)
+IC = defaultdict(lambda: 'S')
+IC[hub] = 'I'
+
+
+def _outbreaks_(method, runs):
+    finals = seeded_values(lambda seed: EoN.Gillespie_Arbitrary(G, H, J, IC,
+                                                ('S', 'I', 'R'), 
+                                                tmax = float('Inf'), rng = seed,
+                                                method = method),
+                            runs)
+    return outbreaks(finals, N)
+
+
+def test_next_reaction_matches_direct():
+    direct_minor, direct_size = _outbreaks_('direct', 300)
+    next_minor, next_size = _outbreaks_('next_reaction', 300)
+    assert_close(next_minor, direct_minor, 0.1)
+    assert_close(next_size, direct_size, 0.03*N)
+
+
+def test_next_reaction_is_reproducible():
+    first = EoN.Gillespie_Arbitrary(G, H, J, IC, ('S', 'I', 'R'), rng = 5,
+                                    method = 'next_reaction')
+    second = EoN.Gillespie_Arbitrary(G, H, J, IC, ('S', 'I', 'R'), rng = 5,
+                                    method = 'next_reaction')
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
@@ -0,0 +1,49 @@
+r'''
+A simulation continued from the SimulationState returned by an earlier one
+(with return_state=True) must start at the time that one ended, with exactly
+the nodes that were infected and recovered then, so its first counts are the
+last counts of the earlier simulation.
+'''
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+network = nx.fast_gnp_random_graph(500, 5./499, seed = 5)
+G = EoN.CompiledGraph(network)
+
+simulations = {'fast_SIR': (EoN.fast_SIR, {}),
+                'Gillespie_SIR': (EoN.Gillespie_SIR, {}),
+                'fast_SIS': (EoN.fast_SIS, {'tmax': 10}),
+                'Gillespie_SIS': (EoN.Gillespie_SIS, {'tmax': 10})}
+
+
+@pytest.mark.parametrize('H', [network, G], ids = ['networkx', 'compiled'])
+@pytest.mark.parametrize('name', sorted(simulations))
+def test_resumed_simulation_starts_from_saved_state(name, H):
+    simulation, kwargs = simulations[name]
+    for seed in range(3):
+        output = simulation(H, 0.6, 1., initial_infecteds = range(10), rng = seed,
+                            stop_when = {'I': 50}, return_state = True, **kwargs)
+        assert output[-2] == 'I'
+        state = output[-1]
+        assert state.t == output[0][-1]
+        assert len(state.infecteds) == output[2][-1]
+        if state.SIR:
+            assert len(state.recovereds) == output[3][-1]
+        assert set(state.infecteds) | set(state.recovereds) <= set(network)
+
+        #the continued simulation may change the parameters
+        resumed = simulation(H, 0.3, 1., initial_state = state, rng = seed,
+                                **kwargs)
+        assert resumed[0][0] == state.t
+        for counts, resumed_counts in zip(output[1:-2], resumed[1:]):
+            assert resumed_counts[0] == counts[-1]
+        assert all(np.diff(resumed[0]) >= 0)
+
+        full_data = simulation(H, 0.3, 1., initial_state = state, rng = seed,
+                                return_full_data = True, **kwargs)
+        for node in network:
+            assert full_data.node_status(node, state.t) == state.status(node)
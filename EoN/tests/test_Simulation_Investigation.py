@@ -0,0 +1,72 @@
+r'''
+Gillespie_Arbitrary with return_full_data=True returns a
+_Logged_Simulation_Investigation_, which finds summary() directly from the
+event log and only builds node histories and transmissions when asked.
+On an SEIR run these must agree with each other, with the output of the
+same seeded run without full data, and with a plain
+Simulation_Investigation built from them with possible_statuses.
+'''
+
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+network = nx.relabel_nodes(nx.fast_gnp_random_graph(300, 5./299, seed = 12),
+                            lambda node: 'node{}'.format(node))
+G = EoN.CompiledGraph(network)
+
+H = nx.DiGraph()
+H.add_edge('E', 'I', rate = 1.)
+H.add_edge('I', 'R', rate = 0.5)
+J = nx.DiGraph()
+J.add_edge(('I', 'S'), ('I', 'E'), rate = 0.4)
+IC = defaultdict(lambda: 'S')
+for node in range(5):
+    IC['node{}'.format(node)] = 'I'
+statuses = ('S', 'E', 'I', 'R')
+
+
+def _assert_same_(first, second):
+    assert len(first) == len(second)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+
+
+@pytest.mark.parametrize('method', ['direct', 'next_reaction'])
+@pytest.mark.parametrize('graph', [network, G], ids = ['networkx', 'compiled'])
+def test_SEIR_full_data(graph, method):
+    full_data = EoN.Gillespie_Arbitrary(graph, H, J, IC, statuses, tmax = 50,
+                                        return_full_data = True, rng = 3,
+                                        method = method)
+    output = EoN.Gillespie_Arbitrary(graph, H, J, IC, statuses, tmax = 50,
+                                        rng = 3, method = method)
+    summary = full_data.summary()
+    _assert_same_(summary, output)
+    assert summary[4][-1] > 20
+    #built from the node histories rather than the log
+    _assert_same_(full_data.summary(list(network)), summary)
+
+    for node in network:
+        times, history = full_data.node_history(node)
+        assert list(times) == sorted(times)
+        #each node moves along S, E, I, R, starting anywhere
+        assert ''.join(history) in 'SEIR'
+    infected = {node for node in network 
+                    if full_data.node_history(node)[1][:2] == ['S', 'E']}
+    transmissions = full_data.transmissions()
+    assert {target for t, source, target in transmissions} == infected
+    for t, source, target in transmissions:
+        assert network.has_edge(source, target)
+        assert full_data.node_status(source, t) == 'I'
+        assert full_data.node_status(target, t) == 'E'
+        assert full_data.node_history(target)[0][1] == t
+
+    plain = EoN.Simulation_Investigation(network,
+                                {node: full_data.node_history(node) for node in network},
+                                transmissions, possible_statuses = statuses)
+    _assert_same_(plain.summary(), summary)
+    assert plain.get_statuses(time = 5.) == full_data.get_statuses(time = 5.)
@@ -0,0 +1,80 @@
+r'''
+The calendar queue must pop exactly what a heap would, in the same order.
+The sequences of pushes and pops below grow the queue well past the size at
+which the adaptive bucket width is first calculated and then shrink it
+again, so the queue is rebuilt several times, and many of the times are
+equal so that the order of ties is checked too.
+'''
+
+import heapq
+import random
+
+import pytest
+
+import EoN
+from EoN.simulation import _Calendar_
+
+
+def _operations_(seed):
+    r'''a sequence of pushes (a function of the time last popped giving the
+    time of the new entry) and pops (None) which grows the queue to about 
+    18000 entries and then empties it'''
+    rng = random.Random(seed)
+    for step in range(90000):
+        if rng.random() < (0.7 if step < 45000 else 0.3):
+            delay = rng.expovariate(1.)
+            if rng.random() < 0.2:
+                #rounded times, which often tie
+                yield lambda now: round(now + delay, 1)
+            else:
+                yield lambda now: now + delay
+        else:
+            yield None
+
+
+@pytest.mark.parametrize('width', [None, 0.05])
+def test_Calendar_pops_in_heap_order(width):
+    calendar = _Calendar_(width = width)
+    heap = []
+    counter = 0
+    now = 0.
+    for time in _operations_(1):
+        if time is not None:
+            calendar.push((time(now), counter))
+            heapq.heappush(heap, (time(now), counter))
+            counter += 1
+        elif heap:
+            entry = heapq.heappop(heap)
+            assert calendar.pop() == entry
+            now = entry[0]
+        assert len(calendar) == len(heap)
+    while heap:
+        assert calendar.pop() == heapq.heappop(heap)
+    assert len(calendar) == 0
+
+
+def test_myQueue_calendar_runs_events_in_heap_order():
+    orders = []
+    for queue in ('heap', 'calendar'):
+        Q = EoN.myQueue(tmax = 50, queue = queue)
+        rng = random.Random(2)
+        order = []
+
+        def event(t, label):
+            order.append((t, label))
+            for child in range(rng.randint(0, 2)):
+                Q.add(t + round(rng.expovariate(1.), 1), event,
+                        args = (2*label + child,))
+
+        for label in range(5000):
+            Q.add(round(rng.random(), 2), event, args = (label,))
+        while Q:
+            Q.pop_and_run()
+        orders.append(order)
+    assert len(orders[0]) > 20000
+    assert orders[1] == orders[0]
+
+
+def test_unknown_queue_raises_EoNError():
+    with pytest.raises(EoN.EoNError):
+        EoN.myQueue(queue = 'list')
@@ -0,0 +1,95 @@
+r'''
+The user-defined functions of the simulations are called with node labels
+whether G is a NetworkX graph or a CompiledGraph.  Here they are
+deterministic functions of the labels, so the simulations on the two must
+give the same output.
+'''
+
+import math
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+import EoN
+
+network = nx.relabel_nodes(nx.fast_gnp_random_graph(300, 4./299, seed = 9),
+                            lambda node: 'node{}'.format(node))
+G = EoN.CompiledGraph(network)
+initial_infecteds = ['node0', 'node1', 'node2']
+
+
+def _number_(node):
+    return int(node[4:])
+
+
+def _delay_(u, v, *args):
+    return 2*(math.sqrt(3*_number_(u) + 7*_number_(v) + 2) % 1)
+
+
+def _duration_(node, *args):
+    return 1 + math.sqrt(_number_(node) + 5) % 1
+
+
+def _assert_same_(first, second):
+    assert len(first) == len(second)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+
+
+def test_fast_nonMarkov_SIR_calls_functions_with_labels():
+    def trans_and_rec_time_fxn(node, neighbors):
+        assert node in network and set(neighbors) <= set(network[node])
+        return {v: _delay_(node, v) for v in neighbors}, _duration_(node)
+
+    results = []
+    for H in (network, G):
+        results.append(EoN.fast_nonMarkov_SIR(H, trans_time_fxn = _delay_,
+                                                rec_time_fxn = _duration_,
+                                                initial_infecteds = initial_infecteds))
+        _assert_same_(results[-1], results[0])
+        results.append(EoN.fast_nonMarkov_SIR(H,
+                                trans_and_rec_time_fxn = trans_and_rec_time_fxn,
+                                initial_infecteds = initial_infecteds))
+        _assert_same_(results[-1], results[0])
+
+
+def test_fast_nonMarkov_SIS_calls_functions_with_labels():
+    def trans_time_fxn(u, v, rec_delay):
+        return [delay for delay in (_delay_(u, v), 1 + _delay_(v, u))
+                if delay < rec_delay]
+
+    results = [EoN.fast_nonMarkov_SIS(H, trans_time_fxn = trans_time_fxn,
+                                        rec_time_fxn = _duration_,
+                                        initial_infecteds = initial_infecteds,
+                                        tmax = 10)
+                for H in (network, G)]
+    _assert_same_(results[1], results[0])
+
+
+def test_fast_Arbitrary_calls_time_fxns_with_labels():
+    H = nx.DiGraph()
+    H.add_edge('I', 'R', time_fxn = _duration_)
+    J = nx.DiGraph()
+    J.add_edge(('I', 'S'), ('I', 'I'), time_fxn = _delay_)
+    IC = defaultdict(lambda: 'S')
+    for node in initial_infecteds:
+        IC[node] = 'I'
+    results = [EoN.fast_Arbitrary(graph, H, J, IC, ('S', 'I', 'R'),
+                                    tmax = float('Inf'))
+                for graph in (network, G)]
+    _assert_same_(results[1], results[0])
+
+
+def test_percolation_calls_functions_with_labels():
+    timed = [EoN.nonMarkov_directed_percolate_network_with_timing(H, _delay_,
+                                                                _duration_)
+                for H in (network, G)]
+    assert set(timed[1].edges()) == set(timed[0].edges())
+
+    xi = {node: _duration_(node) for node in network}
+    zeta = {node: _number_(node) % 3 for node in network}
+    transmission = lambda duration, susceptibility: duration*susceptibility > 1.5
+    percolated = [EoN.nonMarkov_directed_percolate_network(H, xi, zeta, transmission)
+                    for H in (network, G)]
+    assert set(percolated[1].edges()) == set(percolated[0].edges())
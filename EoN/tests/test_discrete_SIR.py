@@ -0,0 +1,58 @@
+r'''
+Runs discrete_SIR with a user-defined (unbatched) test_transmission on a
+CompiledGraph with string labels and compares it with the same simulation
+on the NetworkX graph.  The tests below do not depend on random numbers, so
+the two must agree exactly.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+
+network = nx.relabel_nodes(nx.fast_gnp_random_graph(500, 4./499, seed = 8),
+                            lambda node: 'node{}'.format(node))
+G = EoN.CompiledGraph(network)
+
+
+def _even_target_(u, v, labels):
+    r'''transmits only to nodes whose label ends in an even digit'''
+    labels.add(u)
+    labels.add(v)
+    return int(v[-1]) % 2 == 0
+
+
+def test_unbatched_test_transmission_is_called_with_labels():
+    results = []
+    for H in (network, G):
+        labels = set()
+        results.append(EoN.discrete_SIR(H, _even_target_, args = (labels,),
+                                        initial_infecteds = ['node0', 'node2'],
+                                        initial_recovereds = ['node4']))
+        assert labels and labels <= set(network)
+    for compiled, expected in zip(results[1], results[0]):
+        assert np.array_equal(compiled, expected)
+
+
+def test_unbatched_test_transmission_full_data_uses_labels():
+    always = lambda u, v: True
+    source = 'node{}'.format(min(node for node in range(500)
+                                if network.degree('node{}'.format(node)) == 3))
+    expected = EoN.discrete_SIR(network, always, initial_infecteds = source,
+                                return_full_data = True)
+    compiled = EoN.discrete_SIR(G, always, initial_infecteds = source,
+                                return_full_data = True)
+    for node in network:
+        assert compiled.node_history(node) == expected.node_history(node)
+    for compiled_counts, expected_counts in zip(compiled.summary(),
+                                                expected.summary()):
+        assert np.array_equal(compiled_counts, expected_counts)
+
+
+def test_unbatched_test_transmission_with_rho():
+    labels = set()
+    t, S, I, R = EoN.discrete_SIR(G, _even_target_, args = (labels,),
+                                    rho = 0.02, rng = 3)
+    assert I[0] == 10
+    assert labels <= set(network)
+    assert S[-1] + R[-1] == 500
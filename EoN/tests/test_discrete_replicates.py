@@ -0,0 +1,57 @@
+r'''
+basic_discrete_SIR_replicates and basic_discrete_SIS_replicates run many 
+discrete time epidemics at once, with one bit per replicate in each node's
+row of status words.  Each replicate must be distributed as one 
+basic_discrete_SIR or basic_discrete_SIS run, and with p=1 every replicate 
+must be the deterministic breadth-first spread.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+from EoN.tests.comparisons import assert_close, outbreaks, seeded_values
+
+N = 1000
+G = nx.fast_gnp_random_graph(N, 4./(N-1), seed = 4)
+source = min(node for node in G if G.degree(node) == 2)
+
+
+def test_SIR_replicates_match_basic_discrete_SIR():
+    p = 0.4
+    runs = 512
+    t, S, I, R = EoN.basic_discrete_SIR_replicates(G, p, replicates = runs,
+                                                    initial_infecteds = source,
+                                                    rng = 1)
+    replicate_minor, replicate_size = outbreaks(R[:, -1], N)
+    basic_minor, basic_size = outbreaks(seeded_values(lambda seed: 
+                                        EoN.basic_discrete_SIR(G, p,
+                                                    initial_infecteds = source,
+                                                    rng = seed),
+                                        runs), N)
+    assert_close(replicate_minor, basic_minor, 0.1)
+    assert_close(replicate_size, basic_size, 0.02*N)
+
+
+def test_SIR_replicates_with_p_one_are_breadth_first_search():
+    t, S, I, R = EoN.basic_discrete_SIR_replicates(G, 1., replicates = 100,
+                                                    initial_infecteds = source,
+                                                    rng = 2)
+    bt, bS, bI, bR = EoN.basic_discrete_SIR(G, 1., initial_infecteds = source,
+                                            rng = 2)
+    for replicate in range(100):
+        assert np.array_equal(I[replicate, :len(bI)], bI)
+        assert np.array_equal(R[replicate, :len(bR)], bR)
+
+
+def test_SIS_replicates_match_basic_discrete_SIS():
+    p = 0.4
+    runs = 256
+    tmax = 20
+    t, S, I = EoN.basic_discrete_SIS_replicates(G, p, replicates = runs,
+                                                rho = 0.05, tmax = tmax,
+                                                rng = 3)
+    basic = seeded_values(lambda seed: EoN.basic_discrete_SIS(G, p, rho = 0.05,
+                                                        tmax = tmax, rng = seed),
+                            runs)
+    assert_close(I[:, -1].mean(), basic.mean(), 0.02*N)
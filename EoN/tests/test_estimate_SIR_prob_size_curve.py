@@ -0,0 +1,36 @@
+r'''
+estimate_SIR_prob_size_curve adds the edges of each sample in a random order
+and reads the largest component off at every p in one pass, where 
+estimate_SIR_prob_size percolates the network afresh for a single p.  Below,
+near and above threshold the curve must match the mean of many single 
+estimates, and its end points are known exactly.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+from EoN.tests.comparisons import assert_close, seeded_means
+
+N = 3000
+network = nx.fast_gnp_random_graph(N, 4./(N-1), seed = 6)
+G = EoN.CompiledGraph(network)
+
+
+def test_curve_matches_estimate_SIR_prob_size():
+    ps = [0.15, 0.4, 0.7]
+    PE, AR = EoN.estimate_SIR_prob_size_curve(G, ps, n_samples = 20, rng = 1)
+    assert np.array_equal(PE, AR)
+    for p, estimate in zip(ps, AR):
+        single = seeded_means(lambda seed: EoN.estimate_SIR_prob_size(G, p, 
+                                                                    rng = seed),
+                                40, lambda estimates: estimates[1])
+        assert_close(estimate, single, 0.02)
+
+
+def test_curve_at_zero_and_one():
+    PE, AR = EoN.estimate_SIR_prob_size_curve(G, [0, 1], rng = 2)
+    largest = max(len(component) for component in
+                    nx.connected_components(network))
+    assert np.isclose(AR[0], 1./N)
+    assert np.isclose(AR[1], float(largest)/N)
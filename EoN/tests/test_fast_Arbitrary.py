@@ -0,0 +1,61 @@
+r'''
+fast_Arbitrary is event driven in the style of fast_nonMarkov_SIR, so it 
+accepts a time_fxn for a transition as well as a rate.  With rates only, it
+must match Gillespie_Arbitrary on a Markovian SEIR model, and with a fixed 
+infectious period it must match fast_nonMarkov_SIR.
+'''
+
+import random
+from collections import defaultdict
+
+import networkx as nx
+
+import EoN
+from EoN.tests.comparisons import assert_close, final_and_peak, seeded_means
+
+N = 1000
+G = nx.fast_gnp_random_graph(N, 5./(N-1), seed = 3)
+IC = defaultdict(lambda: 'S')
+for node in range(10):
+    IC[node] = 'I'
+
+
+def test_fast_Arbitrary_matches_Gillespie_Arbitrary():
+    H = nx.DiGraph()
+    H.add_edge('E', 'I', rate = 2.)
+    H.add_edge('I', 'R', rate = 1.)
+    J = nx.DiGraph()
+    J.add_edge(('I', 'S'), ('I', 'E'), rate = 0.5)
+    exact, fast = [seeded_means(lambda seed: engine(G, H, J, IC, 
+                                                    ('S', 'E', 'I', 'R'),
+                                                    tmax = float('Inf'),
+                                                    rng = seed),
+                                60, final_and_peak)
+                    for engine in (EoN.Gillespie_Arbitrary, EoN.fast_Arbitrary)]
+    assert_close(fast[0], exact[0], 0.02*N)
+    assert_close(fast[1], exact[1], 0.01*N)
+
+
+def test_fast_Arbitrary_matches_fast_nonMarkov_SIR():
+    #infection at rate tau along each edge and recovery exactly D after
+    #infection.
+    tau = 0.5
+    D = 1.
+    H = nx.DiGraph()
+    H.add_edge('I', 'R', time_fxn = lambda node: D)
+    J = nx.DiGraph()
+    J.add_edge(('I', 'S'), ('I', 'I'), rate = tau)
+
+    arbitrary = seeded_means(lambda seed: EoN.fast_Arbitrary(G, H, J, IC, 
+                                                    ('S', 'I', 'R'),
+                                                    tmax = float('Inf'),
+                                                    rng = seed),
+                                60)
+    #the transmission times come from the random module, not rng
+    random.seed(0)
+    nonMarkov = seeded_means(lambda seed: EoN.fast_nonMarkov_SIR(G,
+                                    trans_time_fxn = lambda u, v: random.expovariate(tau),
+                                    rec_time_fxn = lambda u: D,
+                                    initial_infecteds = range(10), rng = seed),
+                                60)
+    assert_close(arbitrary, nonMarkov, 0.02*N)
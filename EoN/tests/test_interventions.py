@@ -0,0 +1,97 @@
+r'''
+Tests of the interventions of fast_nonMarkov_SIR and fast_SIR on a
+CompiledGraph, and of the cancellation of events in _EventQueue_ which they
+rely on.  On a path with fixed delays the epidemic reaches node k at time
+k, so an intervention at time 2.5 must cancel the transmission to node 3
+pending for time 3.
+'''
+
+import random
+
+import networkx as nx
+import pytest
+
+import EoN
+from EoN.simulation import _EventQueue_
+
+
+def _path_SIR_(G, interventions):
+    return EoN.fast_nonMarkov_SIR(G, trans_time_fxn = lambda u, v: 1.,
+                                    rec_time_fxn = lambda u: 10.,
+                                    initial_infecteds = 0,
+                                    interventions = interventions,
+                                    return_full_data = True)
+
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('intervention', [('vaccinate', [3]), ('isolate', [3]),
+                                        ('remove_edges', [(2, 3)])])
+def test_intervention_cancels_pending_transmission(directed, intervention):
+    path = nx.path_graph(10, create_using = nx.DiGraph() if directed else None)
+    action, items = intervention
+    sim = _path_SIR_(EoN.CompiledGraph(path), [(2.5, action, items)])
+    assert [target for t, source, target in sim.transmissions()] == [0, 1, 2]
+    assert sim.node_history(4) == ([0], ['S'])
+    if action == 'vaccinate':
+        assert sim.node_history(3) == ([0, 2.5], ['S', 'R'])
+    else:
+        assert sim.node_history(3) == ([0], ['S'])
+
+
+def test_vaccinate_is_one_event():
+    star = EoN.CompiledGraph(nx.star_graph(20))
+    t, S, I, R = EoN.fast_nonMarkov_SIR(star, trans_time_fxn = lambda u, v: 5.,
+                                        rec_time_fxn = lambda u: 10.,
+                                        initial_infecteds = 0,
+                                        interventions = [(1., 'vaccinate',
+                                                            range(1, 16))])
+    assert list(t[:2]) == [0, 1.]
+    assert (S[1], I[1], R[1]) == (5, 1, 15)
+    assert (S[-1], I[-1], R[-1]) == (0, 0, 21)
+
+
+def test_no_transmission_along_removed_edges():
+    network = nx.fast_gnp_random_graph(2000, 6./1999, seed = 11)
+    G = EoN.CompiledGraph(network)
+    vaccinated = set(range(100, 400))
+    isolated = set(range(400, 500))
+    removed = {edge for edge in network.edges() if 500 <= edge[0] < 700}
+    interventions = [(0.5, 'vaccinate', vaccinated), (1., 'isolate', isolated),
+                        (1.5, 'remove_edges', removed)]
+    for seed in range(5):
+        sim = EoN.fast_SIR(G, 1., 1., initial_infecteds = range(20), rng = seed,
+                            interventions = interventions,
+                            return_full_data = True)
+        for t, source, target in sim.transmissions():
+            if t > 0.5:
+                assert target not in vaccinated
+            if t > 1.:
+                assert source not in isolated and target not in isolated
+            if t > 1.5:
+                assert (source, target) not in removed
+                assert (target, source) not in removed
+
+
+@pytest.mark.parametrize('queue', ['heap', 'calendar'])
+def test_cancelled_events_never_pop(queue):
+    rng = random.Random(12)
+    Q = _EventQueue_(queue = queue)
+    tokens = {}
+    for event in range(2000):
+        tokens[event] = Q.push(rng.random(), 0, event, event)
+    for event in rng.sample(range(2000), 1500):
+        assert Q.cancel(tokens.pop(event))
+        assert len(Q._Q_) <= 2*len(Q) + 1
+    assert len(Q) == 500
+    popped = [Q.pop() for event in range(250)]
+    #popped and cancelled tokens do not cancel the events reusing their slots
+    for event in range(2000, 2250):
+        tokens[event] = Q.push(1 + rng.random(), 0, event, event)
+    for time, event_type, source, target in popped:
+        assert not Q.cancel(tokens.pop(source))
+    remaining = sorted(tokens, key = lambda event: tokens[event] >> 32)
+    popped += [Q.pop() for event in range(len(Q))]
+    times = [time for time, event_type, source, target in popped]
+    assert times == sorted(times)
+    assert sorted(source for time, event_type, source, target in popped[250:]) \
+            == sorted(remaining)
@@ -0,0 +1,39 @@
+r'''
+Checks percolation_components (the union-find over the kept edges) against
+networkx's connected_components of the network percolate_network builds
+from the same random draws.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+
+
+def _partition_(labels, nodelist):
+    components = {}
+    for node, label in zip(nodelist, labels.tolist()):
+        components.setdefault(label, set()).add(node)
+    return sorted(map(frozenset, components.values()), key = sorted)
+
+
+def test_percolation_components_match_connected_components():
+    G = nx.relabel_nodes(nx.fast_gnp_random_graph(3000, 3./2999, seed = 5),
+                            lambda node: 'node{}'.format(node))
+    H = EoN.CompiledGraph(G)
+    for p in (0.2, 0.5, 0.9):
+        for seed in range(3):
+            labels, sizes = EoN.percolation_components(H, p, rng = seed)
+            percolated = EoN.percolate_network(H, p, rng = seed)
+            expected = sorted(map(frozenset, nx.connected_components(percolated)),
+                                key = sorted)
+            assert _partition_(labels, H.nodelist) == expected
+            assert np.array_equal(sizes, np.bincount(labels))
+
+
+def test_percolation_components_with_p_one():
+    G = nx.disjoint_union(nx.path_graph(10), nx.cycle_graph(5))
+    G.add_edge(3, 3)
+    labels, sizes = EoN.percolation_components(G, 1.)
+    assert sorted(sizes.tolist()) == [5, 10]
+    assert len(set(labels[:10].tolist())) == 1
@@ -0,0 +1,63 @@
+r'''
+With report_times a simulation only records its state as it passes each
+report time.  It draws the same random numbers as without report_times, so
+with the same seed its output must be exactly what `subsample` gives from
+the full output, for each of the six simulations that take report_times and
+both on a NetworkX graph and on a CompiledGraph.
+'''
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+network = nx.fast_gnp_random_graph(500, 5./499, seed = 7)
+G = EoN.CompiledGraph(network)
+
+
+def _nonMarkov_(simulation, H, seed, **kwargs):
+    r'''the user-defined functions draw from a random.Random seeded with
+    seed, so they are reproducible too'''
+    draws = random.Random(seed)
+    if simulation is EoN.fast_nonMarkov_SIS:
+        trans_time_fxn = lambda u, v, rec_delay: [delay for delay in
+                                    (draws.expovariate(0.6),) if delay < rec_delay]
+    else:
+        trans_time_fxn = lambda u, v: draws.expovariate(0.6)
+    return simulation(H, trans_time_fxn = trans_time_fxn,
+                        rec_time_fxn = lambda u: draws.gammavariate(2., 0.5),
+                        rng = seed, **kwargs)
+
+
+simulations = {'fast_SIR': lambda H, seed, **kwargs:
+                            EoN.fast_SIR(H, 0.6, 1., rng = seed, **kwargs),
+                'Gillespie_SIR': lambda H, seed, **kwargs:
+                            EoN.Gillespie_SIR(H, 0.6, 1., rng = seed, **kwargs),
+                'fast_nonMarkov_SIR': lambda H, seed, **kwargs:
+                            _nonMarkov_(EoN.fast_nonMarkov_SIR, H, seed, **kwargs),
+                'fast_SIS': lambda H, seed, **kwargs:
+                            EoN.fast_SIS(H, 0.6, 1., tmax = 8, rng = seed, **kwargs),
+                'Gillespie_SIS': lambda H, seed, **kwargs:
+                            EoN.Gillespie_SIS(H, 0.6, 1., tmax = 8, rng = seed,
+                                                **kwargs),
+                'fast_nonMarkov_SIS': lambda H, seed, **kwargs:
+                            _nonMarkov_(EoN.fast_nonMarkov_SIS, H, seed, tmax = 8,
+                                        **kwargs)}
+
+
+@pytest.mark.parametrize('H', [network, G], ids = ['networkx', 'compiled'])
+@pytest.mark.parametrize('name', sorted(simulations))
+def test_report_times_equal_subsample(name, H):
+    simulation = simulations[name]
+    report_times = np.linspace(0, 12, 61)
+    for seed in range(3):
+        full = simulation(H, seed, initial_infecteds = range(5))
+        reported = simulation(H, seed, initial_infecteds = range(5),
+                                report_times = report_times)
+        assert np.array_equal(reported[0], report_times)
+        expected = EoN.subsample(report_times, full[0], *full[1:])
+        for values, expected_values in zip(reported[1:], expected):
+            assert np.array_equal(values, expected_values)
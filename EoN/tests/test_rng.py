@@ -0,0 +1,91 @@
+r'''
+Given rng (a seed or a numpy Generator), a function draws all its random
+numbers from its own numpy Generator: the same seed gives the same output,
+and Python's `random` module and numpy's global generator are neither used
+nor changed, so other code drawing from them is unaffected.
+'''
+
+import random
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+network = nx.fast_gnp_random_graph(400, 5./399, seed = 4)
+G = EoN.CompiledGraph(network)
+
+H = nx.DiGraph()
+H.add_edge('I', 'R', rate = 1.)
+J = nx.DiGraph()
+J.add_edge(('I', 'S'), ('I', 'I'), rate = 0.6)
+IC = defaultdict(lambda: 'S')
+IC[0] = 'I'
+
+functions = {
+    'fast_SIR': lambda H, rng: EoN.fast_SIR(H, 0.6, 1., rho = 0.02, rng = rng),
+    'fast_SIS': lambda H, rng: EoN.fast_SIS(H, 0.6, 1., rho = 0.02, tmax = 5,
+                                            rng = rng),
+    'Gillespie_SIR': lambda H, rng: EoN.Gillespie_SIR(H, 0.6, 1., rho = 0.02,
+                                                        rng = rng),
+    'Gillespie_SIS': lambda H, rng: EoN.Gillespie_SIS(H, 0.6, 1., rho = 0.02,
+                                                        tmax = 5, rng = rng),
+    'fast_nonMarkov_SIR': lambda H, rng: EoN.fast_nonMarkov_SIR(H,
+                                trans_time_fxn = lambda u, v: 1. + u % 3,
+                                rec_time_fxn = lambda u: 2.5, rho = 0.02, rng = rng),
+    'discrete_SIR': lambda H, rng: EoN.discrete_SIR(H, args = (0.3,), rho = 0.02,
+                                                    rng = rng),
+    'basic_discrete_SIR': lambda H, rng: EoN.basic_discrete_SIR(H, 0.3, rho = 0.02,
+                                                                rng = rng),
+    'basic_discrete_SIS': lambda H, rng: EoN.basic_discrete_SIS(H, 0.3, rho = 0.02,
+                                                                tmax = 5, rng = rng),
+    'Gillespie_Arbitrary': lambda H_, rng: EoN.Gillespie_Arbitrary(H_, H, J, IC,
+                                                        ('S', 'I', 'R'), rng = rng),
+    'percolate_network': lambda H, rng: EoN.percolate_network(H, 0.3, rng = rng),
+    'directed_percolate_network': lambda H, rng:
+                                EoN.directed_percolate_network(H, 0.6, 1., rng = rng),
+    'estimate_SIR_prob_size': lambda H, rng: EoN.estimate_SIR_prob_size(H, 0.3,
+                                                                        rng = rng),
+    }
+
+
+def _same_(first, second):
+    if isinstance(first, nx.Graph):
+        return set(first.edges()) == set(second.edges())
+    if isinstance(first, tuple):
+        return len(first) == len(second) and all(_same_(a, b)
+                                                    for a, b in zip(first, second))
+    return np.array_equal(first, second)
+
+
+@pytest.mark.parametrize('graph', [network, G], ids = ['networkx', 'compiled'])
+@pytest.mark.parametrize('name', sorted(functions))
+def test_seed_reproduces_output_and_leaves_globals_alone(name, graph):
+    function = functions[name]
+    random.seed(1)
+    np.random.seed(1)
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+
+    output = function(graph, 17)
+    assert _same_(function(graph, 17), output)
+    assert _same_(function(graph, np.random.default_rng(17)), output)
+    assert not _same_(function(graph, 18), output)
+
+    assert random.getstate() == python_state
+    for current, saved in zip(np.random.get_state(), numpy_state):
+        assert np.array_equal(current, saved)
+
+
+def test_replicates_seed_reproduces_output():
+    np.random.seed(1)
+    numpy_state = np.random.get_state()
+    for replicates in (EoN.basic_discrete_SIR_replicates,
+                        EoN.basic_discrete_SIS_replicates):
+        output = replicates(G, 0.3, replicates = 100, rho = 0.02, rng = 17)
+        assert _same_(replicates(G, 0.3, replicates = 100, rho = 0.02, rng = 17),
+                        output)
+    for current, saved in zip(np.random.get_state(), numpy_state):
+        assert np.array_equal(current, saved)
@@ -0,0 +1,55 @@
+r'''
+run_ensemble splits the simulations into chunks according to the number of
+workers, but each simulation gets its rng from `SeedSequence(seed).spawn`
+and the chunks are merged in the order of the seeds.  So the results for a
+seed do not depend on the number of workers (apart from rounding in the
+means and variances), and they are what adding the same simulations to one
+EnsembleStatistics gives.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+
+G = EoN.CompiledGraph(nx.fast_gnp_random_graph(300, 5./299, seed = 3))
+report_times = np.linspace(0, 8, 17)
+
+
+def _run_(workers):
+    return EoN.run_ensemble(EoN.fast_SIR, G, 30, report_times, workers = workers,
+                            seed = 42, return_statistics = True, tau = 0.6,
+                            gamma = 1., rho = 0.02)
+
+
+def test_run_ensemble_does_not_depend_on_workers():
+    expected = _run_(1)
+    assert expected.n == 30
+    for workers in (2, 3):
+        statistics = _run_(workers)
+        assert statistics.n == expected.n
+        for status in 'SIR':
+            assert np.allclose(statistics.mean(status), expected.mean(status),
+                                rtol = 1e-12, atol = 0)
+            assert np.allclose(statistics.variance(status),
+                                expected.variance(status), rtol = 1e-9, atol = 1e-9)
+            for q in (0.05, 0.5, 0.95):
+                assert np.array_equal(statistics.quantile(status, q),
+                                        expected.quantile(status, q))
+            assert statistics.final_histogram[status] == \
+                    expected.final_histogram[status]
+            assert statistics.peak_histogram[status] == \
+                    expected.peak_histogram[status]
+
+
+def test_run_ensemble_matches_the_same_simulations_in_sequence():
+    statistics = EoN.EnsembleStatistics(report_times)
+    for seed in np.random.SeedSequence(42).spawn(30):
+        statistics.add(*EoN.fast_SIR(G, 0.6, 1., rho = 0.02,
+                                        rng = np.random.default_rng(seed)))
+    expected = _run_(2)
+    for status in 'SIR':
+        assert np.allclose(statistics.mean(status), expected.mean(status),
+                            rtol = 1e-12, atol = 0)
+        assert statistics.final_histogram[status] == \
+                expected.final_histogram[status]
@@ -0,0 +1,56 @@
+r'''
+With a tolerance, run_prob_size_ensemble adds rounds of n_samples estimates
+until the standard errors of PE and AR are both at most tolerance, so it
+must stop after the first round at which they are, and never do more than
+max_samples.  The estimator here just returns normally distributed values
+with a known spread, which makes the number of rounds easy to check.
+'''
+
+import networkx as nx
+import numpy as np
+
+import EoN
+
+G = EoN.CompiledGraph(nx.fast_gnp_random_graph(200, 3./199, seed = 2))
+
+
+def _noisy_estimate_(G, spread, rng):
+    return 0.3 + spread*rng.standard_normal(), 0.2 + spread*rng.standard_normal()
+
+
+def _errors_(samples):
+    return np.std(samples, axis = 0, ddof = 1)/np.sqrt(len(samples))
+
+
+def test_rounds_stop_once_within_tolerance():
+    for seed in range(5):
+        PE, AR, PE_error, AR_error, samples = EoN.run_prob_size_ensemble(
+                                _noisy_estimate_, G, n_samples = 16, workers = 1,
+                                seed = seed, tolerance = 0.01, return_samples = True,
+                                spread = 0.1)
+        assert len(samples) % 16 == 0 and len(samples) > 16
+        assert max(PE_error, AR_error) <= 0.01
+        assert np.allclose((PE_error, AR_error), _errors_(samples))
+        assert np.allclose((PE, AR), samples.mean(axis = 0))
+        assert max(_errors_(samples[:-16])) > 0.01
+
+
+def test_rounds_stop_at_max_samples():
+    PE, AR, PE_error, AR_error, samples = EoN.run_prob_size_ensemble(
+                                _noisy_estimate_, G, n_samples = 16, workers = 1,
+                                seed = 1, tolerance = 1e-4, max_samples = 50,
+                                return_samples = True, spread = 0.1)
+    assert len(samples) == 50
+    assert PE_error > 1e-4
+
+
+def test_rounds_do_not_depend_on_workers():
+    results = [EoN.run_prob_size_ensemble(EoN.estimate_directed_SIR_prob_size, G,
+                                            n_samples = 10, workers = workers,
+                                            seed = 7, tolerance = 0.03,
+                                            return_samples = True, tau = 0.6,
+                                            gamma = 1.)
+                for workers in (1, 3)]
+    assert len(results[0][-1]) % 10 == 0 and len(results[0][-1]) > 10
+    assert np.array_equal(results[1][-1], results[0][-1])
+    assert results[1][:4] == results[0][:4]
@@ -0,0 +1,80 @@
+r'''
+A simulation stopped by stop_when ends at the first event at which the rule
+is met and returns the reason as an extra output.  With report_times, the
+report times up to the stopping time hold the state as `subsample` gives it
+from the full output, and those after it are NaN since the state there is
+unknown.
+'''
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import EoN
+
+network = nx.fast_gnp_random_graph(500, 5./499, seed = 6)
+G = EoN.CompiledGraph(network)
+report_times = np.linspace(0, 10, 41)
+
+
+def _nonMarkov_(simulation, H, seed, **kwargs):
+    draws = random.Random(seed)
+    if simulation is EoN.fast_nonMarkov_SIS:
+        trans_time_fxn = lambda u, v, rec_delay: [delay for delay in
+                                    (draws.expovariate(0.6),) if delay < rec_delay]
+    else:
+        trans_time_fxn = lambda u, v: draws.expovariate(0.6)
+    return simulation(H, trans_time_fxn = trans_time_fxn,
+                        rec_time_fxn = lambda u: draws.expovariate(1.),
+                        rng = seed, **kwargs)
+
+
+simulations = {'fast_SIR': lambda H, seed, **kwargs:
+                            EoN.fast_SIR(H, 0.6, 1., rng = seed, **kwargs),
+                'Gillespie_SIR': lambda H, seed, **kwargs:
+                            EoN.Gillespie_SIR(H, 0.6, 1., rng = seed, **kwargs),
+                'fast_nonMarkov_SIR': lambda H, seed, **kwargs:
+                            _nonMarkov_(EoN.fast_nonMarkov_SIR, H, seed, **kwargs),
+                'fast_SIS': lambda H, seed, **kwargs:
+                            EoN.fast_SIS(H, 0.6, 1., tmax = 10, rng = seed,
+                                            **kwargs),
+                'Gillespie_SIS': lambda H, seed, **kwargs:
+                            EoN.Gillespie_SIS(H, 0.6, 1., tmax = 10, rng = seed,
+                                                **kwargs),
+                'fast_nonMarkov_SIS': lambda H, seed, **kwargs:
+                            _nonMarkov_(EoN.fast_nonMarkov_SIS, H, seed, tmax = 10,
+                                        **kwargs)}
+
+
+def _late_(t, *counts):
+    return t > 1.5 and 'late'
+
+
+@pytest.mark.parametrize('stop_when, reason', [({'I': 60}, 'I'), (_late_, 'late')],
+                            ids = ['dict', 'function'])
+@pytest.mark.parametrize('H', [network, G], ids = ['networkx', 'compiled'])
+@pytest.mark.parametrize('name', sorted(simulations))
+def test_values_after_stopping_are_NaN(name, H, stop_when, reason):
+    simulation = simulations[name]
+    for seed in range(3):
+        full = simulation(H, seed, initial_infecteds = range(20),
+                            stop_when = stop_when)
+        assert full[-1] == reason
+        t_stop = full[0][-1]
+        if reason == 'I':
+            assert full[2][-1] >= 60 and max(full[2][:-1]) < 60
+        else:
+            assert t_stop > 1.5 and full[0][-2] <= 1.5
+
+        reported = simulation(H, seed, initial_infecteds = range(20),
+                                stop_when = stop_when, report_times = report_times)
+        assert reported[-1] == reason
+        assert np.array_equal(reported[0], report_times)
+        before = report_times <= t_stop
+        assert before.any() and not before.all()
+        expected = EoN.subsample(report_times[before], full[0], *full[1:-1])
+        for values, expected_values in zip(reported[1:-1], expected):
+            assert np.array_equal(values[before], expected_values)
+            assert np.isnan(values[~before]).all()
@@ -0,0 +1,52 @@
+r'''
+tau_leap_Arbitrary fires many events per leap, choosing each leap so that no
+rate is expected to change by more than a fraction epsilon.  So it is biased,
+and the bias in the final size and the peak of an SIR epidemic should fall
+steadily as epsilon is made smaller, towards the exact Gillespie_Arbitrary.
+'''
+
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+import EoN
+from EoN.tests.comparisons import final_and_peak, seeded_means
+
+N = 5000
+G = nx.fast_gnp_random_graph(N, 5./(N-1), seed = 1)
+
+H = nx.DiGraph()
+H.add_edge('I', 'R', rate = 1.)
+J = nx.DiGraph()
+J.add_edge(('I', 'S'), ('I', 'I'), rate = 0.5)
+IC = defaultdict(lambda: 'S')
+for node in range(50):
+    IC[node] = 'I'
+
+
+def _final_and_peak_(engine, runs, **kwargs):
+    return seeded_means(lambda seed: engine(G, H, J, IC, ('S', 'I', 'R'),
+                                            tmax = float('Inf'), rng = seed,
+                                            **kwargs),
+                        runs, final_and_peak)
+
+
+def test_tau_leap_error_shrinks_with_epsilon():
+    #the bias is roughly proportional to epsilon: the final size is about 
+    #500, 200 and 70 too large for epsilon 0.3, 0.1 and 0.03, well beyond 
+    #the standard errors (about 15)
+    exact = _final_and_peak_(EoN.Gillespie_Arbitrary, 20)
+    errors = [np.abs(_final_and_peak_(EoN.tau_leap_Arbitrary, 20, 
+                                        epsilon = epsilon) - exact)
+                for epsilon in (0.3, 0.1, 0.03)]
+    for larger, smaller in zip(errors, errors[1:]):
+        assert np.all(smaller < 0.6*larger)
+
+
+def test_tau_leap_conserves_nodes():
+    t, S, I, R = EoN.tau_leap_Arbitrary(G, H, J, IC, ('S', 'I', 'R'),
+                                        tmax = 5, rng = 0)
+    assert np.all(S + I + R == N)
+    assert np.all(np.diff(t) > 0)
+    assert t[-1] <= 5
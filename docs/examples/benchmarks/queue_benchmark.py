@@ -0,0 +1,67 @@
+'''Compares the 'heap' and 'calendar' event queues.
+
+First a "hold" benchmark on the queue alone: the queue is filled with n 
+events, and then repeatedly the earliest event is popped and a new one is 
+pushed a random time later.  Then fast_SIR and fast_SIS on a CompiledGraph
+with a large initial infection, which is when very many transmission events
+are pending.
+
+Typical results (python 3.11):
+
+    pending events  heap    calendar    (seconds for 10^6 pop/push pairs)
+    1000            1.80    2.07
+    10000           1.57    2.16
+    100000          3.54    4.73
+    1000000         5.16    5.39
+    4000000         7.70    5.75
+
+    simulation (N=10^6, mean degree 10)     heap    calendar  (seconds)
+    fast_SIR rho=0.01                       34.7    26.5
+    fast_SIS rho=0.01 tmax=2                38.1    37.3
+    fast_SIR rho=0.1                        45.2    36.4
+    fast_SIS rho=0.1 tmax=2                 64.0    50.3
+
+So heapq (which is implemented in C) is faster for up to about a million 
+pending events, and the calendar queue wins beyond that, which is where the
+simulations with large initial infections are.
+'''
+
+import EoN
+import networkx as nx
+import random
+import time
+from EoN.simulation import myQueue
+
+def hold(queue, n, steps):
+    Q = myQueue(queue = queue)
+    now = 0
+    for counter in range(n):
+        Q.add(random.expovariate(1.), None)
+    start = time.time()
+    for counter in range(steps):
+        now, dummy_counter, fxn, args = Q._pop_()
+        Q.add(now + random.expovariate(1.)*n/1000., None)
+    return time.time()-start
+
+print('hold benchmark (seconds for 10^6 pop/push pairs)')
+print('pending events\theap\tcalendar')
+for n in [10**3, 10**4, 10**5, 10**6, 4*10**6]:
+    print('{}\t{:.2f}\t{:.2f}'.format(n, hold('heap', n, 10**6), 
+                                        hold('calendar', n, 10**6)))
+
+
+N = 10**6
+G = EoN.CompiledGraph(nx.fast_gnp_random_graph(N, 10./N))
+
+print('\nseconds per simulation')
+print('simulation\theap\tcalendar')
+for rho in [0.01, 0.1]:
+    for name, simulation, kwargs in [('fast_SIR', EoN.fast_SIR, {}), 
+                                    ('fast_SIS', EoN.fast_SIS, {'tmax':2})]:
+        results = []
+        for queue in ['heap', 'calendar']:
+            random.seed(1)
+            start = time.time()
+            simulation(G, 0.5, 1., rho = rho, queue = queue, **kwargs)
+            results.append(time.time()-start)
+        print('{} rho={}\t{:.1f}\t{:.1f}'.format(name, rho, *results))
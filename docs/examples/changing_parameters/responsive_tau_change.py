@@ -2,8 +2,54 @@ import networkx as nx
 import EoN
 import matplotlib.pyplot as plt
 
-r'''Each time the infected population hits 40000, we'll introduce an intervention.
-To do this, we run it for short intervals until we overshoot, but then backtrack to the time at which
-40000 is hit, and then run again with intervention in place.'''
+r'''Each time the infected population hits 40000, we'll introduce an intervention
+which reduces tau.  It stays in place until the infected population falls to
+20000.
 
+To do this, we run with stop_when, which stops the simulation at the moment
+the threshold is hit, and return_state, which gives the state at that moment.
+Then we continue from that state with the new value of tau.  Nothing is rerun,
+so we can also branch several futures from the same history: here we compare
+with what happens if the first intervention is never introduced.'''
 
+N = 1000000
+kave = 5
+rho = 0.001
+gamma = 1.
+tau = 0.6
+reduced_tau = 0.15
+tmax = 40
+
+def below_20000(t, S, I, R):
+    return I <= 20000
+
+G = nx.fast_gnp_random_graph(N, kave/(N-1.))
+
+t, S, I, R, reason, state = EoN.fast_SIR(G, tau, gamma, rho = rho, tmax = tmax,
+                                            stop_when = {'I': 40000},
+                                            return_state = True)
+plt.plot(t, I, color = 'k')
+
+t, S, I, R = EoN.fast_SIR(G, tau, gamma, initial_state = state, tmax = tmax)
+plt.plot(t, I, '--', color = 'gray', label = 'no intervention')
+
+while reason is not None:
+    #intervention until I falls to 20000
+    t, S, I, R, reason, state = EoN.fast_SIR(G, reduced_tau, gamma,
+                                            initial_state = state, tmax = tmax,
+                                            stop_when = below_20000,
+                                            return_state = True)
+    plt.plot(t, I, color = 'C1')
+    if reason is None: #the epidemic ended, or tmax was reached.
+        break
+    #no intervention until I hits 40000 again
+    t, S, I, R, reason, state = EoN.fast_SIR(G, tau, gamma,
+                                            initial_state = state, tmax = tmax,
+                                            stop_when = {'I': 40000},
+                                            return_state = True)
+    plt.plot(t, I, color = 'k')
+
+plt.xlabel('$t$')
+plt.ylabel('Number infected')
+plt.legend(loc = 'upper right')
+plt.savefig('responsive_tau_change.pdf')
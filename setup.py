@@ -28,6 +28,7 @@ setup(name='EoN',
       keywords = ['Epidemics on Networks', 'Epidemic Sonnet Works'],
       install_requires = [
           'networkx',
+          'numpy',
           'scipy',
           'matplotlib'
           ],